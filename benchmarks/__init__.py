@@ -0,0 +1,5 @@
+"""
+Benchmarks
+----------
+Standalone performance checks for the ETL metadata framework.
+"""
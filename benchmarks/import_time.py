@@ -0,0 +1,149 @@
+"""
+Import-Time Benchmark for ETL Metadata Framework
+------------------------------------------------
+This script measures how long it takes to import the framework entry points
+using `python -X importtime` and enforces a startup budget:
+1. Each module is imported in a fresh interpreter
+2. The cumulative import time of the module is read from the importtime report
+3. Heavy dependencies that must load lazily are checked against sys.modules
+
+Usage:
+    python -m benchmarks.import_time [--budget-ms 100] [--runs 5]
+
+The script exits with a non-zero status when a module exceeds the budget or
+imports a heavy dependency eagerly.
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+DEFAULT_MODULES = [
+    "src.etl",
+    "src.metadata_manager",
+    "src.notification",
+    "src.ingest_to_lake",
+    "src.initialize_metadata_framework",
+    "src.worker",
+]
+
+# Dependencies that must only be imported on first use
+HEAVY_MODULES = [
+    "pandas",
+    "numpy",
+    "pyarrow",
+    "boto3",
+    "botocore",
+    "sqlalchemy",
+    "psycopg2",
+    "pyspark",
+]
+
+DEFAULT_BUDGET_MS = 100
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure_import(module_name):
+    """
+    Import a module in a fresh interpreter.
+
+    Returns the cumulative import time in milliseconds and the list of heavy
+    dependencies that ended up in sys.modules.
+    """
+    probe = (
+        f"import sys, {module_name}; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        capture_output=True,
+        text=True,
+        cwd=PROJECT_ROOT,
+    )
+    if process.returncode != 0:
+        raise RuntimeError(
+            f"Importing {module_name} failed:\n{process.stderr.strip()[-2000:]}"
+        )
+
+    cumulative_us = None
+    for line in process.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match and match.group(4) == module_name:
+            cumulative_us = int(match.group(2))
+
+    if cumulative_us is None:
+        raise RuntimeError(f"No importtime entry found for {module_name}")
+
+    eager_imports = [m for m in process.stdout.strip().split(",") if m]
+    return cumulative_us / 1000.0, eager_imports
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Measure framework import time against a startup budget"
+    )
+    parser.add_argument(
+        "modules",
+        nargs="*",
+        default=DEFAULT_MODULES,
+        help="Modules to measure (default: all framework entry points)",
+    )
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=float(os.getenv("IMPORT_BUDGET_MS", DEFAULT_BUDGET_MS)),
+        help="Maximum median cumulative import time per module in milliseconds",
+    )
+    parser.add_argument(
+        "--runs", type=int, default=5, help="Number of fresh interpreters per module"
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    failures = []
+
+    print(f"Import-time budget: {args.budget_ms:.0f} ms (median of {args.runs} runs)")
+    for module_name in args.modules:
+        timings = []
+        eager_imports = set()
+        for _ in range(args.runs):
+            elapsed_ms, eager = measure_import(module_name)
+            timings.append(elapsed_ms)
+            eager_imports.update(eager)
+
+        median_ms = statistics.median(timings)
+        status = "OK"
+        if median_ms > args.budget_ms:
+            status = "OVER BUDGET"
+            failures.append(f"{module_name}: {median_ms:.1f} ms")
+        if eager_imports:
+            status = "EAGER IMPORTS"
+            failures.append(
+                f"{module_name}: imports {', '.join(sorted(eager_imports))} eagerly"
+            )
+
+        print(
+            f"  {module_name:<40} median {median_ms:7.1f} ms "
+            f"(min {min(timings):.1f}, max {max(timings):.1f})  {status}"
+        )
+
+    if failures:
+        print("\nStartup budget exceeded:")
+        for failure in failures:
+            print(f"  - {failure}")
+        return 1
+
+    print("\nAll modules within startup budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""
+Parquet Settings Benchmark for ETL Metadata Framework
+-----------------------------------------------------
+This script compares Parquet write settings (parquet_write_settings rows) on
+the generated sample data of a data source:
+1. The JSON files of the source under sample_data/raw are loaded and repeated
+   up to the requested number of rows
+2. Each setting writes the data with src.lake_writer, as ingest_to_lake does
+3. The file is read back from memory the way etl.py reads an S3 object, with
+   the optional projection and row filter of the pipeline
+
+Usage:
+    python -m benchmarks.parquet_settings [--source orders] [--rows 1000000]
+        [--columns order_id,price] [--row-filter "price >= 100"]
+
+Repeating the sample rows makes dictionaries and compression look better than
+on real data; compare settings with each other, not with production sizes.
+"""
+
+import argparse
+import glob
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import pyarrow as pa
+from pyarrow import json as pa_json
+
+from src.config import get_settings
+from src.lake_writer import parquet_writer_kwargs, write_parquet_files
+from src.parquet_reader import parse_column_list, parse_row_filter, read_parquet_table
+
+RAW_ROOT = os.path.join("sample_data", "raw")
+
+# (name, parquet_write_settings row)
+SETTINGS = [
+    ("snappy", {"compression": "snappy"}),
+    ("snappy, no dict", {"compression": "snappy", "use_dictionary": False}),
+    ("zstd 1", {"compression": "zstd", "compression_level": 1}),
+    ("zstd 3", {"compression": "zstd", "compression_level": 3}),
+    ("zstd 9", {"compression": "zstd", "compression_level": 9}),
+    ("gzip 6", {"compression": "gzip", "compression_level": 6}),
+    ("lz4", {"compression": "lz4"}),
+    ("none", {"compression": "none"}),
+    (
+        "zstd 3, 64k pages",
+        {"compression": "zstd", "compression_level": 3, "page_size_bytes": 64 * 1024},
+    ),
+    (
+        "zstd 3, 50k rg",
+        {"compression": "zstd", "compression_level": 3, "row_group_rows": 50000},
+    ),
+]
+
+
+def load_sample(source, rows):
+    paths = sorted(glob.glob(os.path.join(RAW_ROOT, "*", f"{source}.json")))
+    if not paths:
+        raise FileNotFoundError(f"No {source}.json under {RAW_ROOT}")
+    tables = [pa_json.read_json(path) for path in paths]
+    sample = pa.concat_tables(tables, promote_options="permissive")
+    sample = sample.select(sorted(sample.column_names))
+    copies = max(1, -(-rows // sample.num_rows))
+    return pa.concat_tables([sample] * copies).slice(0, rows).combine_chunks()
+
+
+def run(table, write_options, work_dir, columns, filters, repeat):
+    row_group_rows = (
+        write_options.get("row_group_rows") or get_settings()["lake_row_group_rows"]
+    )
+    write_seconds = []
+    for _ in range(repeat):
+        for path in glob.glob(os.path.join(work_dir, "*")):
+            os.remove(path)
+        started = time.perf_counter()
+        (path,) = write_parquet_files(
+            table.to_batches(),
+            table.schema,
+            work_dir,
+            table.num_rows,
+            row_group_rows,
+            write_options,
+        )
+        write_seconds.append(time.perf_counter() - started)
+
+    with open(path, "rb") as f:
+        data = f.read()
+    read_seconds = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = read_parquet_table(pa.BufferReader(data), columns, filters)
+        read_seconds.append(time.perf_counter() - started)
+
+    return {
+        "bytes": len(data),
+        "write": statistics.median(write_seconds),
+        "read": statistics.median(read_seconds),
+        "rows_read": result.num_rows,
+    }
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Compare Parquet codecs, encodings and row-group sizes"
+    )
+    parser.add_argument("--source", default="orders", help="Data source to use")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per setting")
+    parser.add_argument("--columns", help="Projection, e.g. select_columns")
+    parser.add_argument("--row-filter", help="Row filter without {watermark}")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    table = load_sample(args.source, args.rows)
+    columns = parse_column_list(args.columns)
+    filters = parse_row_filter(args.row_filter)
+    for _, write_options in SETTINGS:
+        # Fail early on a setting pyarrow does not accept
+        parquet_writer_kwargs(write_options)
+
+    print(
+        f"{args.source}: {table.num_rows} rows, {table.nbytes / 1024 / 1024:.1f} MB "
+        f"in memory, median of {args.repeat} run(s)"
+    )
+    baseline = None
+    with tempfile.TemporaryDirectory() as work_dir:
+        for name, write_options in SETTINGS:
+            result = run(table, write_options, work_dir, columns, filters, args.repeat)
+            baseline = baseline or result["bytes"]
+            print(
+                f"  {name:<18} {result['bytes'] / 1024 / 1024:8.2f} MB "
+                f"({result['bytes'] / baseline:5.2f}x)  "
+                f"write {result['write'] * 1000:7.1f} ms  "
+                f"read {result['read'] * 1000:7.1f} ms  "
+                f"({result['rows_read']} rows)"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
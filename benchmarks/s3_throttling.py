@@ -0,0 +1,153 @@
+"""
+S3 Throttling Benchmark for ETL Metadata Framework
+--------------------------------------------------
+This script checks the adaptive S3 fetch concurrency of src.s3_fetcher
+against a local stand-in for S3 that behaves like a throttled prefix:
+1. Requests beyond the stand-in capacity are rejected with 503 SlowDown
+2. Latency grows with the number of requests in flight past a knee
+3. The same workload is run with the adaptive limit and with fixed limits,
+   reporting throughput, throttled requests, retries and the final limit
+
+Usage:
+    python -m benchmarks.s3_throttling [--requests 400] [--capacity 12]
+        [--fixed 4 --fixed 32]
+
+The adaptive run should finish close to the best fixed limit without the
+throttling of an oversized one.
+"""
+
+import argparse
+import io
+import sys
+import threading
+import time
+
+from botocore.exceptions import ClientError
+
+from src.s3_fetcher import AdaptiveConcurrency, get_object_bytes, map_concurrent
+
+
+class ThrottlingS3:
+    """In-process get_object stand-in with a concurrency capacity."""
+
+    def __init__(self, capacity, knee, base_latency, object_bytes):
+        self.capacity = capacity
+        self.knee = knee
+        self.base_latency = base_latency
+        self.payload = b"x" * object_bytes
+        self.in_flight = 0
+        self.requests = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    def get_object(self, Bucket, Key, Range=None):
+        with self._lock:
+            self.requests += 1
+            if self.in_flight >= self.capacity:
+                self.throttled += 1
+                raise ClientError(
+                    {
+                        "Error": {"Code": "SlowDown", "Message": "Reduce request rate"},
+                        "ResponseMetadata": {"HTTPStatusCode": 503},
+                    },
+                    "GetObject",
+                )
+            self.in_flight += 1
+            in_flight = self.in_flight
+        try:
+            time.sleep(self.base_latency * max(1.0, in_flight / self.knee))
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        return {"Body": io.BytesIO(self.payload)}
+
+
+def run(controller, args):
+    s3 = ThrottlingS3(args.capacity, args.knee, args.latency_ms / 1000.0, 1024)
+    stats = {}
+    stats_lock = threading.Lock()
+
+    def fetch(index):
+        request_stats = {}
+        try:
+            get_object_bytes(
+                s3,
+                "bench",
+                f"object-{index}",
+                stats=request_stats,
+                controller=controller,
+            )
+        except ClientError:
+            # Still throttled after S3_MAX_RETRIES retries
+            request_stats["failed"] = 1
+        with stats_lock:
+            for key, value in request_stats.items():
+                stats[key] = stats.get(key, 0) + value
+
+    started = time.monotonic()
+    map_concurrent(fetch, range(args.requests), controller=controller)
+    elapsed = time.monotonic() - started
+    return {
+        "elapsed": elapsed,
+        "throughput": args.requests / elapsed,
+        "throttled": s3.throttled,
+        "retries": stats.get("retries", 0),
+        "failed": stats.get("failed", 0),
+        **controller.snapshot(),
+    }
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Compare adaptive and fixed S3 GET concurrency under throttling"
+    )
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument(
+        "--capacity",
+        type=int,
+        default=12,
+        help="Requests in flight above which the stand-in returns SlowDown",
+    )
+    parser.add_argument(
+        "--knee",
+        type=int,
+        default=8,
+        help="Requests in flight above which latency grows linearly",
+    )
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--initial", type=int, default=4)
+    parser.add_argument("--maximum", type=int, default=64)
+    parser.add_argument(
+        "--fixed",
+        type=int,
+        action="append",
+        help="Fixed concurrency to compare with (repeatable, default: 4 and 32)",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    runs = [("adaptive", AdaptiveConcurrency(args.initial, 1, args.maximum))]
+    for limit in args.fixed or [4, 32]:
+        runs.append((f"fixed {limit}", AdaptiveConcurrency(limit, limit, limit)))
+
+    print(
+        f"{args.requests} GETs, capacity {args.capacity}, knee {args.knee}, "
+        f"base latency {args.latency_ms:.0f} ms"
+    )
+    for name, controller in runs:
+        result = run(controller, args)
+        print(
+            f"  {name:<10} {result['elapsed']:6.2f}s  "
+            f"{result['throughput']:7.1f} req/s  "
+            f"throttled {result['throttled']:4d}  retries {result['retries']:4d}  "
+            f"failed {result['failed']:3d}  "
+            f"limit {result['limit']} (peak {result['peak_limit']}, "
+            f"{result['decreases']} decreases)"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""
+Worker Queue Benchmark for ETL Metadata Framework
+-------------------------------------------------
+This script runs src.worker against a local pipeline_queue and reports how
+the queue drains with different numbers of worker processes:
+1. For each process count the active pipelines are queued for the given
+   dates under a fresh run label, with force so unchanged sources still load
+2. spawn_workers starts the local workers, which run until the queue is
+   drained, and the wall time is measured
+3. The entries of the label are counted per status and per worker, and the
+   completed audit records are compared with the completed entries: a
+   (pipeline, date) loaded by two workers shows up as a double load
+
+Usage:
+    python -m benchmarks.worker_queue --date 20250324 [--to 20250326]
+        [--processes 1 --processes 4] [--pipeline-id 1]
+
+It needs the same environment as `python -m src.worker run`: the metadata
+database with sql/create_metadata_tables.sql applied and the sample data in
+the lake (src.ingest_to_lake). Use a queue no other workers are draining;
+the workers exit only when nothing is pending or running.
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime
+
+from src.backfill import BACKFILL_LOAD_TYPE, get_backfill_dates
+from src.config import configure_logging, get_settings
+from src.metadata_manager import (
+    connect_to_database,
+    enqueue_pipeline_runs,
+    get_pipeline_config,
+    get_queue_counts,
+)
+from src.worker import spawn_workers
+
+
+def queue_run(run_label, pipeline_ids, dates):
+    max_attempts = get_settings()["worker_max_attempts"]
+    queued = enqueue_pipeline_runs(
+        run_label, pipeline_ids, dates[:1], None, True, max_attempts
+    )
+    if len(dates) > 1:
+        queued += enqueue_pipeline_runs(
+            run_label, pipeline_ids, dates[1:], BACKFILL_LOAD_TYPE, True, max_attempts
+        )
+    return queued
+
+
+def summarize_run(run_label, started_at):
+    with connect_to_database() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT worker_id, COUNT(*) FROM pipeline_queue
+                WHERE run_label = %s AND status = 'completed'
+                GROUP BY worker_id
+                """,
+                (run_label,),
+            )
+            per_worker = dict(cur.fetchall())
+            cur.execute(
+                """
+                SELECT COUNT(*) FROM audit a
+                WHERE a.status = 'completed'
+                  AND a.start_time >= %s
+                  AND a.pipeline_id IN (
+                      SELECT pipeline_id FROM pipeline_queue WHERE run_label = %s
+                  )
+                """,
+                (started_at, run_label),
+            )
+            audited = cur.fetchone()[0]
+    return per_worker, audited
+
+
+def run(processes, pipeline_ids, dates):
+    run_label = f"bench-{processes}p-{datetime.now():%Y%m%d%H%M%S}"
+    queued = queue_run(run_label, pipeline_ids, dates)
+    started_at = datetime.now()
+    started = time.monotonic()
+    exit_code = spawn_workers(processes, exit_when_empty=True, max_entries=None)
+    elapsed = time.monotonic() - started
+
+    counts = get_queue_counts(run_label)
+    per_worker, audited = summarize_run(run_label, started_at)
+    return {
+        "run_label": run_label,
+        "queued": queued,
+        "elapsed": elapsed,
+        "throughput": queued / elapsed if elapsed else 0.0,
+        "counts": counts,
+        "per_worker": per_worker,
+        "double_loads": max(0, audited - counts.get("completed", 0)),
+        "exit_code": exit_code,
+    }
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Drain a local pipeline_queue with spawn_workers"
+    )
+    parser.add_argument("--date", required=True, help="Date in format YYYYMMDD")
+    parser.add_argument(
+        "--to", dest="date_to", help="Queue every date from --date to this one"
+    )
+    parser.add_argument("--pipeline-id", type=int, help="Queue a single pipeline")
+    parser.add_argument(
+        "--processes",
+        type=int,
+        action="append",
+        help="Worker processes to run with (repeatable, default: 1 and 4)",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    configure_logging()
+
+    dates = get_backfill_dates(args.date, args.date_to) if args.date_to else [args.date]
+    pipeline_ids = [
+        config["id"]
+        for config in get_pipeline_config()
+        if args.pipeline_id is None or config["id"] == args.pipeline_id
+    ]
+    if not pipeline_ids:
+        print("No active pipelines to queue")
+        return 1
+
+    counts = get_queue_counts()
+    if counts.get("pending") or counts.get("running"):
+        print("The queue has pending or running entries; drain it first")
+        return 1
+
+    print(f"{len(pipeline_ids)} pipelines x {len(dates)} dates")
+    results = [
+        (processes, run(processes, pipeline_ids, dates))
+        for processes in args.processes or [1, 4]
+    ]
+
+    print(
+        f"{'processes':>9} {'entries':>8} {'seconds':>8} {'entries/s':>10} "
+        f"{'completed':>10} {'failed':>7} {'workers':>8} {'double':>7}"
+    )
+    failed = False
+    for processes, result in results:
+        counts = result["counts"]
+        print(
+            f"{processes:>9} {result['queued']:>8} {result['elapsed']:>8.1f} "
+            f"{result['throughput']:>10.2f} {counts.get('completed', 0):>10} "
+            f"{counts.get('failed', 0):>7} {len(result['per_worker']):>8} "
+            f"{result['double_loads']:>7}"
+        )
+        failed = failed or result["double_loads"] or result["exit_code"]
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -15,14 +15,17 @@ WITH source_data AS (
         phone,
         address,
         created_at,
-        current_timestamp as loaded_at
+        _batch_id as batch_id,
+        _loaded_at as loaded_at,
+        -- Tombstone của key bị xóa bởi cdc load; các model phía sau loại bỏ key này
+        coalesce(_deleted, false) as is_deleted
     FROM {{ source('postgres_raw', 'customers') }}
 )
 
 {% if is_incremental() %}
     -- Nếu là incremental load, chỉ lấy dữ liệu mới
     SELECT * FROM source_data
-    WHERE loaded_at > (SELECT MAX(loaded_at) FROM {{ this }})
+    WHERE batch_id > (SELECT COALESCE(MAX(batch_id), 0) FROM {{ this }})
 {% else %}
     -- Nếu là full load, lấy tất cả dữ liệu
     SELECT * FROM source_data
@@ -15,13 +15,16 @@ WITH source_data AS (
         quantity,
         price,
         order_date,
-        current_timestamp as loaded_at
+        _batch_id as batch_id,
+        _loaded_at as loaded_at,
+        -- Tombstone của key bị xóa bởi cdc load; các model phía sau loại bỏ key này
+        coalesce(_deleted, false) as is_deleted
     FROM {{ source('postgres_raw', 'orders') }}
 )
 
 {% if is_incremental() %}
     SELECT * FROM source_data
-    WHERE loaded_at > (SELECT MAX(loaded_at) FROM {{ this }})
+    WHERE batch_id > (SELECT COALESCE(MAX(batch_id), 0) FROM {{ this }})
 {% else %}
     SELECT * FROM source_data
 {% endif %} 
\ No newline at end of file
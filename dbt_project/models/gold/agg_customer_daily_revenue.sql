@@ -0,0 +1,70 @@
+{{
+  config(
+    materialized='incremental',
+    incremental_strategy='delete+insert',
+    unique_key=['customer_id', 'order_day'],
+    indexes=[{'columns': ['customer_id', 'order_day'], 'unique': True}],
+    post_hook="delete from {{ this }} where order_count = 0",
+    schema='gold'
+  )
+}}
+
+-- Doanh thu theo khách hàng và ngày. Incremental run chỉ tính lại các cặp
+-- (customer_id, order_day) của phiên bản mới và phiên bản cũ của các đơn hàng
+-- thay đổi (kể cả đơn hàng bị xóa); cặp không còn đơn hàng nào được xóa bởi
+-- post_hook
+with orders as (
+    select * from {{ ref('fct_orders_incremental') }}
+    where is_deleted is not true
+),
+
+changes as (
+    select * from {{ ref('fct_order_changes') }}
+    {% if is_incremental() %}
+    where batch_id > (select coalesce(max(max_batch_id), 0) from {{ this }})
+    {% endif %}
+),
+
+{% if is_incremental() %}
+affected_partitions as (
+    select customer_id, order_day
+    from changes
+    where customer_id is not null and order_day is not null
+    union
+    select previous_customer_id, previous_order_day
+    from changes
+    where previous_customer_id is not null and previous_order_day is not null
+),
+
+customer_daily_revenue as (
+    select
+        p.customer_id,
+        p.order_day,
+        count(o.order_id) as order_count,
+        coalesce(sum(o.quantity), 0) as units_sold,
+        coalesce(sum(o.order_total), 0) as revenue,
+        (select max(batch_id) from changes) as max_batch_id,
+        current_timestamp as updated_at
+    from affected_partitions p
+    left join orders o
+        on o.customer_id = p.customer_id
+        and o.order_date >= p.order_day
+        and o.order_date < p.order_day + 1
+    group by p.customer_id, p.order_day
+)
+{% else %}
+customer_daily_revenue as (
+    select
+        customer_id,
+        cast(order_date as date) as order_day,
+        count(*) as order_count,
+        sum(quantity) as units_sold,
+        sum(order_total) as revenue,
+        (select max(batch_id) from changes) as max_batch_id,
+        current_timestamp as updated_at
+    from orders
+    group by customer_id, cast(order_date as date)
+)
+{% endif %}
+
+select * from customer_daily_revenue
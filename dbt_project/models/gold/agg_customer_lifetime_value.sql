@@ -0,0 +1,64 @@
+{{
+  config(
+    materialized='incremental',
+    incremental_strategy='delete+insert',
+    unique_key='customer_id',
+    indexes=[{'columns': ['customer_id'], 'unique': True}],
+    post_hook="delete from {{ this }} where order_count = 0",
+    schema='gold'
+  )
+}}
+
+-- Giá trị vòng đời khách hàng. Incremental run chỉ tính lại các khách hàng có
+-- đơn hàng thay đổi trong fct_order_changes, cả khách hàng cũ của đơn hàng bị
+-- chuyển hoặc bị xóa, từ bảng tổng hợp theo ngày thay vì toàn bộ lịch sử đơn
+-- hàng. Khách hàng không còn đơn hàng nào được xóa bởi post_hook
+with customer_daily as (
+    select * from {{ ref('agg_customer_daily_revenue') }}
+),
+
+changes as (
+    select * from {{ ref('fct_order_changes') }}
+    {% if is_incremental() %}
+    where batch_id > (select coalesce(max(max_batch_id), 0) from {{ this }})
+    {% endif %}
+),
+
+{% if is_incremental() %}
+affected_customers as (
+    select customer_id from changes where customer_id is not null
+    union
+    select previous_customer_id from changes where previous_customer_id is not null
+),
+
+customer_lifetime_value as (
+    select
+        a.customer_id,
+        min(d.order_day) as first_order_day,
+        max(d.order_day) as last_order_day,
+        coalesce(sum(d.order_count), 0) as order_count,
+        coalesce(sum(d.revenue), 0) as lifetime_value,
+        sum(d.revenue) / nullif(sum(d.order_count), 0) as avg_order_value,
+        (select max(batch_id) from changes) as max_batch_id,
+        current_timestamp as updated_at
+    from affected_customers a
+    left join customer_daily d on d.customer_id = a.customer_id
+    group by a.customer_id
+)
+{% else %}
+customer_lifetime_value as (
+    select
+        customer_id,
+        min(order_day) as first_order_day,
+        max(order_day) as last_order_day,
+        sum(order_count) as order_count,
+        sum(revenue) as lifetime_value,
+        sum(revenue) / nullif(sum(order_count), 0) as avg_order_value,
+        (select max(batch_id) from changes) as max_batch_id,
+        current_timestamp as updated_at
+    from customer_daily
+    group by customer_id
+)
+{% endif %}
+
+select * from customer_lifetime_value
@@ -0,0 +1,65 @@
+{{
+  config(
+    materialized='incremental',
+    incremental_strategy='delete+insert',
+    unique_key='order_day',
+    indexes=[{'columns': ['order_day'], 'unique': True}],
+    post_hook="delete from {{ this }} where order_count = 0",
+    schema='gold'
+  )
+}}
+
+-- Doanh thu theo ngày. Incremental run chỉ tính lại các ngày bị ảnh hưởng bởi
+-- các thay đổi mới trong fct_order_changes: ngày của phiên bản mới và ngày của
+-- phiên bản cũ (đơn hàng bị cập nhật sang ngày khác hoặc bị xóa). Ngày không
+-- còn đơn hàng nào được xóa bởi post_hook
+with orders as (
+    select * from {{ ref('fct_orders_incremental') }}
+    where is_deleted is not true
+),
+
+changes as (
+    select * from {{ ref('fct_order_changes') }}
+    {% if is_incremental() %}
+    where batch_id > (select coalesce(max(max_batch_id), 0) from {{ this }})
+    {% endif %}
+),
+
+{% if is_incremental() %}
+affected_days as (
+    select order_day from changes where order_day is not null
+    union
+    select previous_order_day from changes where previous_order_day is not null
+),
+
+daily_revenue as (
+    select
+        d.order_day,
+        count(o.order_id) as order_count,
+        count(distinct o.customer_id) as customer_count,
+        coalesce(sum(o.quantity), 0) as units_sold,
+        coalesce(sum(o.order_total), 0) as revenue,
+        (select max(batch_id) from changes) as max_batch_id,
+        current_timestamp as updated_at
+    from affected_days d
+    left join orders o
+        on o.order_date >= d.order_day
+        and o.order_date < d.order_day + 1
+    group by d.order_day
+)
+{% else %}
+daily_revenue as (
+    select
+        cast(order_date as date) as order_day,
+        count(*) as order_count,
+        count(distinct customer_id) as customer_count,
+        sum(quantity) as units_sold,
+        sum(order_total) as revenue,
+        (select max(batch_id) from changes) as max_batch_id,
+        current_timestamp as updated_at
+    from orders
+    group by cast(order_date as date)
+)
+{% endif %}
+
+select * from daily_revenue
@@ -18,8 +18,10 @@ dim_customers as (
         phone,
         address,
         created_at,
+        batch_id,
         loaded_at
     FROM customers
+    WHERE is_deleted IS NOT TRUE
 )
 
 select * from dim_customers 
\ No newline at end of file
@@ -0,0 +1,44 @@
+{{
+  config(
+    materialized='incremental',
+    indexes=[{'columns': ['batch_id']}],
+    schema='gold'
+  )
+}}
+
+-- Nhật ký thay đổi của fct_orders_incremental (chỉ thêm, không cập nhật): mỗi
+-- phiên bản mới của đơn hàng kèm customer_id và ngày của phiên bản mà nó thay
+-- thế, kể cả tombstone của đơn hàng bị xóa. Model này chạy trước
+-- fct_orders_incremental nên bảng đó vẫn còn phiên bản cũ. Các bảng tổng hợp
+-- dùng nhật ký để tính lại cả phân vùng cũ lẫn phân vùng mới
+{%- set current = adapter.get_relation(
+    database=this.database,
+    schema=this.schema,
+    identifier='fct_orders_incremental'
+) %}
+
+with orders as (
+    select * from {{ ref('sil_orders') }}
+    {% if is_incremental() %}
+    where batch_id > (select coalesce(max(batch_id), 0) from {{ this }})
+    {% endif %}
+)
+
+select
+    o.order_id,
+    o.batch_id,
+    o.customer_id,
+    cast(o.order_date as date) as order_day,
+    {% if current %}
+    c.customer_id as previous_customer_id,
+    cast(c.order_date as date) as previous_order_day,
+    {% else %}
+    -- Chưa có phiên bản cũ: khóa mới đứng thay
+    o.customer_id as previous_customer_id,
+    cast(o.order_date as date) as previous_order_day,
+    {% endif %}
+    o.is_deleted is true as is_deleted
+from orders o
+{% if current %}
+left join {{ current }} c on c.order_id = o.order_id
+{% endif %}
@@ -18,8 +18,10 @@ transformed as (
         price,
         order_date,
         order_total,
+        batch_id,
         loaded_at
     from orders
+    where is_deleted is not true
 )
 
 select * from transformed 
\ No newline at end of file
@@ -2,10 +2,19 @@
   config(
     materialized='incremental',
     unique_key='order_id',
+    indexes=[
+      {'columns': ['order_id'], 'unique': True},
+      {'columns': ['batch_id']},
+      {'columns': ['order_date']},
+      {'columns': ['customer_id', 'order_date']}
+    ],
     schema='gold'
   )
 }}
 
+-- fct_order_changes phải chạy trước để đọc phiên bản cũ của các đơn hàng
+-- depends_on: {{ ref('fct_order_changes') }}
+
 with orders as (
     select * from {{ ref('sil_orders') }}
 ),
@@ -19,13 +28,15 @@ transformed as (
         price,
         order_date,
         order_total,
-        loaded_at
+        batch_id,
+        loaded_at,
+        is_deleted
     from orders
 )
 
 {% if is_incremental() %}
     select * from transformed
-    where loaded_at > (select max(loaded_at) from {{ this }})
+    where batch_id > (select coalesce(max(batch_id), 0) from {{ this }})
 {% else %}
     select * from transformed
 {% endif %}
\ No newline at end of file
@@ -18,14 +18,16 @@ sil_customers as (
         phone,
         address,
         TO_TIMESTAMP(created_at) as created_at,
-        loaded_at
+        batch_id,
+        loaded_at,
+        is_deleted
     from source
 )
 
 {% if is_incremental() %}
     -- Nếu là incremental load, chỉ lấy dữ liệu mới
     SELECT * FROM sil_customers
-    WHERE loaded_at > (SELECT MAX(loaded_at) FROM {{ this }})
+    WHERE batch_id > (SELECT COALESCE(MAX(batch_id), 0) FROM {{ this }})
 {% else %}
     -- Nếu là full load, lấy tất cả dữ liệu
     SELECT * FROM sil_customers
@@ -19,14 +19,16 @@ sil_orders as (
         price,
         TO_TIMESTAMP(order_date) as order_date,
         quantity * price as order_total,
-        loaded_at
+        batch_id,
+        loaded_at,
+        is_deleted
     from source
 )
 
 {% if is_incremental() %}
     -- Nếu là incremental load, chỉ lấy dữ liệu mới
     SELECT * FROM sil_orders
-    WHERE loaded_at > (SELECT MAX(loaded_at) FROM {{ this }})
+    WHERE batch_id > (SELECT COALESCE(MAX(batch_id), 0) FROM {{ this }})
 {% else %}
     -- Nếu là full load, lấy tất cả dữ liệu
     SELECT * FROM sil_orders
@@ -1,53 +1,35 @@
-import pandas as pd
+import duckdb
 import os
-from glob import glob
+import sys
 
 
-def read_parquet_files(directory):
-    """Đọc tất cả các file Parquet trong thư mục"""
-    # Tìm tất cả file parquet trong thư mục
-    parquet_files = glob(os.path.join(directory, "*.parquet"))
+def describe_source(con, directory):
+    """Hiển thị schema, số dòng và 5 dòng đầu của các file Parquet trong thư mục"""
+    pattern = os.path.join(directory, "*.parquet")
+    # DuckDB chỉ đọc metadata và các dòng cần thiết, không nạp toàn bộ dữ liệu
+    source = f"read_parquet('{pattern}')"
 
-    if not parquet_files:
+    try:
+        row_count = con.execute(f"SELECT count(*) FROM {source}").fetchone()[0]
+    except duckdb.IOException:
         print(f"Không tìm thấy file Parquet trong thư mục: {directory}")
-        return None
+        return
 
-    # Đọc và kết hợp tất cả các file
-    dfs = []
-    for file in parquet_files:
-        print(f"Đang đọc file: {os.path.basename(file)}")
-        df = pd.read_parquet(file)
-        dfs.append(df)
-
-    # Kết hợp tất cả DataFrame
-    if dfs:
-        combined_df = pd.concat(dfs, ignore_index=True)
-        return combined_df
-    return None
+    print(f"\nThông tin dữ liệu {os.path.basename(directory)} ({row_count} dòng):")
+    con.sql(f"DESCRIBE SELECT * FROM {source}").show()
+    print(f"5 dòng đầu tiên của dữ liệu {os.path.basename(directory)}:")
+    con.sql(f"SELECT * FROM {source} LIMIT 5").show()
 
 
 def main():
     # Đường dẫn gốc
     base_dir = os.path.dirname(os.path.abspath(__file__))
-    date_dir = "20250324"  # Thư mục chứa dữ liệu
-
-    # Đọc dữ liệu customers
-    customers_dir = os.path.join(base_dir, date_dir, "customers")
-    customers_df = read_parquet_files(customers_dir)
-    if customers_df is not None:
-        print("\nThông tin dữ liệu Customers:")
-        print(customers_df.info())
-        print("\n5 dòng đầu tiên của dữ liệu Customers:")
-        print(customers_df.head())
-
-    # Đọc dữ liệu orders
-    orders_dir = os.path.join(base_dir, date_dir, "orders")
-    orders_df = read_parquet_files(orders_dir)
-    if orders_df is not None:
-        print("\nThông tin dữ liệu Orders:")
-        print(orders_df.info())
-        print("\n5 dòng đầu tiên của dữ liệu Orders:")
-        print(orders_df.head())
+    date_dir = sys.argv[1] if len(sys.argv) > 1 else "20250324"
+
+    # Truy vấn SQL trên nhiều ngày: python -m src.lake_query --help
+    con = duckdb.connect()
+    for source in ("customers", "orders"):
+        describe_source(con, os.path.join(base_dir, date_dir, source))
 
 
 if __name__ == "__main__":
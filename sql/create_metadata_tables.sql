@@ -6,30 +6,336 @@ CREATE TABLE IF NOT EXISTS controller (
     destination_table TEXT NOT NULL,              -- Ten bang dich (output)
     source_table TEXT NOT NULL,
     schema_name TEXT DEFAULT 'public',            -- Schema chua bang dich
-    load_type TEXT NOT NULL,                      -- Loai load: full/incremental
+    load_type TEXT NOT NULL,                      -- Loai load: full/incremental/cdc (append: incremental khong dung watermark, cho backfill)
     active BOOLEAN DEFAULT TRUE,                  -- Pipeline co hoat dong khong
     status TEXT DEFAULT 'PENDING',                -- Trang thai hien tai 
     description TEXT,                             -- Mo ta ve pipeline
+    select_columns TEXT,                          -- Danh sach cot can doc (phan cach boi dau phay), NULL = tat ca
+    row_filter TEXT,                              -- Dieu kien loc dong, vd: lsn > {watermark} (cot tang dan theo thu tu ghi, khong dung thoi gian su kien)
+    business_keys TEXT,                           -- Khoa nghiep vu de loai bo ban ghi trung lap
+    load_profile TEXT DEFAULT 'default',          -- Profile load: default/bulk
+    cdc_op_column TEXT,                           -- cdc: cot loai thay doi (I/U/D), NULL = 'op'
+    cdc_order_column TEXT,                        -- cdc: cot thu tu su kien (vd: lsn, updated_at)
+    resource_weight INT DEFAULT 1,                -- So worker ma pipeline chiem khi chay song song
+    timeout_seconds INT,                          -- Thoi gian toi da cua mot lan chay (giay), NULL = PIPELINE_TIMEOUT_SECONDS
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
--- Audit table 
+-- Bo sung cot cho cac bang controller da ton tai
+ALTER TABLE controller ADD COLUMN IF NOT EXISTS select_columns TEXT;
+ALTER TABLE controller ADD COLUMN IF NOT EXISTS row_filter TEXT;
+ALTER TABLE controller ADD COLUMN IF NOT EXISTS business_keys TEXT;
+ALTER TABLE controller ADD COLUMN IF NOT EXISTS load_profile TEXT DEFAULT 'default';
+ALTER TABLE controller ADD COLUMN IF NOT EXISTS cdc_op_column TEXT;
+ALTER TABLE controller ADD COLUMN IF NOT EXISTS cdc_order_column TEXT;
+ALTER TABLE controller ADD COLUMN IF NOT EXISTS resource_weight INT DEFAULT 1;
+ALTER TABLE controller ADD COLUMN IF NOT EXISTS timeout_seconds INT;
+
+-- Audit table (phan vung theo thang tren start_time)
+-- Bang audit cu (khong phan vung) duoc doi ten thanh audit_unpartitioned; du lieu
+-- duoc chep sang bang phan vung sau ensure_audit_partitions ben duoi
+DO $$
+BEGIN
+    IF to_regclass('audit') IS NOT NULL AND NOT EXISTS (
+        SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('audit')
+    ) THEN
+        ALTER TABLE audit RENAME TO audit_unpartitioned;
+        IF EXISTS (
+            SELECT 1 FROM pg_constraint
+            WHERE conname = 'audit_pkey' AND conrelid = 'audit_unpartitioned'::regclass
+        ) THEN
+            ALTER TABLE audit_unpartitioned RENAME CONSTRAINT audit_pkey TO audit_unpartitioned_pkey;
+        END IF;
+        ALTER SEQUENCE IF EXISTS audit_audit_id_seq RENAME TO audit_unpartitioned_audit_id_seq;
+        DROP INDEX IF EXISTS idx_audit_audit_id, idx_audit_pipeline_start,
+            idx_audit_untransformed, idx_audit_status_start;
+    END IF;
+END $$;
+
 CREATE TABLE IF NOT EXISTS audit (
-    audit_id SERIAL PRIMARY KEY,
+    audit_id SERIAL,
     pipeline_id INT REFERENCES controller(id),    -- Link den bang Controller
-    status VARCHAR(50) NOT NULL,                  -- 'success', 'failed', 'running'
+    status VARCHAR(50) NOT NULL,                  -- 'completed', 'failed', 'running', 'skipped', 'timeout'
     records_processed INT,                        -- So ban ghi da xu ly
-    start_time TIMESTAMP,                         -- Thoi gian bat dau
+    start_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP, -- Thoi gian bat dau (khoa phan vung)
     end_time TIMESTAMP,                           -- Thoi gian ket thuc
     error_message TEXT,                           -- Thong bao loi neu that bai
+    metrics JSONB,                                -- Chi so bo sung (data quality, ...)
+    source_fingerprint TEXT,                      -- Fingerprint cua nguon S3 (key, ETag, size)
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (audit_id, start_time)
+) PARTITION BY RANGE (start_time);
+
+-- Phan vung mac dinh cho du lieu ngoai cac thang da tao
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'audit'::regclass) THEN
+        CREATE TABLE IF NOT EXISTS audit_default PARTITION OF audit DEFAULT;
+    END IF;
+END $$;
+
+ALTER TABLE audit ADD COLUMN IF NOT EXISTS metrics JSONB;
+ALTER TABLE audit ADD COLUMN IF NOT EXISTS source_fingerprint TEXT;
+ALTER TABLE audit ADD COLUMN IF NOT EXISTS worker_id TEXT;     -- Worker da chay pipeline (src.worker)
+ALTER TABLE audit ADD COLUMN IF NOT EXISTS transformed BOOLEAN; -- FALSE: da load nhung dbt phia sau chua chay thanh cong
+
+CREATE INDEX IF NOT EXISTS idx_audit_audit_id ON audit (audit_id);
+CREATE INDEX IF NOT EXISTS idx_audit_pipeline_start ON audit (pipeline_id, start_time DESC);
+CREATE INDEX IF NOT EXISTS idx_audit_untransformed ON audit (pipeline_id) WHERE transformed = FALSE;
+CREATE INDEX IF NOT EXISTS idx_audit_status_start ON audit (status, start_time);
+
+-- Tao phan vung thang cho audit tu thang hien tai den months_ahead thang toi
+-- Ban ghi cua thang moi dang nam trong phan vung mac dinh duoc chuyen sang:
+-- tach phan vung mac dinh, tao phan vung thang, chuyen ban ghi roi gan lai
+CREATE OR REPLACE FUNCTION ensure_audit_partitions(months_ahead INT DEFAULT 1)
+RETURNS VOID AS $$
+DECLARE
+    month_start DATE;
+    month_end DATE;
+    partition_name TEXT;
+    move_rows BOOLEAN;
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'audit'::regclass) THEN
+        RETURN;
+    END IF;
+
+    FOR i IN 0..months_ahead LOOP
+        month_start := (date_trunc('month', CURRENT_DATE) + make_interval(months => i))::DATE;
+        month_end := (month_start + INTERVAL '1 month')::DATE;
+        partition_name := 'audit_' || to_char(month_start, 'YYYYMM');
+        IF to_regclass(partition_name) IS NULL THEN
+            move_rows := FALSE;
+            IF to_regclass('audit_default') IS NOT NULL THEN
+                move_rows := EXISTS (
+                    SELECT 1 FROM audit_default
+                    WHERE start_time >= month_start AND start_time < month_end
+                );
+            END IF;
+            IF move_rows THEN
+                ALTER TABLE audit DETACH PARTITION audit_default;
+            END IF;
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF audit FOR VALUES FROM (%L) TO (%L)',
+                partition_name, month_start, month_end
+            );
+            IF move_rows THEN
+                INSERT INTO audit
+                SELECT * FROM audit_default
+                WHERE start_time >= month_start AND start_time < month_end;
+                DELETE FROM audit_default
+                WHERE start_time >= month_start AND start_time < month_end;
+                ALTER TABLE audit ATTACH PARTITION audit_default DEFAULT;
+            END IF;
+        END IF;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Xoa cac phan vung thang cu hon retention_months thang, tra ve so phan vung da xoa
+CREATE OR REPLACE FUNCTION drop_expired_audit_partitions(retention_months INT)
+RETURNS INT AS $$
+DECLARE
+    cutoff DATE := (date_trunc('month', CURRENT_DATE) - make_interval(months => retention_months))::DATE;
+    partition RECORD;
+    dropped INT := 0;
+BEGIN
+    FOR partition IN
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'audit'::regclass
+          AND c.relname ~ '^audit_[0-9]{6}$'
+          AND to_date(substring(c.relname FROM 7), 'YYYYMM') < cutoff
+    LOOP
+        EXECUTE format('DROP TABLE %I', partition.relname);
+        dropped := dropped + 1;
+    END LOOP;
+
+    -- Ban ghi cu trong phan vung mac dinh (hoac bang khong phan vung)
+    DELETE FROM audit WHERE start_time < cutoff;
+
+    RETURN dropped;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT ensure_audit_partitions(1);
+
+-- Chep du lieu tu bang audit cu (xem khoi DO truoc CREATE TABLE audit) roi xoa bang cu
+DO $$
+DECLARE
+    column_list TEXT;
+BEGIN
+    IF to_regclass('audit_unpartitioned') IS NULL THEN
+        RETURN;
+    END IF;
+
+    SELECT string_agg(quote_ident(src.column_name), ', ' ORDER BY src.ordinal_position)
+    INTO column_list
+    FROM information_schema.columns src
+    JOIN information_schema.columns dst
+      ON dst.table_schema = src.table_schema
+     AND dst.table_name = 'audit'
+     AND dst.column_name = src.column_name
+    WHERE src.table_schema = current_schema()
+      AND src.table_name = 'audit_unpartitioned';
+
+    -- start_time la khoa phan vung nen khong duoc NULL
+    UPDATE audit_unpartitioned
+    SET start_time = COALESCE(created_at, CURRENT_TIMESTAMP)
+    WHERE start_time IS NULL;
+    EXECUTE format(
+        'INSERT INTO audit (%s) SELECT %s FROM audit_unpartitioned',
+        column_list, column_list
+    );
+    PERFORM setval(
+        pg_get_serial_sequence('audit', 'audit_id'),
+        COALESCE((SELECT MAX(audit_id) FROM audit), 0) + 1,
+        false
+    );
+    DROP TABLE audit_unpartitioned;
+END $$;
+
+-- Data quality rules, ap dung cho tung batch khi ingest
+CREATE TABLE IF NOT EXISTS dq_rules (
+    rule_id SERIAL PRIMARY KEY,
+    pipeline_id INT REFERENCES controller(id),    -- Link den bang Controller
+    rule_name TEXT NOT NULL,                      -- Ten rule, dung trong audit.metrics
+    rule_type TEXT NOT NULL,                      -- 'not_null', 'range', 'unique'
+    column_name TEXT NOT NULL,                    -- Cot kiem tra (unique: nhieu cot phan cach boi dau phay)
+    min_value NUMERIC,                            -- Gia tri nho nhat (range)
+    max_value NUMERIC,                            -- Gia tri lon nhat (range)
+    active BOOLEAN DEFAULT TRUE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Chi muc khoa nghiep vu da load, dung cho dedup giua cac file va cac lan chay
+CREATE TABLE IF NOT EXISTS dedup_key_index (
+    pipeline_id INT REFERENCES controller(id),
+    key_hash BIGINT NOT NULL,                     -- Hash 64-bit cua business_keys
+    audit_id INT,                                 -- Lan chay da load khoa nay
+    PRIMARY KEY (pipeline_id, key_hash)
+);
+
+-- Bloom filter kich thuoc co dinh cho moi pipeline, tranh tra cuu dedup_key_index
+CREATE TABLE IF NOT EXISTS dedup_bloom_filter (
+    pipeline_id INT PRIMARY KEY REFERENCES controller(id),
+    num_bits BIGINT NOT NULL,
+    num_hashes INT NOT NULL,
+    bits BYTEA NOT NULL,
+    key_count BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Ket qua tung model dbt, ghi ngay khi dbt bao model ket thuc (thoi gian UTC)
+CREATE TABLE IF NOT EXISTS dbt_model_runs (
+    run_id SERIAL PRIMARY KEY,
+    audit_id INT,                                 -- Lan chay pipeline (NULL cho dbt run tong)
+    invocation_id TEXT,                           -- invocation_id cua dbt
+    unique_id TEXT NOT NULL,                      -- Vi du: model.etl_project.slv_orders
+    model_name TEXT,
+    resource_type TEXT,
+    materialized TEXT,
+    status TEXT NOT NULL,                         -- 'success', 'error', 'skipped', ...
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP,
+    execution_time NUMERIC,                       -- Giay
+    rows_affected BIGINT,
+    message TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+CREATE INDEX IF NOT EXISTS idx_dbt_model_runs_model
+    ON dbt_model_runs (unique_id, finished_at);
+
+-- Hang doi pipeline cho nhieu worker (src.worker), claim bang FOR UPDATE SKIP LOCKED
+CREATE TABLE IF NOT EXISTS pipeline_queue (
+    queue_id SERIAL PRIMARY KEY,
+    run_label TEXT NOT NULL,                      -- Nhom cac pipeline cua mot lan enqueue
+    pipeline_id INT NOT NULL REFERENCES controller(id),
+    date_prefix TEXT,                             -- YYYYMMDD, NULL = khong loc theo ngay
+    load_type TEXT,                               -- Ghi de load_type cua controller (NULL = giu nguyen)
+    force BOOLEAN NOT NULL DEFAULT FALSE,
+    status TEXT NOT NULL DEFAULT 'pending',       -- 'pending', 'running', 'completed', 'failed'
+    attempts INT NOT NULL DEFAULT 0,
+    max_attempts INT NOT NULL DEFAULT 3,
+    worker_id TEXT,                               -- Worker dang giu pipeline
+    claimed_at TIMESTAMP,
+    heartbeat_at TIMESTAMP,                       -- Heartbeat qua han thi pipeline duoc claim lai
+    finished_at TIMESTAMP,
+    audit_id INT,                                 -- Ban ghi audit cua lan chay gan nhat
+    changed BOOLEAN,                              -- Nguon co thay doi (dbt can chay lai)
+    error_message TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Moi (pipeline, ngay) chi co mot muc dang cho hoac dang chay
+CREATE UNIQUE INDEX IF NOT EXISTS idx_pipeline_queue_active
+    ON pipeline_queue (pipeline_id, COALESCE(date_prefix, ''))
+    WHERE status IN ('pending', 'running');
+CREATE INDEX IF NOT EXISTS idx_pipeline_queue_status
+    ON pipeline_queue (status, date_prefix, queue_id);
+
+-- Khac biet schema giua nguon Parquet va bang landing, ghi lai moi lan load
+CREATE TABLE IF NOT EXISTS schema_drift_log (
+    drift_id SERIAL PRIMARY KEY,
+    pipeline_id INT REFERENCES controller(id),
+    audit_id INT,                                 -- Lan chay phat hien thay doi
+    table_name TEXT NOT NULL,                     -- Bang landing (schema public)
+    column_name TEXT NOT NULL,
+    change_type TEXT NOT NULL,                    -- 'add_column', 'widen_type', 'incompatible_type', 'missing_column'
+    old_type TEXT,                                -- Kieu hien tai trong bang
+    new_type TEXT,                                -- Kieu trong nguon
+    applied BOOLEAN NOT NULL,                     -- Da ALTER TABLE hay chua
+    detected_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_schema_drift_log_table
+    ON schema_drift_log (table_name, detected_at);
+
+-- Cau hinh ghi Parquet cho tung nguon trong lake (NULL = dung mac dinh)
+CREATE TABLE IF NOT EXISTS parquet_write_settings (
+    data_source TEXT PRIMARY KEY,                 -- Trung voi controller.data_source
+    compression TEXT DEFAULT 'snappy',            -- 'snappy', 'zstd', 'gzip', 'brotli', 'lz4', 'none'
+    compression_level INT,                        -- Muc nen (zstd, gzip, brotli)
+    row_group_rows INT,                           -- So dong moi row group, NULL = LAKE_ROW_GROUP_ROWS
+    page_size_bytes INT,                          -- Kich thuoc data page
+    use_dictionary BOOLEAN DEFAULT TRUE,          -- Ma hoa dictionary
+    dictionary_columns TEXT,                      -- Chi cac cot nay (phan cach boi dau phay), NULL = tat ca
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
 
-INSERT INTO controller (data_source, destination_table, source_table, schema_name, load_type, description) 
+INSERT INTO controller (data_source, destination_table, source_table, schema_name, load_type, description, select_columns, row_filter, business_keys, load_profile) 
 VALUES
-  ('customers', 'bro_customers','customers', 'bronze', 'full', 'Ingest raw customer data from S3'),
-  ('orders', 'bro_orders', 'orders', 'bronze', 'full', 'Ingest raw order data from S3')
-    
+  ('customers', 'bro_customers','customers', 'bronze', 'full', 'Ingest raw customer data from S3',
+   'customer_id,name,email,phone,address,created_at', NULL, 'customer_id', 'default'),
+  ('orders', 'bro_orders', 'orders', 'bronze', 'full', 'Ingest raw order data from S3',
+   'order_id,customer_id,product_name,quantity,price,order_date', NULL, 'order_id', 'bulk');
+
+-- order_date la thoi gian su kien: watermark tren cot nay lam mat don hang den tre
+UPDATE controller SET row_filter = NULL
+WHERE data_source = 'orders' AND row_filter = 'order_date >= {watermark}';
 
+INSERT INTO dq_rules (pipeline_id, rule_name, rule_type, column_name, min_value, max_value)
+SELECT c.id, r.rule_name, r.rule_type, r.column_name, r.min_value, r.max_value
+FROM controller c
+JOIN (VALUES
+  ('orders', 'orders_product_name_not_null', 'not_null', 'product_name', NULL::NUMERIC, NULL::NUMERIC),
+  ('orders', 'orders_quantity_not_null', 'not_null', 'quantity', NULL, NULL),
+  ('orders', 'orders_price_not_null', 'not_null', 'price', NULL, NULL),
+  ('orders', 'orders_quantity_range', 'range', 'quantity', 1, NULL),
+  ('orders', 'orders_price_range', 'range', 'price', 0, NULL),
+  ('orders', 'orders_order_id_unique', 'unique', 'order_id', NULL, NULL),
+  ('customers', 'customers_customer_id_unique', 'unique', 'customer_id', NULL, NULL)
+) AS r (data_source, rule_name, rule_type, column_name, min_value, max_value)
+  ON c.data_source = r.data_source
+WHERE NOT EXISTS (
+  SELECT 1 FROM dq_rules d WHERE d.pipeline_id = c.id AND d.rule_name = r.rule_name
+);
+
+INSERT INTO parquet_write_settings (data_source, compression, compression_level, row_group_rows, use_dictionary, dictionary_columns)
+VALUES
+  ('customers', 'snappy', NULL, NULL, TRUE, NULL),
+  ('orders', 'zstd', 3, NULL, TRUE, 'customer_id,product_name')
+ON CONFLICT (data_source) DO NOTHING;
\ No newline at end of file
@@ -0,0 +1,167 @@
+"""
+Backfill Module for ETL Metadata Framework
+------------------------------------------
+This module loads a range of date prefixes concurrently:
+1. Every (pipeline, date) pair becomes one unit of work on a bounded pool
+2. Units read and check their S3 files as soon as a worker is free
+3. Writes to each landing table happen strictly in date order, enforced by
+   a chain of landing gates per pipeline
+4. Progress, throughput and ETA are logged as units complete
+
+dbt is not run here; the caller runs it once over the union of loaded tables.
+"""
+
+import copy
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from src.deadline import PipelineTimeout
+
+logger = logging.getLogger(__name__)
+
+# Load type of the dates after the first: the files of the date are appended
+# without the {watermark} clause, which the previous date would have moved
+# past late or overlapping rows. business_keys dedup still applies, and cdc
+# pipelines still collapse their events
+BACKFILL_LOAD_TYPE = "append"
+
+
+class LandingGate:
+    """
+    Orders the landing of one table: a date may only write once the previous
+    date of the same pipeline has finished. If the previous date failed, the
+    chain is broken and later dates fail instead of landing out of order.
+    """
+
+    def __init__(self, previous=None):
+        self.previous = previous
+        self._done = threading.Event()
+        self.succeeded = False
+
+    def wait(self, timeout=None):
+        if self.previous is None:
+            return
+        if not self.previous._done.wait(timeout):
+            raise PipelineTimeout("Deadline passed waiting for the previous date")
+        if not self.previous.succeeded:
+            raise RuntimeError("Previous date for this table did not land")
+
+    def release(self, succeeded):
+        # A failed previous date also breaks every later link of the chain
+        if self.previous is not None and not self.previous.succeeded:
+            succeeded = False
+        self.succeeded = succeeded
+        self._done.set()
+
+
+def get_backfill_dates(date_from, date_to):
+    """Return the YYYYMMDD prefixes from date_from to date_to inclusive."""
+    start = datetime.strptime(date_from, "%Y%m%d")
+    end = datetime.strptime(date_to, "%Y%m%d")
+    if end < start:
+        raise ValueError("--to must not be earlier than --from")
+    return [
+        (start + timedelta(days=offset)).strftime("%Y%m%d")
+        for offset in range((end - start).days + 1)
+    ]
+
+
+def _format_duration(seconds):
+    return str(timedelta(seconds=int(seconds)))
+
+
+def run_backfill(pipeline_configs, dates, workers=4, force=False, run_deadline=None):
+    """
+    Load every pipeline for every date with at most `workers` units in flight.
+
+    The first date of each pipeline uses its configured load type; later dates
+    append (BACKFILL_LOAD_TYPE), so a full backfill ends with the union of the
+    range. Each unit
+    has the deadline of its pipeline, bounded by `run_deadline`.
+
+    Returns (success_count, failure_count, changed_tables).
+    """
+    from src.etl import process_pipeline
+
+    units = []
+    gates = {}
+    # Date-major order: earlier dates are always scheduled first, so a unit
+    # never waits on a gate whose owner has not been started
+    for index, date_prefix in enumerate(dates):
+        for pipeline_config in pipeline_configs:
+            unit_config = copy.deepcopy(pipeline_config)
+            if index > 0:
+                unit_config["load_type"] = BACKFILL_LOAD_TYPE
+            gate = LandingGate(gates.get(pipeline_config["id"]))
+            gates[pipeline_config["id"]] = gate
+            units.append((unit_config, date_prefix, gate))
+
+    total_units = len(units)
+    logger.info(
+        f"Backfill: {len(pipeline_configs)} pipelines x {len(dates)} dates "
+        f"({dates[0]}..{dates[-1]}) with {workers} workers"
+    )
+
+    def run_unit(unit_config, date_prefix, gate):
+        success = False
+        try:
+            success, error_msg = process_pipeline(
+                unit_config,
+                date_prefix,
+                skip_transform=True,
+                force=force,
+                landing_gate=gate,
+                run_deadline=run_deadline,
+            )
+            return success, error_msg
+        finally:
+            gate.release(success)
+
+    success_count = 0
+    failure_count = 0
+    changed_tables = set()
+    rows_loaded = 0
+    start_time = time.time()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(run_unit, unit_config, date_prefix, gate): (
+                unit_config,
+                date_prefix,
+            )
+            for unit_config, date_prefix, gate in units
+        }
+
+        for completed, future in enumerate(as_completed(futures), start=1):
+            unit_config, date_prefix = futures[future]
+            try:
+                success, error_msg = future.result()
+            except Exception as e:
+                success, error_msg = False, str(e)
+
+            if success:
+                success_count += 1
+                rows_loaded += unit_config.get("rows_loaded", 0)
+                if not unit_config.get("skipped"):
+                    changed_tables.add(unit_config["source_table"])
+            else:
+                failure_count += 1
+                outcome = "timed out" if unit_config.get("timed_out") else "failed"
+                logger.error(
+                    f"Backfill of pipeline {unit_config['id']} for {date_prefix} "
+                    f"{outcome}: {error_msg}"
+                )
+
+            elapsed = time.time() - start_time
+            remaining = (elapsed / completed) * (total_units - completed)
+            logger.info(
+                f"Backfill progress: {completed}/{total_units} "
+                f"({completed / total_units:.0%}), {rows_loaded} rows, "
+                f"{rows_loaded / elapsed if elapsed else 0:.0f} rows/s, "
+                f"elapsed {_format_duration(elapsed)}, "
+                f"ETA {_format_duration(remaining)}"
+            )
+
+    return success_count, failure_count, sorted(changed_tables)
@@ -0,0 +1,101 @@
+"""
+Bulk Load Module for ETL Metadata Framework
+-------------------------------------------
+This module implements the load profiles selectable per pipeline through
+controller.load_profile:
+1. default: load with the session defaults (previous behaviour)
+2. bulk: tune the load session (synchronous_commit, maintenance_work_mem,
+   work_mem), drop secondary indexes around large loads and rebuild them
+   afterwards, then ANALYZE the landing table so dbt plans against fresh
+   statistics
+
+All statements run on the connection used for the load, so settings are
+scoped with SET LOCAL and index changes commit or roll back with the data.
+"""
+
+import logging
+from src.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+LOAD_PROFILES = ("default", "bulk")
+
+
+def get_load_profile(pipeline_config):
+    profile = (pipeline_config.get("load_profile") or "default").lower()
+    if profile not in LOAD_PROFILES:
+        logger.warning(f"Unknown load profile '{profile}', using 'default'")
+        return "default"
+    return profile
+
+
+def apply_bulk_session_settings(conn):
+    """Apply the bulk-load session settings for the current transaction."""
+    from sqlalchemy import text
+
+    settings = get_settings()
+    session_settings = {
+        "synchronous_commit": settings["bulk_synchronous_commit"],
+        "maintenance_work_mem": settings["bulk_maintenance_work_mem"],
+        "work_mem": settings["bulk_work_mem"],
+    }
+    for name, value in session_settings.items():
+        conn.execute(
+            text("SELECT set_config(:name, :value, true)"),
+            {"name": name, "value": value},
+        )
+    logger.info(
+        "Bulk load session: "
+        + ", ".join(f"{name}={value}" for name, value in session_settings.items())
+    )
+
+
+def drop_secondary_indexes(conn, schema, table):
+    """
+    Drop the indexes of a table that do not back a constraint.
+
+    Returns their definitions so rebuild_indexes can recreate them.
+    """
+    from sqlalchemy import text
+
+    qualified_name = f"{schema}.{table}"
+    exists = conn.execute(
+        text("SELECT to_regclass(:name)"), {"name": qualified_name}
+    ).scalar()
+    if not exists:
+        return []
+
+    rows = conn.execute(
+        text("""
+            SELECT i.indexrelid::regclass::text AS index_name,
+                   pg_get_indexdef(i.indexrelid) AS index_def
+            FROM pg_index i
+            WHERE i.indrelid = to_regclass(:name)
+              AND NOT i.indisprimary
+              AND NOT EXISTS (
+                  SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid
+              )
+            """),
+        {"name": qualified_name},
+    ).fetchall()
+
+    for index_name, _ in rows:
+        logger.info(f"Dropping index {index_name} for bulk load")
+        conn.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+
+    return [index_def for _, index_def in rows]
+
+
+def rebuild_indexes(conn, index_defs):
+    from sqlalchemy import text
+
+    for index_def in index_defs:
+        logger.info(f"Rebuilding index: {index_def}")
+        conn.execute(text(index_def))
+
+
+def analyze_table(conn, schema, table):
+    from sqlalchemy import text
+
+    logger.info(f"Analyzing {schema}.{table}")
+    conn.execute(text(f"ANALYZE {schema}.{table}"))
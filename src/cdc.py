@@ -0,0 +1,167 @@
+"""
+CDC Module for ETL Metadata Framework
+-------------------------------------
+This module implements the `cdc` load type for sources that publish change
+events instead of snapshots:
+1. Every event carries its operation (controller.cdc_op_column, default
+   `op`), an ordering column (controller.cdc_order_column) and the
+   business_keys of the row it changes
+2. The events of a load are collapsed to the latest event per key with one
+   stable sort and drop_duplicates
+3. The changed keys are staged in a temporary table and removed from the
+   landing table with one DELETE joined on the keys; the latest rows are
+   then inserted in bulk
+
+Insert, update and snapshot operations (I/U/C/R) become upserts; D replaces
+the key with a tombstone: the delete event itself with _deleted set, so the
+dbt models downstream can remove the key in their incremental runs (every
+landing table has the column, false for ordinary rows). The DELETE uses an
+index on the business keys, so a load costs in proportion to its changes
+rather than to the table. A full load of a cdc pipeline rebuilds the table
+from the collapsed events, tombstones included.
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OP_COLUMN = "op"
+
+DELETE_OPS = {"d", "delete"}
+UPSERT_OPS = {"i", "u", "c", "r", "insert", "update", "create", "read", "snapshot"}
+
+# Marks the tombstones of deleted keys in the landing table
+TOMBSTONE_COLUMN = "_deleted"
+
+
+def is_cdc_pipeline(pipeline_config):
+    """
+    A pipeline reads change events when its load type is cdc or it declares
+    an ordering column (so a full reload still collapses the events).
+    """
+    return pipeline_config["load_type"].lower() == "cdc" or bool(
+        pipeline_config.get("cdc_order_column")
+    )
+
+
+def incremental_load_type(pipeline_config):
+    """Load type of an incremental load of a pipeline: cdc stays cdc."""
+    return "cdc" if is_cdc_pipeline(pipeline_config) else "incremental"
+
+
+def get_cdc_columns(pipeline_config):
+    """Return (op_column, order_column, keys) of a cdc pipeline."""
+    from src.parquet_reader import parse_column_list
+
+    keys = parse_column_list(pipeline_config.get("business_keys"))
+    order_column = pipeline_config.get("cdc_order_column")
+    if not keys:
+        raise ValueError("A cdc pipeline needs business_keys to identify rows")
+    if not order_column:
+        raise ValueError("A cdc pipeline needs a cdc_order_column")
+    return (
+        pipeline_config.get("cdc_op_column") or DEFAULT_OP_COLUMN,
+        order_column,
+        keys,
+    )
+
+
+def is_delete_event(df, op_column):
+    """Return a boolean Series marking the delete events of a batch."""
+    if op_column not in df.columns:
+        raise ValueError(f"Change events have no '{op_column}' column")
+    ops = df[op_column].astype("string").str.strip().str.lower()
+    unknown = ops[~ops.isin(DELETE_OPS | UPSERT_OPS)].dropna().unique()
+    if len(unknown) or ops.isna().any():
+        shown = ", ".join(sorted(str(op) for op in unknown)[:5]) or "NULL"
+        raise ValueError(f"Unknown change operations in '{op_column}': {shown}")
+    return ops.isin(DELETE_OPS).astype(bool)
+
+
+def collapse_change_events(df, op_column, order_column, keys):
+    """
+    Keep the latest event of every key.
+
+    Returns the rows to insert (without the op column; the latest event of a
+    deleted key is kept as a tombstone with TOMBSTONE_COLUMN set), the
+    changed keys and the counts stored in audit.metrics["cdc"].
+    """
+    missing = [column for column in [order_column] + keys if column not in df.columns]
+    if missing:
+        raise ValueError(f"Change events have no column {', '.join(missing)}")
+
+    events = df.assign(**{TOMBSTONE_COLUMN: is_delete_event(df, op_column)})
+    # mergesort is stable: events with the same ordering value keep file order
+    latest = events.sort_values(
+        order_column, kind="mergesort", na_position="first"
+    ).drop_duplicates(keys, keep="last")
+
+    deletes = int(latest[TOMBSTONE_COLUMN].sum())
+    stats = {
+        "events": len(df),
+        "keys_changed": len(latest),
+        "upserts": len(latest) - deletes,
+        "deletes": deletes,
+    }
+    logger.info(
+        f"Collapsed {stats['events']} change events into {stats['upserts']} "
+        f"upserts and {stats['deletes']} deletes"
+    )
+    rows = latest.drop(columns=[op_column]).reset_index(drop=True)
+    return rows, latest[keys].reset_index(drop=True), stats
+
+
+def ensure_key_index(conn, schema, table, keys):
+    """Index the business keys the DELETE of a cdc load joins on."""
+    from sqlalchemy import text
+
+    conn.execute(
+        text(
+            f"CREATE INDEX IF NOT EXISTS {table}_cdc_keys_idx "
+            f"ON {schema}.{table} ({', '.join(keys)})"
+        )
+    )
+
+
+def delete_changed_keys(conn, schema, table, changed_keys, keys):
+    """
+    Remove every changed key from the landing table with one DELETE joined
+    on a staged copy of the keys. Returns the number of rows deleted.
+    """
+    from sqlalchemy import text
+
+    qualified_name = f"{schema}.{table}"
+    exists = conn.execute(
+        text("SELECT to_regclass(:name)"), {"name": qualified_name}
+    ).scalar()
+    if not exists or changed_keys.empty:
+        return 0
+
+    stage = f"_cdc_stage_{table}"
+    key_list = ", ".join(keys)
+    # Same key types as the landing table; dropped with the load transaction
+    conn.execute(
+        text(
+            f"CREATE TEMP TABLE {stage} ON COMMIT DROP AS "
+            f"SELECT {key_list} FROM {qualified_name} WITH NO DATA"
+        )
+    )
+    changed_keys.to_sql(
+        name=stage,
+        con=conn,
+        if_exists="append",
+        index=False,
+        chunksize=1000,
+        method="multi",
+    )
+    conn.execute(text(f"ANALYZE {stage}"))
+
+    join = " AND ".join(f"t.{key} = s.{key}" for key in keys)
+    deleted = conn.execute(
+        text(f"DELETE FROM {qualified_name} AS t USING {stage} AS s WHERE {join}")
+    ).rowcount
+    logger.info(
+        f"Deleted {deleted} rows of {len(changed_keys)} changed keys "
+        f"from {qualified_name}"
+    )
+    return deleted
@@ -0,0 +1,131 @@
+"""
+Configuration Module for ETL Metadata Framework
+-----------------------------------------------
+This module resolves runtime configuration for the framework modules:
+1. Loading the .env file once per process
+2. Exposing environment settings (AWS, PostgreSQL, email, dbt) as a dict
+3. Configuring logging for the command line entry points
+
+Nothing here runs at import time, so importing a framework module stays cheap
+and does not fail when optional settings (e.g. email) are missing.
+"""
+
+import os
+import logging
+from functools import lru_cache
+
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+
+def configure_logging(level=logging.INFO):
+    """Configure root logging for command line entry points."""
+    logging.basicConfig(
+        level=level,
+        format=LOG_FORMAT,
+        handlers=[logging.StreamHandler()],
+    )
+
+
+def _split_list(value):
+    if not value:
+        return []
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def _to_int(value, default=None):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _to_bool(value, default=False):
+    if value is None or not value.strip():
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+@lru_cache(maxsize=None)
+def get_settings():
+    """
+    Load the .env file and return the resolved settings.
+
+    The result is cached, so the environment is read only once per process.
+    """
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    return {
+        "aws_access_key_id": os.getenv("AWS_ACCESS_KEY_ID"),
+        "aws_secret_access_key": os.getenv("AWS_SECRET_ACCESS_KEY"),
+        "aws_bucket_name": os.getenv("AWS_BUCKET_NAME"),
+        "aws_region": os.getenv("AWS_REGION"),
+        "db_host": os.getenv("POSTGRES_HOST"),
+        "db_port": os.getenv("POSTGRES_PORT"),
+        "db_name": os.getenv("POSTGRES_DATABASE"),
+        "db_user": os.getenv("POSTGRES_USER"),
+        "db_password": os.getenv("POSTGRES_PASSWORD"),
+        "email_host": os.getenv("EMAIL_HOST"),
+        "email_port": _to_int(os.getenv("EMAIL_PORT"), 587),
+        "email_user": os.getenv("EMAIL_USER"),
+        "email_password": os.getenv("EMAIL_PASSWORD"),
+        "email_recipients": _split_list(os.getenv("EMAIL_RECIPIENTS")),
+        "dbt_project_dir": os.getenv(
+            "DBT_PROJECT_DIR", os.path.join(os.getcwd(), "dbt_project")
+        ),
+        # 2^23 bits (1 MiB) keeps ~1M keys at ~2% false positives with 4 hashes
+        "dedup_bloom_bits": _to_int(os.getenv("DEDUP_BLOOM_BITS"), 2**23),
+        "dedup_bloom_hashes": _to_int(os.getenv("DEDUP_BLOOM_HASHES"), 4),
+        "audit_retention_months": _to_int(os.getenv("AUDIT_RETENTION_MONTHS"), 12),
+        "regression_window": _to_int(os.getenv("REGRESSION_WINDOW"), 20),
+        "regression_min_runs": _to_int(os.getenv("REGRESSION_MIN_RUNS"), 5),
+        "regression_factor": float(os.getenv("REGRESSION_FACTOR", "1.5")),
+        "bulk_synchronous_commit": os.getenv("BULK_SYNCHRONOUS_COMMIT", "off"),
+        "bulk_maintenance_work_mem": os.getenv("BULK_MAINTENANCE_WORK_MEM", "512MB"),
+        "bulk_work_mem": os.getenv("BULK_WORK_MEM", "64MB"),
+        "bulk_index_rebuild_min_rows": _to_int(
+            os.getenv("BULK_INDEX_REBUILD_MIN_ROWS"), 100000
+        ),
+        "lake_layout": os.getenv("LAKE_LAYOUT", "flat"),
+        "lake_target_file_bytes": _to_int(os.getenv("LAKE_TARGET_FILE_MB"), 128)
+        * 1024
+        * 1024,
+        "lake_row_group_rows": _to_int(os.getenv("LAKE_ROW_GROUP_ROWS"), 250000),
+        "arrow_max_input_bytes": _to_int(os.getenv("ARROW_MAX_INPUT_MB"), 256)
+        * 1024
+        * 1024,
+        "s3_cache_dir": os.path.expanduser(
+            os.getenv("S3_CACHE_DIR", os.path.join("~", ".cache", "etl_metadata", "s3"))
+        ),
+        "s3_cache_max_bytes": _to_int(os.getenv("S3_CACHE_MAX_MB"), 0) * 1024 * 1024,
+        "s3_initial_concurrency": _to_int(os.getenv("S3_INITIAL_CONCURRENCY"), 8),
+        "s3_min_concurrency": _to_int(os.getenv("S3_MIN_CONCURRENCY"), 2),
+        "s3_max_concurrency": _to_int(os.getenv("S3_MAX_CONCURRENCY"), 32),
+        "s3_max_retries": _to_int(os.getenv("S3_MAX_RETRIES"), 5),
+        "memory_profiling": _to_bool(os.getenv("MEMORY_PROFILING")),
+        "memory_sample_interval_ms": _to_int(
+            os.getenv("MEMORY_SAMPLE_INTERVAL_MS"), 100
+        ),
+        "memory_tracemalloc_top": _to_int(os.getenv("MEMORY_TRACEMALLOC_TOP"), 0),
+        "dbt_timeout_seconds": _to_int(os.getenv("DBT_TIMEOUT_SECONDS"), 7200),
+        "worker_heartbeat_seconds": _to_int(os.getenv("WORKER_HEARTBEAT_SECONDS"), 15),
+        "worker_stale_seconds": _to_int(os.getenv("WORKER_STALE_SECONDS"), 90),
+        "worker_poll_seconds": _to_int(os.getenv("WORKER_POLL_SECONDS"), 5),
+        "worker_max_attempts": _to_int(os.getenv("WORKER_MAX_ATTEMPTS"), 3),
+        "pipeline_timeout_seconds": _to_int(os.getenv("PIPELINE_TIMEOUT_SECONDS"), 0),
+        "run_timeout_seconds": _to_int(os.getenv("RUN_TIMEOUT_SECONDS"), 0),
+        "pg_lock_timeout_seconds": _to_int(os.getenv("PG_LOCK_TIMEOUT_SECONDS"), 60),
+        "s3_connect_timeout_seconds": _to_int(
+            os.getenv("S3_CONNECT_TIMEOUT_SECONDS"), 10
+        ),
+        "s3_read_timeout_seconds": _to_int(os.getenv("S3_READ_TIMEOUT_SECONDS"), 60),
+    }
+
+
+def get_db_url():
+    settings = get_settings()
+    return (
+        f"postgresql://{settings['db_user']}:{settings['db_password']}"
+        f"@{settings['db_host']}:{settings['db_port']}/{settings['db_name']}"
+    )
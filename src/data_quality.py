@@ -0,0 +1,126 @@
+"""
+Data Quality Module for ETL Metadata Framework
+----------------------------------------------
+This module applies the data quality rules stored in the dq_rules table to
+each batch read during ingestion:
+1. not_null: the column must have a value
+2. range: the column must lie within [min_value, max_value] (nulls pass)
+3. unique: the column (or comma-separated columns) must not repeat within the
+   load, including across batches of the same load; a cdc load checks them
+   once on the collapsed rows, where each key appears once
+
+All checks are vectorized over the batch. Rows that fail any rule are routed
+to the quarantine table instead of the landing table.
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+FAILED_RULES_COLUMN = "_failed_rules"
+
+
+def new_quality_state():
+    """Create the state shared by all batches of one load (unique key hashes)."""
+    return {"seen_keys": {}}
+
+
+def _rule_columns(rule):
+    return [column.strip() for column in rule["column_name"].split(",")]
+
+
+def _evaluate_rule(df, rule, state, eligible):
+    """
+    Return a boolean Series that is True for rows violating the rule.
+
+    Only eligible rows (those passing the other rules) register their keys for
+    unique rules, so a rejected row never shadows a later valid one.
+    """
+    import numpy as np
+    import pandas as pd
+
+    columns = _rule_columns(rule)
+    missing = [column for column in columns if column not in df.columns]
+    if missing:
+        logger.warning(
+            f"Rule '{rule['rule_name']}' skipped, missing columns: {', '.join(missing)}"
+        )
+        return pd.Series(False, index=df.index)
+
+    rule_type = rule["rule_type"]
+
+    if rule_type == "not_null":
+        return df[columns].isna().any(axis=1)
+
+    if rule_type == "range":
+        values = pd.to_numeric(df[columns[0]], errors="coerce")
+        violations = pd.Series(False, index=df.index)
+        if rule.get("min_value") is not None:
+            violations |= values < float(rule["min_value"])
+        if rule.get("max_value") is not None:
+            violations |= values > float(rule["max_value"])
+        return violations
+
+    if rule_type == "unique":
+        hashes = pd.util.hash_pandas_object(df[columns], index=False)
+        seen = state["seen_keys"].get(rule["rule_id"])
+        eligible_mask = eligible.to_numpy()
+        duplicated = np.zeros(len(df), dtype=bool)
+        duplicated[eligible_mask] = hashes[eligible_mask].duplicated(keep="first")
+        violations = pd.Series(duplicated, index=df.index)
+        if seen is not None and len(seen):
+            violations |= hashes.isin(seen)
+        new_keys = hashes[~violations & eligible].to_numpy()
+        state["seen_keys"][rule["rule_id"]] = (
+            new_keys if seen is None else np.union1d(seen, new_keys)
+        )
+        return violations
+
+    logger.warning(f"Unknown rule type '{rule_type}' for rule '{rule['rule_name']}'")
+    return pd.Series(False, index=df.index)
+
+
+def apply_quality_rules(df, rules, state, rule_counts=None):
+    """
+    Split a batch into valid and quarantined rows.
+
+    Parameters:
+    -----------
+    df : pandas.DataFrame
+        Batch read from the source
+    rules : list
+        Rules from get_quality_rules
+    state : dict
+        State from new_quality_state, shared by all batches of a load
+    rule_counts : dict, optional
+        Per-rule violation counts, updated in place
+
+    Returns the valid rows, the quarantined rows (with a _failed_rules column)
+    and the per-rule counts.
+    """
+    import pandas as pd
+
+    if rule_counts is None:
+        rule_counts = {}
+
+    if not rules or df.empty:
+        return df, df.iloc[0:0], rule_counts
+
+    failed_rules = pd.Series("", index=df.index)
+    any_failure = pd.Series(False, index=df.index)
+
+    # Unique rules run last so they only see rows that passed the other rules
+    for rule in sorted(rules, key=lambda r: r["rule_type"] == "unique"):
+        violations = _evaluate_rule(df, rule, state, ~any_failure)
+        count = int(violations.sum())
+        rule_counts[rule["rule_name"]] = rule_counts.get(rule["rule_name"], 0) + count
+        if count:
+            any_failure |= violations
+            failed_rules = failed_rules.where(
+                ~violations, failed_rules + rule["rule_name"] + ","
+            )
+
+    quarantined = df[any_failure].copy()
+    quarantined[FAILED_RULES_COLUMN] = failed_rules[any_failure].str.rstrip(",")
+
+    return df[~any_failure], quarantined, rule_counts
@@ -0,0 +1,226 @@
+"""
+dbt Runner Module for ETL Metadata Framework
+--------------------------------------------
+This module runs dbt as a subprocess and follows its structured output live:
+1. dbt is started with `--log-format json`; stdout and stderr are merged and
+   read line by line, so nothing is buffered until the process exits
+2. Every JSON event is logged at its dbt level, and events carrying node
+   information are folded into per-model start/finish records
+3. Each finished model is passed to a callback (stored in dbt_model_runs)
+   as soon as dbt reports it
+4. A watchdog terminates dbt after DBT_TIMEOUT_SECONDS, then kills it if it
+   does not exit within a grace period
+
+Lines that are not JSON (e.g. a crash before dbt configured its logger) are
+logged as they are.
+"""
+
+import json
+import time
+import logging
+import subprocess
+import threading
+from collections import deque
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+# Node statuses reported once a node is done
+FINISHED_STATUSES = {
+    "success",
+    "error",
+    "skipped",
+    "fail",
+    "warn",
+    "pass",
+    "runtime error",
+}
+
+TERMINATE_GRACE_SECONDS = 10
+
+# Error lines kept for the failure message
+ERROR_TAIL_LINES = 20
+
+_LEVELS = {
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "warn": logging.WARNING,
+    "error": logging.ERROR,
+}
+
+
+def parse_dbt_log_line(line):
+    """Return the decoded JSON event of a dbt log line, or None."""
+    line = line.strip()
+    if not line.startswith("{"):
+        return None
+    try:
+        event = json.loads(line)
+    except ValueError:
+        return None
+    return event if isinstance(event, dict) and "info" in event else None
+
+
+def _parse_timestamp(value):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+
+class DbtRunMonitor:
+    """Folds dbt JSON events into per-model runs."""
+
+    def __init__(self, on_model_finished=None):
+        self.on_model_finished = on_model_finished
+        self.invocation_id = None
+        self.models = {}
+        self.errors = deque(maxlen=ERROR_TAIL_LINES)
+
+    def handle_event(self, event):
+        info = event.get("info", {})
+        data = event.get("data") or {}
+        self.invocation_id = self.invocation_id or info.get("invocation_id")
+
+        level = info.get("level", "info")
+        message = info.get("msg")
+        if level in ("warn", "error") and message:
+            self.errors.append(message)
+        if message and level != "debug":
+            logger.log(_LEVELS.get(level, logging.INFO), f"dbt: {message}")
+
+        node_info = data.get("node_info")
+        if node_info and node_info.get("unique_id"):
+            self._update_model(node_info, data)
+
+    def _update_model(self, node_info, data):
+        unique_id = node_info["unique_id"]
+        model = self.models.setdefault(
+            unique_id,
+            {
+                "unique_id": unique_id,
+                "name": node_info.get("node_name"),
+                "resource_type": node_info.get("resource_type"),
+                "materialized": node_info.get("materialized"),
+                "status": "started",
+                "started_at": None,
+                "finished_at": None,
+                "execution_time": None,
+                "rows_affected": None,
+                "message": None,
+                "reported": False,
+            },
+        )
+        model["started_at"] = model["started_at"] or _parse_timestamp(
+            node_info.get("node_started_at")
+        )
+
+        run_result = data.get("run_result") or {}
+        execution_time = data.get("execution_time", run_result.get("execution_time"))
+        if execution_time is not None:
+            model["execution_time"] = round(float(execution_time), 3)
+        rows = (run_result.get("adapter_response") or {}).get("rows_affected")
+        if rows is not None:
+            model["rows_affected"] = rows
+        if run_result.get("message"):
+            model["message"] = run_result["message"]
+
+        status = (data.get("status") or node_info.get("node_status") or "").lower()
+        if status not in FINISHED_STATUSES:
+            return
+        model["status"] = status
+        model["finished_at"] = _parse_timestamp(
+            node_info.get("node_finished_at")
+        ) or datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+        if model["execution_time"] is None and model["started_at"]:
+            model["execution_time"] = round(
+                (model["finished_at"] - model["started_at"]).total_seconds(), 3
+            )
+
+        # dbt reports a finished node in more than one event; report it once
+        if not model["reported"]:
+            model["reported"] = True
+            if self.on_model_finished:
+                self.on_model_finished(self.invocation_id, model)
+
+    def summary(self):
+        """Return the per-run summary stored in audit.metrics["dbt"]."""
+        finished = [m for m in self.models.values() if m["reported"]]
+        slowest = sorted(
+            finished, key=lambda m: m["execution_time"] or 0, reverse=True
+        )[:5]
+        return {
+            "invocation_id": self.invocation_id,
+            "models_total": len(self.models),
+            "models_finished": len(finished),
+            "models_failed": sum(
+                1 for m in finished if m["status"] in ("error", "fail", "runtime error")
+            ),
+            "slowest_models": [
+                {"name": m["name"], "execution_time": m["execution_time"]}
+                for m in slowest
+            ],
+            "unfinished_models": [
+                m["name"] for m in self.models.values() if not m["reported"]
+            ],
+        }
+
+
+def _watchdog(process, timeout, timed_out):
+    if process.poll() is not None:
+        return
+    timed_out.set()
+    logger.error(f"dbt did not finish within {timeout}s, terminating it")
+    process.terminate()
+    try:
+        process.wait(TERMINATE_GRACE_SECONDS)
+    except subprocess.TimeoutExpired:
+        logger.error("dbt ignored SIGTERM, killing it")
+        process.kill()
+
+
+def stream_dbt(dbt_cmd, timeout=None, on_model_finished=None):
+    """
+    Run a dbt command with JSON logs and follow its output until it exits.
+
+    Returns (returncode, timed_out, monitor).
+    """
+    monitor = DbtRunMonitor(on_model_finished)
+    started = time.monotonic()
+    process = subprocess.Popen(
+        dbt_cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        bufsize=1,
+    )
+
+    timed_out = threading.Event()
+    timer = None
+    if timeout:
+        timer = threading.Timer(timeout, _watchdog, (process, timeout, timed_out))
+        timer.daemon = True
+        timer.start()
+
+    try:
+        for line in process.stdout:
+            event = parse_dbt_log_line(line)
+            if event is not None:
+                monitor.handle_event(event)
+            elif line.strip():
+                logger.info(f"dbt: {line.rstrip()}")
+        returncode = process.wait()
+    finally:
+        if timer is not None:
+            timer.cancel()
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+
+    logger.info(
+        f"dbt exited with code {returncode} after " f"{time.monotonic() - started:.1f}s"
+    )
+    return returncode, timed_out.is_set(), monitor
@@ -0,0 +1,174 @@
+"""
+Deadline Module for ETL Metadata Framework
+------------------------------------------
+This module bounds how long a pipeline may run so one stuck pipeline cannot
+stall the others:
+1. Every pipeline gets a deadline from controller.timeout_seconds (default
+   PIPELINE_TIMEOUT_SECONDS), counted from its start; a run may also have a
+   deadline (RUN_TIMEOUT_SECONDS or --run-timeout) and a pipeline never
+   outlives the run it belongs to
+2. The deadline is enforced cooperatively at the calls that can block: S3
+   clients have connect and read timeouts, the load transaction sets
+   statement_timeout and lock_timeout, dbt is terminated when the time is up
+   and the pipeline checks the deadline between phases
+3. A pipeline that runs out of time stops with PipelineTimeout and is
+   recorded as 'timeout' in the audit table; the run continues with the
+   next pipelines
+4. A deadline can also be ended early with expire(), e.g. by a worker whose
+   queue claim was taken over, which stops the pipeline the same way
+
+Pipelines that have not started when the run deadline passes are recorded as
+'timeout' without doing any work.
+"""
+
+import math
+import time
+import logging
+from src.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# query_canceled (statement_timeout) and lock_not_available (lock_timeout)
+TIMEOUT_SQLSTATES = {"57014", "55P03"}
+
+
+class PipelineTimeout(TimeoutError):
+    """Raised when a pipeline runs past its deadline."""
+
+
+class ClaimLost(PipelineTimeout):
+    """Raised when a worker no longer holds the queue entry it is loading."""
+
+
+class Deadline:
+    """
+    A point in time after which work must stop. `seconds` of None or 0 means
+    no limit; with a `parent` (the run deadline) the earlier one applies,
+    also when the parent is expired later on.
+    """
+
+    def __init__(self, seconds=None, label="pipeline", parent=None):
+        self.label = label
+        self.seconds = seconds or None
+        self.parent = parent
+        self.reason = None
+        self.expires_at = None
+        if self.seconds:
+            self.expires_at = time.monotonic() + self.seconds
+
+    def _first(self):
+        # This deadline or the parent that expires first
+        first, parent = self, self.parent
+        while parent is not None:
+            if parent.expires_at is not None and (
+                first.expires_at is None or parent.expires_at < first.expires_at
+            ):
+                first = parent
+            parent = parent.parent
+        return first
+
+    def remaining(self):
+        """Seconds left, or None without a deadline."""
+        expires_at = self._first().expires_at
+        if expires_at is None:
+            return None
+        return max(0.0, expires_at - time.monotonic())
+
+    def expire(self, reason):
+        """End the deadline now; check() then raises with `reason`."""
+        self.reason = reason
+        self.expires_at = time.monotonic()
+
+    def expired(self):
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def check(self, phase):
+        """Raise PipelineTimeout if the deadline passed before `phase`."""
+        if self.expired():
+            first = self._first()
+            if first.reason:
+                raise PipelineTimeout(f"{first.label} {first.reason} before {phase}")
+            raise PipelineTimeout(
+                f"{first.label} exceeded its deadline of {first.seconds}s before {phase}"
+            )
+
+    def cap(self, seconds):
+        """
+        Bound a timeout in seconds (None or 0: no timeout) by the time left.
+        Returns whole seconds, at least 1 while the deadline has not passed.
+        """
+        remaining = self.remaining()
+        if remaining is None:
+            return seconds
+        remaining = max(1, math.ceil(remaining))
+        return min(seconds, remaining) if seconds else remaining
+
+
+def get_run_deadline(seconds=None):
+    """Deadline of a whole run; `seconds` defaults to RUN_TIMEOUT_SECONDS."""
+    if seconds is None:
+        seconds = get_settings()["run_timeout_seconds"]
+    if seconds:
+        logger.info(f"Run deadline: {seconds}s")
+    return Deadline(seconds, label="Run")
+
+
+def get_pipeline_deadline(pipeline_config, run_deadline=None):
+    """Deadline of a pipeline, starting now and bounded by the run deadline."""
+    seconds = pipeline_config.get("timeout_seconds")
+    if seconds is None:
+        seconds = get_settings()["pipeline_timeout_seconds"]
+    return Deadline(
+        seconds,
+        label=f"Pipeline {pipeline_config['id']}",
+        parent=run_deadline,
+    )
+
+
+def apply_transaction_timeouts(conn, deadline):
+    """
+    Set statement_timeout and lock_timeout for the current transaction: no
+    statement may run past the deadline, and a lock is waited for at most
+    PG_LOCK_TIMEOUT_SECONDS.
+    """
+    from sqlalchemy import text
+
+    timeouts = {
+        "statement_timeout": deadline.cap(None),
+        "lock_timeout": deadline.cap(get_settings()["pg_lock_timeout_seconds"]),
+    }
+    for name, seconds in timeouts.items():
+        if not seconds:
+            continue
+        conn.execute(
+            text("SELECT set_config(:name, :value, true)"),
+            {"name": name, "value": f"{int(seconds * 1000)}ms"},
+        )
+    logger.info(
+        "Load transaction timeouts: "
+        + ", ".join(
+            f"{name}={f'{seconds}s' if seconds else 'none'}"
+            for name, seconds in timeouts.items()
+        )
+    )
+
+
+def is_timeout_error(error):
+    """
+    True for a missed deadline, a Postgres statement or lock timeout and an
+    S3 connect or read timeout, also when wrapped by SQLAlchemy or re-raised
+    from one.
+    """
+    from botocore.exceptions import ConnectTimeoutError, ReadTimeoutError
+
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(error, (TimeoutError, ConnectTimeoutError, ReadTimeoutError)):
+            return True
+        for candidate in (error, getattr(error, "orig", None)):
+            if getattr(candidate, "pgcode", None) in TIMEOUT_SQLSTATES:
+                return True
+        error = error.__cause__
+    return False
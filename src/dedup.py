@@ -0,0 +1,203 @@
+"""
+Deduplication Module for ETL Metadata Framework
+-----------------------------------------------
+This module drops rows whose business key has already been loaded, within a
+file, across files of the same load and across runs:
+1. Business keys are hashed to 64-bit values per batch (vectorized)
+2. A fixed-size Bloom filter answers "definitely new" for most keys
+3. Bloom filter hits are confirmed against the exact key index in the
+   metadata store (dedup_key_index), so false positives never drop rows
+
+The Bloom filter is persisted per pipeline (dedup_bloom_filter), so memory is
+bounded by its size and by the current load, not by the table history.
+"""
+
+import logging
+from src.config import get_settings
+from src.metadata_manager import (
+    load_dedup_bloom_filter,
+    lookup_dedup_keys,
+    save_dedup_keys,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """Bit-array Bloom filter over 64-bit key hashes using double hashing."""
+
+    def __init__(self, num_bits, num_hashes, bits=None, key_count=0):
+        import numpy as np
+
+        self.num_bits = int(num_bits)
+        self.num_hashes = int(num_hashes)
+        self.key_count = int(key_count)
+        if bits is None:
+            self.bits = np.zeros((self.num_bits + 7) // 8, dtype=np.uint8)
+        else:
+            self.bits = np.frombuffer(bytes(bits), dtype=np.uint8).copy()
+
+    def _positions(self, hashes):
+        import numpy as np
+
+        hashes = np.asarray(hashes).astype(np.uint64, copy=False)
+        h1 = hashes & np.uint64(0xFFFFFFFF)
+        h2 = (hashes >> np.uint64(32)) | np.uint64(1)
+        steps = np.arange(self.num_hashes, dtype=np.uint64)
+        return (h1[:, None] + steps[None, :] * h2[:, None]) % np.uint64(self.num_bits)
+
+    def add(self, hashes):
+        import numpy as np
+
+        if len(hashes) == 0:
+            return
+        positions = self._positions(hashes).ravel()
+        masks = np.left_shift(1, positions & np.uint64(7)).astype(np.uint8)
+        np.bitwise_or.at(self.bits, (positions >> np.uint64(3)).astype(np.int64), masks)
+        self.key_count += len(hashes)
+
+    def might_contain(self, hashes):
+        import numpy as np
+
+        if len(hashes) == 0:
+            return np.zeros(0, dtype=bool)
+        positions = self._positions(hashes)
+        bytes_ = self.bits[(positions >> np.uint64(3)).astype(np.int64)]
+        set_bits = (bytes_ >> (positions & np.uint64(7)).astype(np.uint8)) & 1
+        return set_bits.all(axis=1)
+
+    def false_positive_rate(self):
+        import math
+
+        return (
+            1 - math.exp(-self.num_hashes * self.key_count / self.num_bits)
+        ) ** self.num_hashes
+
+    def to_bytes(self):
+        return self.bits.tobytes()
+
+
+def hash_business_keys(df, business_keys):
+    """Hash the business key columns of a batch into signed 64-bit values."""
+    import numpy as np
+    import pandas as pd
+
+    hashes = pd.util.hash_pandas_object(df[business_keys], index=False)
+    # BIGINT in PostgreSQL is signed
+    return hashes.to_numpy().view(np.int64)
+
+
+def load_dedup_state(pipeline_id, business_keys, reset=False):
+    """
+    Load the persisted Bloom filter for a pipeline.
+
+    A full load replaces the landing table, so `reset` starts from an empty
+    filter and ignores the persisted keys. They are only replaced by
+    save_dedup_state, in the transaction that replaces the table.
+    """
+    import numpy as np
+
+    settings = get_settings()
+    stored = None if reset else load_dedup_bloom_filter(pipeline_id)
+
+    if stored:
+        bloom = BloomFilter(
+            stored["num_bits"],
+            stored["num_hashes"],
+            stored["bits"],
+            stored["key_count"],
+        )
+    else:
+        bloom = BloomFilter(
+            settings["dedup_bloom_bits"], settings["dedup_bloom_hashes"]
+        )
+
+    logger.info(
+        f"Dedup index for pipeline {pipeline_id}: {bloom.key_count} keys, "
+        f"estimated false positive rate {bloom.false_positive_rate():.4%}"
+    )
+
+    return {
+        "pipeline_id": pipeline_id,
+        "business_keys": business_keys,
+        "reset": reset,
+        "bloom": bloom,
+        "pending_keys": np.zeros(0, dtype=np.int64),
+        "stats": {
+            "rows_checked": 0,
+            "duplicates_in_load": 0,
+            "duplicates_historical": 0,
+            "bloom_false_positives": 0,
+            "exact_lookups": 0,
+        },
+    }
+
+
+def deduplicate_batch(df, state):
+    """
+    Drop rows whose business key was already seen in this load or a previous
+    run. Returns the remaining rows.
+    """
+    import numpy as np
+
+    if df.empty:
+        return df
+
+    stats = state["stats"]
+    hashes = hash_business_keys(df, state["business_keys"])
+    stats["rows_checked"] += len(df)
+
+    # Duplicates within the batch or earlier batches of this load
+    keep = ~(np.isin(hashes, state["pending_keys"]) | _duplicated_in_batch(df, hashes))
+    stats["duplicates_in_load"] += int((~keep).sum())
+
+    # Keys that may have been loaded by a previous run
+    candidates = keep & state["bloom"].might_contain(hashes)
+    if candidates.any() and state["reset"]:
+        # The filter only holds keys of this load, which are not candidates
+        stats["bloom_false_positives"] += int(candidates.sum())
+    elif candidates.any():
+        candidate_hashes = hashes[candidates]
+        stats["exact_lookups"] += len(candidate_hashes)
+        existing = lookup_dedup_keys(state["pipeline_id"], candidate_hashes.tolist())
+        historical = candidates & np.isin(hashes, np.array(list(existing), np.int64))
+        stats["duplicates_historical"] += int(historical.sum())
+        stats["bloom_false_positives"] += int(candidates.sum() - historical.sum())
+        keep &= ~historical
+
+    new_keys = hashes[keep]
+    state["bloom"].add(new_keys)
+    state["pending_keys"] = np.concatenate([state["pending_keys"], new_keys])
+
+    return df[keep]
+
+
+def _duplicated_in_batch(df, hashes):
+    import pandas as pd
+
+    return pd.Series(hashes, index=df.index).duplicated(keep="first").to_numpy()
+
+
+def save_dedup_state(state, audit_id=None, connection=None):
+    """
+    Persist the keys of a load and the updated Bloom filter, replacing the
+    previous keys after a reset. `connection` is the DBAPI connection of the
+    landing transaction, so the keys are committed together with the rows.
+    """
+    bloom = state["bloom"]
+    save_dedup_keys(
+        state["pipeline_id"],
+        state["pending_keys"].tolist(),
+        bloom.num_bits,
+        bloom.num_hashes,
+        bloom.to_bytes(),
+        bloom.key_count,
+        audit_id,
+        reset=state["reset"],
+        connection=connection,
+    )
+    logger.info(
+        f"Saved {len(state['pending_keys'])} new keys to the dedup index "
+        f"for pipeline {state['pipeline_id']}"
+    )
+    return state["stats"]
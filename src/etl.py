@@ -10,57 +10,116 @@ This script handles the complete ETL process:
 
 import os
 import logging
-import pandas as pd
-import boto3
-import io
 import time
 import traceback
-import subprocess
 import json
-from sqlalchemy import create_engine, text
-from dotenv import load_dotenv
+import argparse
+from datetime import datetime
+from src.bulk_load import (
+    analyze_table,
+    apply_bulk_session_settings,
+    drop_secondary_indexes,
+    get_load_profile,
+    rebuild_indexes,
+)
+from src.cdc import (
+    TOMBSTONE_COLUMN,
+    collapse_change_events,
+    delete_changed_keys,
+    ensure_key_index,
+    get_cdc_columns,
+    is_cdc_pipeline,
+    is_delete_event,
+)
+from src.config import configure_logging, get_db_url, get_settings
+from src.data_quality import apply_quality_rules, new_quality_state
+from src.dbt_runner import stream_dbt
+from src.deadline import (
+    ClaimLost,
+    Deadline,
+    apply_transaction_timeouts,
+    get_pipeline_deadline,
+    get_run_deadline,
+    is_timeout_error,
+)
+from src.dedup import deduplicate_batch, load_dedup_state, save_dedup_state
+from src.lake_writer import MANIFEST_NAME, apply_manifests, lake_prefix
+from src.memory_profiler import start_memory_profile
+from src.object_cache import get_object_cache, new_cache_stats
+from src.s3_fetcher import get_fetch_controller, map_concurrent
 from src.metadata_manager import (
+    get_last_success_fingerprint,
     get_pipeline_config,
+    get_quality_rules,
+    get_untransformed_loads,
+    hold_pipeline_claim,
+    maintain_audit_partitions,
+    mark_loads_transformed,
+    save_dbt_model_run,
+    save_schema_drift,
     start_pipeline_audit,
     update_pipeline_audit,
 )
-from src.notification import notify_pipeline_status, send_consolidated_notifications
-import argparse
-from datetime import datetime
-
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[logging.StreamHandler()],
+from src.notification import (
+    notify_performance_regression,
+    notify_pipeline_status,
+    send_consolidated_notifications,
+)
+from src.parquet_planner import plan_objects, read_planned_file, summarize_plan
+from src.parquet_reader import (
+    check_watermark_filter,
+    filter_dataframe,
+    parse_column_list,
+    parse_row_filter,
+    resolve_watermarks,
+    watermark_columns,
+)
+from src.regression_detector import detect_run_regression
+from src.schema_evolution import (
+    INCOMPATIBLE_TYPE,
+    apply_schema_changes,
+    get_table_columns,
+    plan_schema_changes,
+    unify_source_schemas,
 )
-logger = logging.getLogger(__name__)
-
-load_dotenv()
 
-AWS_ACCESS_KEY = os.getenv("AWS_ACCESS_KEY_ID")
-AWS_SECRET_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
-AWS_BUCKET_NAME = os.getenv("AWS_BUCKET_NAME")
-AWS_REGION = os.getenv("AWS_REGION")
+# pandas, boto3 and sqlalchemy are imported inside the functions that use them,
+# so `--help` and modules that only need the helpers here start quickly.
 
-DB_HOST = os.getenv("POSTGRES_HOST")
-DB_PORT = os.getenv("POSTGRES_PORT")
-DB_NAME = os.getenv("POSTGRES_DATABASE")
-DB_USER = os.getenv("POSTGRES_USER")
-DB_PASSWORD = os.getenv("POSTGRES_PASSWORD")
+logger = logging.getLogger(__name__)
 
-DB_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+# Landing rows are stamped with the audit record of the run that loaded them;
+# dbt incremental models use _batch_id as their watermark
+BATCH_ID_COLUMN = "_batch_id"
+LOADED_AT_COLUMN = "_loaded_at"
 
-# Path to dbt project
-DBT_PROJECT_DIR = os.getenv("DBT_PROJECT_DIR", os.path.join(os.getcwd(), "dbt_project"))
 
+def get_s3_client(max_attempts=None, deadline=None):
+    """
+    Create an S3 client whose connection pool matches S3_MAX_CONCURRENCY.
 
-def get_s3_client():
+    Pass max_attempts=1 for clients used with src.s3_fetcher, which retries
+    throttled requests itself and needs to see them. Connects and reads time
+    out after S3_CONNECT_TIMEOUT_SECONDS and S3_READ_TIMEOUT_SECONDS, or
+    earlier when the `deadline` of the pipeline is closer.
+    """
+    settings = get_settings()
+    deadline = deadline or Deadline()
     try:
+        import boto3
+        from botocore.config import Config
+
         s3_client = boto3.client(
             "s3",
-            aws_access_key_id=AWS_ACCESS_KEY,
-            aws_secret_access_key=AWS_SECRET_KEY,
-            region_name=AWS_REGION,
+            aws_access_key_id=settings["aws_access_key_id"],
+            aws_secret_access_key=settings["aws_secret_access_key"],
+            region_name=settings["aws_region"],
+            config=Config(
+                max_pool_connections=settings["s3_max_concurrency"],
+                retries={"mode": "standard", "max_attempts": max_attempts or 3},
+                connect_timeout=deadline.cap(settings["s3_connect_timeout_seconds"]),
+                read_timeout=deadline.cap(settings["s3_read_timeout_seconds"]),
+            ),
         )
         logger.info("S3 client created successfully")
         return s3_client
@@ -70,92 +129,487 @@ def get_s3_client():
 
 
 def get_db_engine():
+    settings = get_settings()
     try:
-        logger.info(f"Connecting to PostgreSQL: {DB_HOST}:{DB_PORT}/{DB_NAME}")
-        engine = create_engine(DB_URL)
+        from sqlalchemy import create_engine
+
+        logger.info(
+            "Connecting to PostgreSQL: "
+            f"{settings['db_host']}:{settings['db_port']}/{settings['db_name']}"
+        )
+        engine = create_engine(get_db_url())
         return engine
     except Exception as e:
         logger.error(f"Error creating database engine: {str(e)}")
         raise
 
 
-def list_parquet_files(s3_client, bucket_name, prefix):
+def get_source_prefix(data_source, date_prefix=None):
+    return lake_prefix(data_source, date_prefix)
+
+
+def list_parquet_objects(s3_client, bucket_name, prefix):
+    """
+    List the Parquet objects under a prefix with their ETag and size.
+
+    Objects that a lake compaction is switching in or out (per partition
+    _manifest.json) are left out.
+    """
     try:
         logger.info(f"Listing files from s3://{bucket_name}/{prefix}...")
-        response = s3_client.list_objects_v2(Bucket=bucket_name, Prefix=prefix)
-        files = []
-
-        if "Contents" in response:
-            for obj in response["Contents"]:
-                if obj["Key"].endswith(".parquet"):
-                    files.append(obj["Key"])
+        paginator = s3_client.get_paginator("list_objects_v2")
+        objects = []
+        manifest_keys = []
+
+        for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix):
+            for obj in page.get("Contents", []):
+                if obj["Key"].endswith("/" + MANIFEST_NAME):
+                    manifest_keys.append(obj["Key"])
+                elif obj["Key"].endswith(".parquet"):
+                    objects.append(
+                        {
+                            "key": obj["Key"],
+                            "etag": obj.get("ETag", "").strip('"'),
+                            "size": obj.get("Size", 0),
+                        }
+                    )
 
-        logger.info(f"Found {len(files)} Parquet files")
-        return files
+        objects = apply_manifests(s3_client, bucket_name, objects, manifest_keys)
+        logger.info(f"Found {len(objects)} Parquet files")
+        return objects
     except Exception as e:
         logger.error(f"Error listing files from S3: {str(e)}")
         return []
 
 
-def ingest_s3_to_postgres(pipeline_config, date_prefix=None):
+def list_parquet_files(s3_client, bucket_name, prefix):
+    return [obj["key"] for obj in list_parquet_objects(s3_client, bucket_name, prefix)]
+
+
+def compute_source_fingerprint(pipeline_config, source_objects):
+    """
+    Fingerprint a pipeline's source from the listed keys, ETags and sizes.
+
+    The effective load type, projection and row filter are included, so
+    changing how an unchanged prefix is read (e.g. `--load-type full`) still
+    triggers a load. Compacted files count as the objects they were made
+    from, so compacting the lake does not reload it.
+    """
+    import hashlib
+
+    digest = hashlib.sha256()
+    for setting in (
+        "load_type",
+        "select_columns",
+        "row_filter",
+        "business_keys",
+        "cdc_op_column",
+        "cdc_order_column",
+    ):
+        digest.update(f"{setting}={pipeline_config.get(setting) or ''}\n".encode())
+    entries = {}
+    for obj in source_objects:
+        for entry in obj.get("fingerprint_of") or [obj]:
+            entries[entry["key"]] = entry
+    for key in sorted(entries):
+        entry = entries[key]
+        digest.update(f"{key}|{entry['etag']}|{entry['size']}\n".encode())
+    return digest.hexdigest()
+
+
+def uses_watermark(load_type):
+    """
+    Whether a load resumes from the {watermark} of its landing table. Full
+    loads read everything; appends (later dates of a backfill) read their
+    whole date prefix, which an earlier date's watermark would cut.
+    """
+    return load_type.lower() not in ("full", "append")
+
+
+def get_watermarks(engine, source_table, columns):
+    """
+    Get the current high-water mark of each column in the landing table.
+
+    Returns an empty dict when the table does not exist yet.
+    """
+    from sqlalchemy import inspect, text
+
+    if not columns or not inspect(engine).has_table(source_table, schema="public"):
+        return {}
+
+    select_list = ", ".join(f"MAX({column}) AS {column}" for column in columns)
+    with engine.connect() as conn:
+        row = (
+            conn.execute(text(f"SELECT {select_list} FROM public.{source_table}"))
+            .mappings()
+            .first()
+        )
+
+    watermarks = {column: row[column] for column in columns if row[column] is not None}
+    logger.info(f"Watermarks for 'public.{source_table}': {watermarks}")
+    return watermarks
+
+
+def ensure_batch_columns(conn, source_table):
+    """
+    Add the batch columns (and the cdc tombstone flag) to a landing table
+    created before they existed, so appends keep working and dbt can filter
+    on _batch_id.
+    """
+    from sqlalchemy import text
+
+    conn.execute(text(f"""
+            DO $$
+            BEGIN
+                IF to_regclass('public.{source_table}') IS NOT NULL THEN
+                    ALTER TABLE public.{source_table}
+                        ADD COLUMN IF NOT EXISTS {BATCH_ID_COLUMN} INTEGER,
+                        ADD COLUMN IF NOT EXISTS {LOADED_AT_COLUMN} TIMESTAMP,
+                        ADD COLUMN IF NOT EXISTS {TOMBSTONE_COLUMN} BOOLEAN
+                            DEFAULT FALSE;
+                END IF;
+            END $$
+            """))
+
+
+def write_quarantine(quarantine_df, source_table, engine, audit_id=None):
+    """
+    Append rows rejected by data quality rules to public.<source_table>_quarantine
+    """
+    quarantine_table = f"{source_table}_quarantine"
+    quarantine_df = quarantine_df.assign(
+        _audit_id=audit_id, _quarantined_at=datetime.now()
+    )
+
+    logger.info(
+        f"Quarantining {len(quarantine_df)} rows into 'public.{quarantine_table}'"
+    )
+    quarantine_df.to_sql(
+        name=quarantine_table,
+        con=engine,
+        schema="public",
+        if_exists="append",
+        index=False,
+        chunksize=1000,
+        method="multi",
+    )
+
+
+def ingest_s3_to_postgres(
+    pipeline_config,
+    date_prefix=None,
+    audit_id=None,
+    metrics=None,
+    source_objects=None,
+    landing_gate=None,
+    batch_loaded_at=None,
+    memory_profile=None,
+    deadline=None,
+):
     """
     Load data from S3 into PostgreSQL public schema
+
+    Every landed row is stamped with _batch_id (the audit_id of this run) and
+    _loaded_at (`batch_loaded_at`, the audit start time).
+
+    Each file is checked against the pipeline's data quality rules as it is
+    read. Rejected rows go to the quarantine table and the per-rule counts are
+    added to `metrics` (stored on the audit record by the caller). When the
+    controller declares business_keys, rows already loaded (in this or an
+    earlier run) are dropped before they reach PostgreSQL.
+
+    A cdc pipeline reads change events instead: they are collapsed to the
+    latest event per business key, the changed keys are deleted from the
+    landing table and the latest rows inserted, in the load transaction.
+    Deleted keys are kept as tombstones (_deleted true) for dbt; other rows
+    land with _deleted false.
+
+    Appends follow additive source schema changes: new columns are added and
+    widened types altered in place before the rows are written. The
+    differences are recorded in schema_drift_log; an incompatible type change
+    fails the load.
+
+    Before any data is transferred, the footers of all files are fetched with
+    ranged GETs to plan the read: files whose row groups cannot match the row
+    filter are skipped, the others are read with ranged GETs of the selected
+    column chunks, and the planned row count is used to verify the read. The
+    plan totals are stored in metrics["plan"].
+
+    With a `landing_gate` (backfill), files are read and checked right away
+    but nothing is written until the gate opens, i.e. until the previous date
+    of the same table has landed.
+
+    With a `memory_profile`, the read, dedup and write phases are profiled.
+
+    The `deadline` of the pipeline bounds the S3 timeouts and the
+    statement_timeout and lock_timeout of the load transaction, and is
+    checked before every file and before the write. Timeouts are raised to
+    the caller instead of being returned as a failure.
     """
+    import pandas as pd
+
+    settings = get_settings()
+    deadline = deadline or Deadline()
+    bucket_name = settings["aws_bucket_name"]
     data_source = pipeline_config["data_source"]  # Tên nguồn dữ liệu trên S3
     source_table = pipeline_config["source_table"]  # Tên bảng trong PostgreSQL
     load_type = pipeline_config["load_type"]
+    columns = parse_column_list(pipeline_config.get("select_columns"))
+    row_filter = parse_row_filter(pipeline_config.get("row_filter"))
+    business_keys = parse_column_list(pipeline_config.get("business_keys"))
+    for warning in check_watermark_filter(row_filter, business_keys):
+        logger.warning(warning)
+    cdc_columns = None
+    if is_cdc_pipeline(pipeline_config):
+        cdc_columns = get_cdc_columns(pipeline_config)
+        if columns:
+            # The projection must keep the operation and ordering columns
+            columns += [c for c in cdc_columns[:2] if c not in columns]
 
     logger.info(f"Starting data import: '{data_source}' -> 'public.{source_table}'")
     logger.info(f"Load type: {load_type}")
 
-    if date_prefix:
-        prefix = f"{date_prefix}/{data_source}/"
-    else:
-        prefix = f"{data_source}/"
+    prefix = get_source_prefix(data_source, date_prefix)
 
-    logger.info(f"Source: s3://{AWS_BUCKET_NAME}/{prefix}")
-    logger.info(f"Destination: {DB_NAME}.public.{source_table}")
+    logger.info(f"Source: s3://{bucket_name}/{prefix}")
+    logger.info(f"Destination: {settings['db_name']}.public.{source_table}")
 
     start_time = time.time()
 
     try:
-        s3_client = get_s3_client()
+        s3_client = get_s3_client(deadline=deadline)
         engine = get_db_engine()
 
-        parquet_files = list_parquet_files(s3_client, AWS_BUCKET_NAME, prefix)
+        if source_objects is None:
+            source_objects = list_parquet_objects(s3_client, bucket_name, prefix)
+        parquet_files = [obj["key"] for obj in source_objects]
 
         if not parquet_files:
-            error_msg = f"No Parquet files found in s3://{AWS_BUCKET_NAME}/{prefix}"
+            error_msg = f"No Parquet files found in s3://{bucket_name}/{prefix}"
             logger.error(error_msg)
             return False, 0, error_msg
 
+        watermarks = {}
+        if uses_watermark(load_type):
+            watermarks = get_watermarks(
+                engine, source_table, watermark_columns(row_filter)
+            )
+        filters = resolve_watermarks(row_filter, watermarks)
+        if columns:
+            logger.info(f"Column projection: {', '.join(columns)}")
+        if filters:
+            logger.info(f"Row filter: {filters}")
+
+        quality_rules = get_quality_rules(pipeline_config["id"])
+        quality_state = new_quality_state()
+        # Several events of one key are expected in a cdc load: its unique
+        # rules apply to the collapsed rows instead of each file
+        row_rules, unique_rules = quality_rules, []
+        if cdc_columns:
+            row_rules = [r for r in quality_rules if r["rule_type"] != "unique"]
+            unique_rules = [r for r in quality_rules if r["rule_type"] == "unique"]
+        rule_counts = {}
+        quarantine_dfs = []
+
+        if memory_profile is not None:
+            memory_profile.phase("read")
+        cache = get_object_cache()
+        cache_stats = new_cache_stats()
+        # Footers and data are fetched concurrently under the adaptive limit;
+        # this client leaves throttling retries to src.s3_fetcher
+        fetch_client = get_s3_client(max_attempts=1, deadline=deadline)
+        plan = plan_objects(
+            fetch_client, bucket_name, source_objects, columns, filters, cache
+        )
+        transfer_stats = {
+            "get_requests": 0,
+            "bytes_fetched": 0,
+            "retries": 0,
+            "throttled": 0,
+        }
+
+        def read_file(file_plan):
+            deadline.check(f"reading {file_plan['key']}")
+            # Per-file counters, merged on the main thread
+            file_stats = {}
+            file_cache_stats = new_cache_stats()
+            table = read_planned_file(
+                fetch_client,
+                bucket_name,
+                file_plan,
+                columns,
+                filters,
+                file_stats,
+                cache,
+                file_cache_stats,
+            )
+            return table, file_stats, file_cache_stats
+
         all_dfs = []
+        source_schemas = []
         total_rows = 0
         logger.info(f"Reading data from {len(parquet_files)} files:")
-
-        for index, file in enumerate(parquet_files):
-            logger.info(f"  [{index+1}/{len(parquet_files)}] Reading: {file}")
+        for index, file_plan in enumerate(plan["files"]):
+            if not file_plan["row_groups"]:
+                logger.info(
+                    f"  [{index+1}/{len(parquet_files)}] Skipping: "
+                    f"{file_plan['key']} (no row group matches the row filter)"
+                )
+        selected_files = [f for f in plan["files"] if f["row_groups"]]
+        results = map_concurrent(read_file, selected_files)
+
+        # Quality rules keep state across files, so they run in file order
+        for file_plan, (table, file_stats, file_cache_stats) in zip(
+            selected_files, results
+        ):
+            logger.info(f"  Read: {file_plan['key']}")
+            for key, value in file_stats.items():
+                transfer_stats[key] = transfer_stats.get(key, 0) + value
+            for key, value in file_cache_stats.items():
+                cache_stats[key] += value
             try:
-                response = s3_client.get_object(Bucket=AWS_BUCKET_NAME, Key=file)
-                df = pd.read_parquet(io.BytesIO(response["Body"].read()))
+                source_schemas.append(table.schema)
+                df = table.to_pandas()
                 rows = len(df)
                 total_rows += rows
+                if cdc_columns:
+                    # Delete events only carry keys; rules apply to the others
+                    deletes = is_delete_event(df, cdc_columns[0])
+                    checked, quarantined, rule_counts = apply_quality_rules(
+                        df[~deletes], row_rules, quality_state, rule_counts
+                    )
+                    df = pd.concat([checked, df[deletes]]).sort_index()
+                else:
+                    df, quarantined, rule_counts = apply_quality_rules(
+                        df, quality_rules, quality_state, rule_counts
+                    )
                 all_dfs.append(df)
-                logger.info(f"Successfully read: {rows} rows")
+                if not quarantined.empty:
+                    quarantine_dfs.append(quarantined)
+                logger.info(
+                    f"Successfully read: {rows} rows ({len(quarantined)} quarantined)"
+                )
             except Exception as e:
                 logger.error(f"Error reading file: {str(e)}")
                 raise
 
+        # Without a row filter every planned row must have been read
+        if not filters and total_rows != plan["rows_selected"]:
+            raise ValueError(
+                f"Read {total_rows} rows but the footers declare "
+                f"{plan['rows_selected']} rows"
+            )
+        if metrics is not None:
+            metrics["plan"] = {**summarize_plan(plan), **transfer_stats}
+            metrics["s3_fetch"] = get_fetch_controller().snapshot()
+            if cache is not None:
+                metrics["cache"] = cache_stats
+        if cache is not None:
+            logger.info(
+                f"S3 cache: {cache_stats['hits']} hits, {cache_stats['misses']} "
+                f"misses, {cache_stats['bytes_saved']} bytes saved"
+            )
+
         if all_dfs:
             logger.info(f"Combining {len(all_dfs)} DataFrames...")
             combined_df = pd.concat(all_dfs, ignore_index=True)
         else:
             combined_df = pd.DataFrame()
 
-        if combined_df.empty:
-            error_msg = (
-                "No data in Parquet files at " f"s3://{AWS_BUCKET_NAME}/{prefix}"
+        if landing_gate:
+            landing_gate.wait(deadline.remaining())
+            # Earlier dates may have moved the watermark while this one was read
+            if watermark_columns(row_filter) and uses_watermark(load_type):
+                watermarks = get_watermarks(
+                    engine, source_table, watermark_columns(row_filter)
+                )
+                combined_df = filter_dataframe(
+                    combined_df, resolve_watermarks(row_filter, watermarks)
+                )
+
+        changed_keys = None
+        if cdc_columns and not combined_df.empty:
+            if memory_profile is not None:
+                memory_profile.phase("dedup")
+            # Updates and deletes must reach the table, so the dedup index
+            # does not apply; keys are collapsed within the load instead
+            combined_df, changed_keys, cdc_stats = collapse_change_events(
+                combined_df, *cdc_columns
+            )
+            if unique_rules:
+                tombstones = combined_df[TOMBSTONE_COLUMN]
+                _, quarantined, rule_counts = apply_quality_rules(
+                    combined_df[~tombstones],
+                    unique_rules,
+                    new_quality_state(),
+                    rule_counts,
+                )
+                if not quarantined.empty:
+                    # A rejected change leaves its key as it was in the table
+                    quarantine_dfs.append(quarantined.drop(columns=TOMBSTONE_COLUMN))
+                    combined_df = combined_df.drop(index=quarantined.index)
+                    changed_keys = changed_keys.drop(index=quarantined.index)
+                    cdc_stats["keys_changed"] -= len(quarantined)
+                    cdc_stats["upserts"] -= len(quarantined)
+            if metrics is not None:
+                metrics["cdc"] = cdc_stats
+
+        quarantined_rows = sum(len(q) for q in quarantine_dfs)
+        if quality_rules and metrics is not None:
+            metrics["data_quality"] = {
+                "rows_read": int(total_rows),
+                "rows_quarantined": int(quarantined_rows),
+                "rule_violations": rule_counts,
+            }
+        if quarantine_dfs:
+            write_quarantine(
+                pd.concat(quarantine_dfs, ignore_index=True),
+                source_table,
+                engine,
+                audit_id,
             )
+
+        dedup_state = None
+        duplicates = 0
+        if business_keys and not cdc_columns:
+            if memory_profile is not None:
+                memory_profile.phase("dedup")
+            logger.info(f"Deduplicating on business keys: {', '.join(business_keys)}")
+            dedup_state = load_dedup_state(
+                pipeline_config["id"], business_keys, reset=load_type.lower() == "full"
+            )
+            combined_df = deduplicate_batch(combined_df, dedup_state)
+            duplicates = (
+                dedup_state["stats"]["duplicates_in_load"]
+                + dedup_state["stats"]["duplicates_historical"]
+            )
+            logger.info(f"Dropped {duplicates} duplicate rows")
+            if metrics is not None:
+                metrics["dedup"] = dedup_state["stats"]
+
+        if combined_df.empty and (filters or duplicates):
+            if filters and total_rows == 0 and plan["rows_total"]:
+                # Late rows behind a watermark disappear here without an error
+                logger.warning(
+                    f"Row filter {filters} dropped all {plan['rows_total']} rows "
+                    f"of s3://{bucket_name}/{prefix}"
+                )
+                if metrics is not None:
+                    metrics["row_filter"] = {
+                        "filters": str(filters),
+                        "rows_source": plan["rows_total"],
+                        "rows_read": 0,
+                    }
+            logger.info("No new rows to load")
+            return True, 0, None
+
+        if combined_df.empty:
+            error_msg = "No data in Parquet files at " f"s3://{bucket_name}/{prefix}"
+            if quarantined_rows:
+                error_msg = (
+                    f"All {quarantined_rows} rows from s3://{bucket_name}/{prefix} "
+                    "failed data quality rules"
+                )
             logger.error(error_msg)
             return False, 0, error_msg
 
@@ -165,25 +619,125 @@ def ingest_s3_to_postgres(pipeline_config, date_prefix=None):
         logger.info(f"  - Columns: {len(combined_df.columns)}")
         logger.info(f"  - Column names: {', '.join(combined_df.columns.tolist())}")
 
+        combined_df = combined_df.assign(
+            **{
+                BATCH_ID_COLUMN: audit_id,
+                LOADED_AT_COLUMN: batch_loaded_at or datetime.now(),
+            }
+        )
+        if TOMBSTONE_COLUMN not in combined_df.columns:
+            # Only cdc loads write tombstones
+            combined_df[TOMBSTONE_COLUMN] = False
+
         logger.info(f"Writing data to PostgreSQL table 'public.{source_table}'...")
 
         if_exists = "append"
         if load_type.lower() == "full":
             if_exists = "replace"
             logger.info("Full load: existing data will be replaced")
+        elif cdc_columns:
+            logger.info("CDC load: changed keys will be replaced or deleted")
         else:
             logger.info("Incremental load: data will be appended to existing table")
 
-        # Import into public schema
-        combined_df.to_sql(
-            name=source_table,  # Sử dụng source_table cho tên bảng PostgreSQL
-            con=engine,
-            schema="public",
-            if_exists=if_exists,
-            index=False,
-            chunksize=1000,
-            method="multi",
-        )
+        # Compare the source schema with the landing table before writing
+        schema_changes = []
+        if if_exists == "append":
+            with engine.connect() as conn:
+                table_columns = get_table_columns(conn, "public", source_table)
+            schema_changes = plan_schema_changes(
+                table_columns,
+                unify_source_schemas(source_schemas, combined_df.columns),
+                ignore_columns=(BATCH_ID_COLUMN, LOADED_AT_COLUMN, TOMBSTONE_COLUMN),
+            )
+            if metrics is not None and schema_changes:
+                metrics["schema_drift"] = schema_changes
+            rejected = [c for c in schema_changes if c["change"] == INCOMPATIBLE_TYPE]
+            if rejected:
+                save_schema_drift(
+                    pipeline_config["id"], audit_id, source_table, schema_changes
+                )
+                raise ValueError(
+                    "Incompatible schema change, a full load is required: "
+                    + ", ".join(
+                        f"{c['column']} {c['old_type']} -> {c['new_type']}"
+                        for c in rejected
+                    )
+                )
+
+        load_profile = get_load_profile(pipeline_config)
+        logger.info(f"Load profile: {load_profile}")
+
+        if memory_profile is not None:
+            memory_profile.phase("write")
+        deadline.check("writing to PostgreSQL")
+
+        # The whole load runs in one transaction so bulk settings and index
+        # changes are scoped to it
+        with engine.begin() as conn:
+            # A locked table or a slow statement fails the load at the deadline
+            apply_transaction_timeouts(conn, deadline)
+            if if_exists == "append":
+                ensure_batch_columns(conn, source_table)
+                apply_schema_changes(conn, "public", source_table, schema_changes)
+
+            index_defs = []
+            if load_profile == "bulk":
+                apply_bulk_session_settings(conn)
+
+            if cdc_columns and if_exists == "append":
+                # Before any index is dropped: the DELETE looks keys up by index
+                rows_deleted = delete_changed_keys(
+                    conn, "public", source_table, changed_keys, cdc_columns[2]
+                )
+                if metrics is not None:
+                    metrics["cdc"]["rows_deleted"] = rows_deleted
+
+            if load_profile == "bulk":
+                if (
+                    if_exists == "replace"
+                    or len(combined_df) >= settings["bulk_index_rebuild_min_rows"]
+                ):
+                    index_defs = drop_secondary_indexes(conn, "public", source_table)
+
+            # Import into public schema
+            combined_df.to_sql(
+                name=source_table,  # Sử dụng source_table cho tên bảng PostgreSQL
+                con=conn,
+                schema="public",
+                if_exists=if_exists,
+                index=False,
+                chunksize=1000,
+                method="multi",
+            )
+
+            if load_profile == "bulk":
+                rebuild_indexes(conn, index_defs)
+            if cdc_columns:
+                ensure_key_index(conn, "public", source_table, cdc_columns[2])
+            if load_profile == "bulk":
+                analyze_table(conn, "public", source_table)
+            if dedup_state:
+                # Committed with the rows: a failed load keeps the old index
+                save_dedup_state(dedup_state, audit_id, connection=conn.connection)
+            if pipeline_config.get("queue_id") and not hold_pipeline_claim(
+                conn.connection,
+                pipeline_config["queue_id"],
+                pipeline_config["worker_id"],
+            ):
+                # The entry was reclaimed and may already run on another worker
+                raise ClaimLost(
+                    f"Queue entry {pipeline_config['queue_id']} was reclaimed, "
+                    "load rolled back"
+                )
+
+        if schema_changes:
+            save_schema_drift(
+                pipeline_config["id"], audit_id, source_table, schema_changes
+            )
+
+        if metrics is not None:
+            metrics["rows_loaded"] = len(combined_df)
 
         verify_query = f"SELECT COUNT(*) as count FROM public.{source_table}"
         row_count = pd.read_sql(verify_query, engine).iloc[0]["count"]
@@ -196,6 +750,9 @@ def ingest_s3_to_postgres(pipeline_config, date_prefix=None):
         return True, row_count, None
 
     except Exception as e:
+        if is_timeout_error(e):
+            # process_pipeline records timeouts with their own status
+            raise
         error_message = (
             "Error importing data from "
             f"'{data_source}' to 'public.{source_table}': {str(e)}"
@@ -206,11 +763,23 @@ def ingest_s3_to_postgres(pipeline_config, date_prefix=None):
 
 
 def run_dbt_command(
-    command, target=None, select=None, vars_dict=None, full_refresh=False
+    command,
+    target=None,
+    select=None,
+    vars_dict=None,
+    full_refresh=False,
+    audit_id=None,
+    metrics=None,
+    timeout=None,
 ):
     """
     Run a dbt command with specified options
 
+    dbt logs are streamed as JSON while it runs; every finished model is
+    recorded in dbt_model_runs (linked to `audit_id`) and a summary of the
+    run is stored in metrics["dbt"]. dbt is killed after `timeout` seconds
+    (default: DBT_TIMEOUT_SECONDS).
+
     Parameters:
     -----------
     command : str
@@ -223,9 +792,24 @@ def run_dbt_command(
         Variables to pass to dbt
     full_refresh : bool, optional
         Whether to add --full-refresh flag
+    audit_id : int, optional
+        Audit record of the pipeline run that triggered dbt
+    metrics : dict, optional
+        Audit metrics to add the dbt run summary to
+    timeout : int, optional
+        Seconds after which dbt is terminated (0 disables the timeout)
     """
     try:
-        dbt_cmd = ["dbt", command, "--project-dir", DBT_PROJECT_DIR]
+        settings = get_settings()
+        dbt_project_dir = settings["dbt_project_dir"]
+        dbt_cmd = [
+            "dbt",
+            command,
+            "--project-dir",
+            dbt_project_dir,
+            "--log-format",
+            "json",
+        ]
 
         if target:
             dbt_cmd.extend(["--target", target])
@@ -241,30 +825,44 @@ def run_dbt_command(
             vars_str = json.dumps(vars_dict)
             dbt_cmd.extend(["--vars", vars_str])
 
+        if timeout is None:
+            timeout = settings["dbt_timeout_seconds"]
+
         # Log the command
         logger.info(f"Running dbt command: {' '.join(dbt_cmd)}")
 
-        # Run the command and capture output
-        process = subprocess.Popen(
-            dbt_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
-        )
+        def record_model(invocation_id, model):
+            logger.info(
+                f"dbt model {model['name']}: {model['status']} "
+                f"in {model['execution_time']}s"
+            )
+            try:
+                save_dbt_model_run(audit_id, invocation_id, model)
+            except Exception as e:
+                # Losing a model record must not fail the transformation
+                logger.warning(f"Could not record dbt model run: {str(e)}")
 
-        # Stream output in real-time
-        stdout, stderr = process.communicate()
+        returncode, timed_out, monitor = stream_dbt(
+            dbt_cmd, timeout=timeout, on_model_finished=record_model
+        )
 
-        if stdout:
-            for line in stdout.split("\n"):
-                if line.strip():
-                    logger.info(f"dbt: {line}")
+        if metrics is not None:
+            metrics["dbt"] = {**monitor.summary(), "timed_out": timed_out}
 
-        if stderr:
-            for line in stderr.split("\n"):
-                if line.strip():
-                    logger.error(f"dbt error: {line}")
+        if timed_out:
+            error_msg = f"dbt command timed out after {timeout}s"
+            unfinished = monitor.summary()["unfinished_models"]
+            if unfinished:
+                error_msg += f" (running: {', '.join(unfinished)})"
+            logger.error(error_msg)
+            return False, error_msg
 
-        if process.returncode != 0:
-            logger.error(f"dbt command failed with exit code {process.returncode}")
-            return False, f"dbt command failed with exit code {process.returncode}"
+        if returncode != 0:
+            logger.error(f"dbt command failed with exit code {returncode}")
+            error_msg = f"dbt command failed with exit code {returncode}"
+            if monitor.errors:
+                error_msg += f": {monitor.errors[-1]}"
+            return False, error_msg
 
         return True, None
 
@@ -279,7 +877,7 @@ def get_dbt_run_results():
     """Get run results from dbt run artifacts"""
     try:
         # Default dbt target path
-        target_path = os.path.join(DBT_PROJECT_DIR, "target")
+        target_path = os.path.join(get_settings()["dbt_project_dir"], "target")
         run_results_path = os.path.join(target_path, "run_results.json")
 
         if not os.path.exists(run_results_path):
@@ -318,9 +916,10 @@ def get_dbt_run_results():
         return False, 0, error_msg
 
 
-def transform_with_dbt(pipeline_config):
+def transform_with_dbt(pipeline_config, audit_id=None, metrics=None, deadline=None):
     """
-    Transform data using dbt
+    Transform data using dbt; dbt is terminated at the pipeline `deadline`
+    if it comes before DBT_TIMEOUT_SECONDS.
     """
     table_name = pipeline_config["destination_table"]
     load_type = pipeline_config["load_type"].lower()
@@ -354,6 +953,13 @@ def transform_with_dbt(pipeline_config):
         select=select_pattern,
         vars_dict=vars_dict,
         full_refresh=full_refresh,
+        audit_id=audit_id,
+        metrics=metrics,
+        timeout=(
+            deadline.cap(get_settings()["dbt_timeout_seconds"])
+            if deadline is not None
+            else None
+        ),
     )
 
     if not success:
@@ -363,12 +969,59 @@ def transform_with_dbt(pipeline_config):
     return get_dbt_run_results()
 
 
-def process_pipeline(pipeline_config, date_prefix=None, skip_transform=False):
+def check_source_unchanged(pipeline_config, date_prefix=None):
+    """
+    List the pipeline's source prefix and compare its fingerprint with the
+    last completed run.
+
+    Returns (unchanged, fingerprint, source_objects).
+    """
+    bucket_name = get_settings()["aws_bucket_name"]
+    prefix = get_source_prefix(pipeline_config["data_source"], date_prefix)
+
+    source_objects = list_parquet_objects(get_s3_client(), bucket_name, prefix)
+    if not source_objects:
+        return False, None, source_objects
+
+    fingerprint = compute_source_fingerprint(pipeline_config, source_objects)
+    last_fingerprint = get_last_success_fingerprint(pipeline_config["pipeline_id"])
+
+    unchanged = fingerprint == last_fingerprint
+    if unchanged:
+        logger.info(
+            f"Source s3://{bucket_name}/{prefix} unchanged since last successful run "
+            f"(fingerprint {fingerprint[:12]})"
+        )
+    return unchanged, fingerprint, source_objects
+
+
+def process_pipeline(
+    pipeline_config,
+    date_prefix=None,
+    skip_transform=False,
+    force=False,
+    landing_gate=None,
+    worker_id=None,
+    run_deadline=None,
+):
     """
     Process the ETL pipeline with the following strategy:
     1. For public schema: Extract data from S3 to PostgreSQL
     2. For silver and gold schemas: Use dbt models to transform data from PostgreSQL
     3. Send notifications
+
+    When the S3 source fingerprint matches the last completed run (and `force`
+    is not set), the load is skipped, recorded as 'skipped' in the audit, and
+    pipeline_config["skipped"] is set so the caller can skip downstream models.
+    The number of rows written by the load is left in pipeline_config["rows_loaded"]
+    and the audit_id of the run in pipeline_config["audit_id"]; `worker_id`
+    (src.worker) is recorded on the audit record.
+    With MEMORY_PROFILING enabled, per-phase memory use is stored in
+    metrics["memory"] of the audit record and shown in the consolidated report.
+
+    The pipeline stops at its deadline (controller.timeout_seconds, bounded by
+    `run_deadline`); it is then recorded as 'timeout' in the audit and
+    pipeline_config["timed_out"] is set.
     """
     pipeline_id = pipeline_config["pipeline_id"]
     data_source = pipeline_config["data_source"]  # Nguồn dữ liệu S3
@@ -383,20 +1036,73 @@ def process_pipeline(pipeline_config, date_prefix=None, skip_transform=False):
     logger.info(f"Destination: {schema_name}.{destination_table}")
     logger.info(f"Load type: {load_type}")
 
-    audit_id = start_pipeline_audit(pipeline_id)
+    batch_loaded_at = datetime.now()
+    audit_id = start_pipeline_audit(
+        pipeline_id, start_time=batch_loaded_at, worker_id=worker_id
+    )
+    pipeline_config["audit_id"] = audit_id
+    metrics = {}
+    fingerprint = None
+    pipeline_config["skipped"] = False
+    pipeline_config["timed_out"] = False
+    pipeline_config["rows_loaded"] = 0
+    deadline = get_pipeline_deadline(pipeline_config, run_deadline)
+    memory_profile = start_memory_profile(f"pipeline {pipeline_id}")
+
+    def record_memory():
+        if memory_profile is not None:
+            metrics["memory"] = memory_profile.finish()
+        return metrics.get("memory")
 
     try:
+        # Pipelines still waiting when the run deadline passed do not start
+        deadline.check("starting")
+
         # Step 1: For public schema, extract from S3 to PostgreSQL
         if schema_name.lower() == "public":
+            if memory_profile is not None:
+                memory_profile.phase("list")
+            unchanged, fingerprint, source_objects = check_source_unchanged(
+                pipeline_config, date_prefix
+            )
+            # A backfill range may contain dates without data for this source
+            if not source_objects and landing_gate is not None:
+                logger.info(f"No source files for {date_prefix}, skipping")
+                update_pipeline_audit(audit_id, "skipped", 0, None)
+                pipeline_config["skipped"] = True
+                return True, None
+
+            if unchanged and not force:
+                message = "Source unchanged since last successful run, skipped"
+                update_pipeline_audit(
+                    audit_id, "skipped", 0, None, source_fingerprint=fingerprint
+                )
+                notify_pipeline_status(
+                    pipeline_id, "success", message=message, records_processed=0
+                )
+                pipeline_config["skipped"] = True
+                return True, None
+
             logger.info("Processing public schema: Extracting data from S3")
             # Giữ nguyên source_table và destination_table
             success, row_count, error_msg = ingest_s3_to_postgres(
-                pipeline_config, date_prefix
+                pipeline_config,
+                date_prefix,
+                audit_id=audit_id,
+                metrics=metrics,
+                source_objects=source_objects,
+                landing_gate=landing_gate,
+                batch_loaded_at=batch_loaded_at,
+                memory_profile=memory_profile,
+                deadline=deadline,
             )
 
             if not success:
-                update_pipeline_audit(audit_id, "failed", 0, error_msg)
-                notify_pipeline_status(pipeline_id, "failure", error_message=error_msg)
+                memory = record_memory()
+                update_pipeline_audit(audit_id, "failed", 0, error_msg, metrics)
+                notify_pipeline_status(
+                    pipeline_id, "failure", error_message=error_msg, memory=memory
+                )
                 return False, error_msg
         else:
             # For non-public schemas, we'll skip S3 extraction and only do transformations
@@ -407,52 +1113,96 @@ def process_pipeline(pipeline_config, date_prefix=None, skip_transform=False):
 
         # Step 2: Transform using dbt models if requested
         if not skip_transform:
+            deadline.check("transforming")
             logger.info(f"Using dbt to transform data to {schema_name} layer")
+            if memory_profile is not None:
+                memory_profile.phase("transform")
             success, transform_row_count, error_msg = transform_with_dbt(
-                pipeline_config
+                pipeline_config, audit_id=audit_id, metrics=metrics, deadline=deadline
             )
 
             if not success:
-                update_pipeline_audit(audit_id, "failed", row_count, error_msg)
-                notify_pipeline_status(pipeline_id, "failure", error_message=error_msg)
+                status = "failed"
+                if metrics.get("dbt", {}).get("timed_out"):
+                    status = "timeout"
+                    pipeline_config["timed_out"] = True
+                memory = record_memory()
+                update_pipeline_audit(audit_id, status, row_count, error_msg, metrics)
+                notify_pipeline_status(
+                    pipeline_id,
+                    "timeout" if pipeline_config["timed_out"] else "failure",
+                    error_message=error_msg,
+                    memory=memory,
+                )
                 return False, error_msg
 
             # Update row count with transformed data
             row_count = transform_row_count
 
         # Update audit status to completed
-        update_pipeline_audit(
+        memory = record_memory()
+        audit_record = update_pipeline_audit(
             audit_id,
             "completed",
             row_count,
             None,
+            metrics,
+            source_fingerprint=fingerprint,
+            # Loads without their own transform wait for the run's dbt phase
+            transformed=not skip_transform,
         )
 
+        pipeline_config["rows_loaded"] = metrics.get("rows_loaded", 0)
+
+        regression = detect_run_regression(audit_record)
+        if regression:
+            notify_performance_regression(pipeline_id, regression)
+
         # Step 3: Send notification
         notify_pipeline_status(
             pipeline_id,
             "success",
             message="Pipeline completed successfully",
             records_processed=row_count,
+            memory=memory,
         )
 
         return True, None
 
     except Exception as e:
-        error_msg = f"Pipeline failed: {str(e)}"
-        logger.error(error_msg)
-        logger.error(traceback.format_exc())
+        if is_timeout_error(e):
+            # Only this pipeline stops; the caller moves on to the next ones
+            status = "timeout"
+            error_msg = f"Pipeline timed out: {str(e)}"
+            pipeline_config["timed_out"] = True
+            logger.error(error_msg)
+        else:
+            status = "failed"
+            error_msg = f"Pipeline failed: {str(e)}"
+            logger.error(error_msg)
+            logger.error(traceback.format_exc())
 
+        memory = record_memory()
         update_pipeline_audit(
             audit_id,
-            "failed",
+            status,
             0,
             error_msg,
+            metrics,
         )
 
-        notify_pipeline_status(pipeline_id, "failure", error_message=error_msg)
+        notify_pipeline_status(
+            pipeline_id,
+            "timeout" if pipeline_config["timed_out"] else "failure",
+            error_message=error_msg,
+            memory=memory,
+        )
 
         return False, error_msg
+    finally:
+        # Skipped runs do not record memory, but the profile must be closed
+        if memory_profile is not None:
+            memory_profile.finish()
 
 
 def create_required_schemas():
@@ -460,6 +1210,8 @@ def create_required_schemas():
     Create all required schemas for ETL process
     """
     try:
+        from sqlalchemy import text
+
         engine = get_db_engine()
         schemas = ["bronze", "silver", "gold"]
 
@@ -482,27 +1234,74 @@ def main():
     Main function to run the ETL pipeline.
     The pipeline follows two phases:
     Phase 1: Load all tables from S3 to PostgreSQL public schema
+             (for one date, longest pipelines first on --workers, or
+             concurrently for a --from/--to backfill)
     Phase 2: Run dbt transformations once for all tables
+
+    With a run deadline (--run-timeout or RUN_TIMEOUT_SECONDS), pipelines and
+    dbt stop when it passes; pipelines not started by then are recorded as
+    'timeout'.
     """
+    from src.backfill import get_backfill_dates, run_backfill
+    from src.scheduler import plan_schedule, report_schedule, run_schedule
+
+    configure_logging()
+
     try:
         parser = argparse.ArgumentParser(
             description="Run ETL pipeline for specific date"
         )
         parser.add_argument("--date", type=str, help="Date in format YYYYMMDD")
+        parser.add_argument(
+            "--from",
+            dest="date_from",
+            type=str,
+            help="Backfill start date in format YYYYMMDD (requires --to)",
+        )
+        parser.add_argument(
+            "--to",
+            dest="date_to",
+            type=str,
+            help="Backfill end date in format YYYYMMDD, inclusive (requires --from)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="Pipelines loaded concurrently (default: 1, or 4 units of a "
+            "backfill)",
+        )
         parser.add_argument(
             "--pipeline-id", type=str, help="Run specific pipeline by ID"
         )
         parser.add_argument(
             "--load-type",
             type=str,
-            choices=["full", "incremental"],
-            help="Override load type (full or incremental)",
+            choices=["full", "incremental", "cdc", "append"],
+            help="Override load type (full, incremental, cdc, or append: "
+            "incremental without the watermark)",
         )
         parser.add_argument(
             "--skip-load",
             action="store_true",
             help="Skip loading data from S3 to PostgreSQL, only run dbt transformations",
         )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Load and transform even when the S3 source is unchanged",
+        )
+        parser.add_argument(
+            "--plan",
+            action="store_true",
+            help="Dry run: estimate rows, bytes and duration per pipeline "
+            "without loading anything",
+        )
+        parser.add_argument(
+            "--run-timeout",
+            type=int,
+            help="Stop the run after this many seconds (default: "
+            "RUN_TIMEOUT_SECONDS, 0 disables it)",
+        )
         args = parser.parse_args()
 
         date_prefix = None
@@ -514,6 +1313,20 @@ def main():
                 logger.error("Date must be in format YYYYMMDD")
                 return False
 
+        backfill_dates = None
+        if args.date_from or args.date_to:
+            if not (args.date_from and args.date_to) or args.date:
+                logger.error("--from and --to must be used together and without --date")
+                return False
+            try:
+                backfill_dates = get_backfill_dates(args.date_from, args.date_to)
+            except ValueError as e:
+                logger.error(f"Invalid backfill range: {str(e)}")
+                return False
+
+        if not args.plan:
+            maintain_audit_partitions(get_settings()["audit_retention_months"])
+
         pipeline_configs = get_pipeline_config()
         if not pipeline_configs:
             logger.error("No pipeline configuration found")
@@ -531,49 +1344,119 @@ def main():
 
         success_count = 0
         failure_count = 0
+        changed_tables = []
+
+        for pipeline_config in pipeline_configs:
+            pipeline_config["pipeline_id"] = pipeline_config["id"]
+
+            # Override load type if specified
+            if args.load_type:
+                original_load_type = pipeline_config["load_type"]
+                pipeline_config["load_type"] = args.load_type
+                logger.info(
+                    f"Overriding load type for pipeline {pipeline_config['id']}: "
+                    f"{original_load_type} -> {args.load_type}"
+                )
+
+            # Force all tables to be loaded to public schema
+            pipeline_config["schema_name"] = "public"
+
+        workers = max(1, args.workers or (4 if backfill_dates else 1))
+
+        if args.plan:
+            from src.run_plan import plan_run, print_plan
+
+            units = plan_run(
+                pipeline_configs, backfill_dates or [date_prefix], force=args.force
+            )
+            print_plan(units, workers=workers)
+            return True
+
+        run_deadline = get_run_deadline(args.run_timeout)
 
         # Phase 1: Load all tables from S3 to PostgreSQL (skip if --skip-load is set)
-        if not args.skip_load:
+        if args.skip_load:
+            logger.info("Skipping Phase 1: Loading data from S3 to PostgreSQL")
+        elif backfill_dates:
+            logger.info("Phase 1: Backfilling tables from S3 to PostgreSQL")
+            # Within each date, the longest pipelines are submitted first
+            schedule, _ = plan_schedule(pipeline_configs, workers)
+            success_count, failure_count, changed_tables = run_backfill(
+                [entry["pipeline_config"] for entry in schedule],
+                backfill_dates,
+                workers=workers,
+                force=args.force,
+                run_deadline=run_deadline,
+            )
+        else:
             logger.info("Phase 1: Loading tables from S3 to PostgreSQL")
-            for pipeline_config in pipeline_configs:
-                pipeline_config["pipeline_id"] = pipeline_config["id"]
-
-                # Override load type if specified
-                if args.load_type:
-                    original_load_type = pipeline_config["load_type"]
-                    pipeline_config["load_type"] = args.load_type
-                    logger.info(
-                        f"Overriding load type for pipeline {pipeline_config['id']}: "
-                        f"{original_load_type} -> {args.load_type}"
-                    )
-
-                # Force all tables to be loaded to public schema
-                pipeline_config["schema_name"] = "public"
-                success, error_msg = process_pipeline(
-                    pipeline_config, date_prefix, skip_transform=True
-                )
+            schedule, planned_makespan = plan_schedule(pipeline_configs, workers)
+            actual_makespan = run_schedule(
+                schedule,
+                workers,
+                lambda config: process_pipeline(
+                    config,
+                    date_prefix,
+                    skip_transform=True,
+                    force=args.force,
+                    run_deadline=run_deadline,
+                ),
+            )
+            report_schedule(schedule, planned_makespan, actual_makespan)
+            for entry in schedule:
+                pipeline_config = entry["pipeline_config"]
+                success, error_msg = entry["result"]
                 if success:
                     success_count += 1
+                    if not pipeline_config.get("skipped"):
+                        changed_tables.append(pipeline_config["source_table"])
                 else:
                     failure_count += 1
+                    outcome = (
+                        "timed out" if pipeline_config.get("timed_out") else "failed"
+                    )
                     logger.error(
-                        f"Pipeline {pipeline_config['id']} failed: {error_msg}"
+                        f"Pipeline {pipeline_config['id']} {outcome}: {error_msg}"
                     )
-        else:
-            logger.info("Skipping Phase 1: Loading data from S3 to PostgreSQL")
 
-        # Phase 2: Run dbt transformations
-        logger.info("Phase 2: Running dbt transformations")
-        success, error_msg = run_dbt_command(
-            command="run",
-            full_refresh=args.load_type == "full" if args.load_type else False,
-        )
+        # Phase 2: Run dbt transformations, only downstream of changed sources
+        # unless loading was skipped (then everything is rebuilt). Sources
+        # whose last dbt run failed are unchanged now but still stale downstream
+        pending_loads = get_untransformed_loads([p["id"] for p in pipeline_configs])
+        select = None
+        if not args.skip_load:
+            stale_tables = {load["source_table"] for load in pending_loads}
+            retried = sorted(stale_tables - set(changed_tables))
+            if retried:
+                logger.info(
+                    "Retrying dbt downstream of unchanged sources whose last "
+                    f"transformation failed: {', '.join(retried)}"
+                )
+            select = " ".join(
+                f"source:postgres_raw.{table}+"
+                for table in sorted(stale_tables | set(changed_tables))
+            )
 
-        if not success:
-            logger.error(f"dbt transformation failed: {error_msg}")
+        if select == "":
+            logger.info("Skipping Phase 2: no source changed since the last run")
+        elif run_deadline.expired():
+            logger.error("Skipping Phase 2: the run deadline has passed")
             failure_count += 1
         else:
-            success_count += 1
+            logger.info("Phase 2: Running dbt transformations")
+            success, error_msg = run_dbt_command(
+                command="run",
+                select=select,
+                full_refresh=args.load_type == "full" if args.load_type else False,
+                timeout=run_deadline.cap(get_settings()["dbt_timeout_seconds"]),
+            )
+
+            if not success:
+                logger.error(f"dbt transformation failed: {error_msg}")
+                failure_count += 1
+            else:
+                mark_loads_transformed([load["audit_id"] for load in pending_loads])
+                success_count += 1
 
         # Send consolidated email notification for all pipelines
         send_consolidated_notifications()
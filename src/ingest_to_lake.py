@@ -1,16 +1,21 @@
 import os
-import boto3
 import argparse
-from pyspark.sql import SparkSession
-from dotenv import load_dotenv
 from datetime import datetime
+from src.config import get_settings
+from src.lake_writer import (
+    compact_local_partition,
+    get_write_options,
+    lake_prefix,
+    spark_write_options,
+    write_lake_partition,
+)
 
-load_dotenv()
+PROCESSED_ROOT = "sample_data/processed"
 
-AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
-AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
-AWS_BUCKET_NAME = os.getenv("AWS_BUCKET_NAME")
-AWS_REGION = os.getenv("AWS_REGION")
+ENGINES = ("auto", "spark", "arrow")
+
+# Bytes of JSON parsed per block (and thread) by the pyarrow reader
+ARROW_JSON_BLOCK_BYTES = 16 * 1024 * 1024
 
 
 def get_raw_data_folder(date_prefix=None):
@@ -52,6 +57,8 @@ def get_json_files(folder_path, prefix=None):
 
 
 def create_spark_session():
+    from pyspark.sql import SparkSession
+
     print("Creating Spark session...")
     spark = SparkSession.builder.appName("DataIngestion").getOrCreate()
     return spark
@@ -62,10 +69,71 @@ def read_json_to_df(spark, file_path):
     return spark.read.json(file_path)
 
 
-def write_df_to_parquet(df, file_path):
+def write_df_to_parquet(df, file_path, write_options=None):
     print(f"Writing data to {file_path}...")
     os.makedirs(os.path.dirname(file_path), exist_ok=True)
-    df.write.mode("overwrite").parquet(file_path)
+    df.write.mode("overwrite").options(**spark_write_options(write_options)).parquet(
+        file_path
+    )
+    # Spark writes one part file per task; merge them into target-size files
+    files_before, files_after = compact_local_partition(
+        file_path, write_options=write_options
+    )
+    if files_after != files_before:
+        print(f"Compacted {files_before} part files into {files_after}")
+
+
+def choose_engine(engine, input_path):
+    """Resolve --engine for one input file: small files skip Spark."""
+    if engine != "auto":
+        return engine
+    if os.path.getsize(input_path) <= get_settings()["arrow_max_input_bytes"]:
+        return "arrow"
+    return "spark"
+
+
+def _spark_compatible_schema(schema):
+    import pyarrow as pa
+
+    # Spark keeps timestamp-like strings as strings, types all-null fields as
+    # strings and orders columns by name
+    fields = [
+        (
+            pa.field(field.name, pa.string())
+            if pa.types.is_timestamp(field.type) or pa.types.is_null(field.type)
+            else field
+        )
+        for field in schema
+    ]
+    return pa.schema(sorted(fields, key=lambda field: field.name))
+
+
+def convert_json_with_arrow(input_path, output_dir, write_options=None):
+    """
+    Convert a JSON lines file to the Parquet files of a partition with
+    pyarrow, parsing blocks on all cores. Only used for files up to
+    ARROW_MAX_INPUT_MB, which are read into memory whole.
+
+    Raises pyarrow.ArrowInvalid when blocks of the file infer conflicting
+    types.
+    """
+    from pyarrow import json as pa_json
+
+    print(f"Converting {input_path} with pyarrow...")
+    read_options = pa_json.ReadOptions(block_size=ARROW_JSON_BLOCK_BYTES)
+    table = pa_json.read_json(input_path, read_options=read_options)
+    schema = _spark_compatible_schema(table.schema)
+    if schema.types != [table.schema.field(name).type for name in schema.names]:
+        # Parse the retyped fields again as the strings they are in the file
+        table = pa_json.read_json(
+            input_path,
+            read_options=read_options,
+            parse_options=pa_json.ParseOptions(explicit_schema=schema),
+        )
+    table = table.select(schema.names)
+
+    os.makedirs(output_dir, exist_ok=True)
+    return write_lake_partition(table, output_dir, write_options=write_options)
 
 
 def upload_directory_to_s3(directory_path, bucket_name, s3_key_prefix):
@@ -76,18 +144,21 @@ def upload_directory_to_s3(directory_path, bucket_name, s3_key_prefix):
         f"Uploading directory {directory_path} to S3 bucket {bucket_name} "
         f"with key prefix {s3_key_prefix}..."
     )
+    import boto3
+
+    settings = get_settings()
     s3_client = boto3.client(
         "s3",
-        aws_access_key_id=AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-        region_name=AWS_REGION,
+        aws_access_key_id=settings["aws_access_key_id"],
+        aws_secret_access_key=settings["aws_secret_access_key"],
+        region_name=settings["aws_region"],
     )
 
     for root, dirs, files in os.walk(directory_path):
         for file in files:
             local_path = os.path.join(root, file)
-            relative_path = os.path.basename(os.path.dirname(local_path))
-            s3_key = f"{s3_key_prefix}/{relative_path}/{os.path.basename(local_path)}"
+            relative_path = os.path.relpath(local_path, directory_path)
+            s3_key = f"{s3_key_prefix}/{relative_path.replace(os.sep, '/')}"
             print(f"Uploading {local_path} to {s3_key}...")
             s3_client.upload_file(local_path, bucket_name, s3_key)
 
@@ -98,6 +169,13 @@ def parse_arguments():
     parser.add_argument(
         "--prefix", type=str, help="File prefix to process (e.g., 'customers_test')"
     )
+    parser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default="auto",
+        help="Conversion engine; auto uses pyarrow for files up to "
+        "ARROW_MAX_INPUT_MB and Spark above",
+    )
     return parser.parse_args()
 
 
@@ -123,7 +201,9 @@ def main():
                 + (f" with prefix {args.prefix}" if args.prefix else "")
             )
 
-        spark = create_spark_session()
+        # Only started once a file needs it
+        spark = None
+        partition_prefixes = []
 
         for json_file in json_files:
             print(f"\nProcessing {json_file}...")
@@ -131,26 +211,50 @@ def main():
             base_name = os.path.splitext(json_file)[0]
 
             input_path = os.path.join(raw_folder, json_file)
-            processed_base_path = f"sample_data/processed/{folder_date}"
-            processed_path = os.path.join(processed_base_path, base_name)
-
-            df = read_json_to_df(spark, input_path)
-            write_df_to_parquet(df, processed_path)
+            # <date>/<source> or source=<source>/date=<date>, per LAKE_LAYOUT
+            partition_prefix = lake_prefix(base_name, folder_date).rstrip("/")
+            processed_path = os.path.join(PROCESSED_ROOT, partition_prefix)
+            write_options = get_write_options(base_name)
+
+            engine = choose_engine(args.engine, input_path)
+            if engine == "arrow":
+                import pyarrow as pa
+
+                try:
+                    convert_json_with_arrow(input_path, processed_path, write_options)
+                except pa.ArrowInvalid as e:
+                    if args.engine == "arrow":
+                        raise
+                    print(f"pyarrow could not convert {json_file} ({e}), using Spark")
+                    engine = "spark"
+
+            if engine == "spark":
+                if spark is None:
+                    spark = create_spark_session()
+                df = read_json_to_df(spark, input_path)
+                write_df_to_parquet(df, processed_path, write_options)
+            partition_prefixes.append(partition_prefix)
 
         # Upload all processed data to S3
-        s3_prefix = folder_date
-        processed_base_path = f"sample_data/processed/{folder_date}"
-        upload_directory_to_s3(processed_base_path, AWS_BUCKET_NAME, s3_prefix)
+        bucket_name = get_settings()["aws_bucket_name"]
+        for partition_prefix in partition_prefixes:
+            upload_directory_to_s3(
+                os.path.join(PROCESSED_ROOT, partition_prefix),
+                bucket_name,
+                partition_prefix,
+            )
 
-        spark.stop()
+        if spark is not None:
+            spark.stop()
+            print("Spark session stopped.")
         print("\nData processing completed successfully!")
-        print(f"Processed data saved to: {processed_base_path}")
-        print(f"Data uploaded to S3: s3://{AWS_BUCKET_NAME}/{s3_prefix}/")
-        print("Spark session stopped.")
+        print(f"Processed data saved to: {PROCESSED_ROOT}")
+        for partition_prefix in partition_prefixes:
+            print(f"Data uploaded to S3: s3://{bucket_name}/{partition_prefix}/")
 
     except Exception as e:
         print(f"Error processing data: {str(e)}")
-        if "spark" in locals():
+        if locals().get("spark") is not None:
             spark.stop()
         raise
 
@@ -8,40 +8,28 @@ This script creates necessary database tables for the ETL Metadata-Driven Framew
 
 import os
 import sys
-import psycopg2
-from dotenv import load_dotenv
 import logging
+from src.config import configure_logging, get_settings
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[logging.StreamHandler()],
-)
 logger = logging.getLogger(__name__)
 
 
-load_dotenv()
-
-DB_HOST = os.getenv("POSTGRES_HOST")
-DB_PORT = os.getenv("POSTGRES_PORT")
-DB_NAME = os.getenv("POSTGRES_DATABASE")
-DB_USER = os.getenv("POSTGRES_USER")
-DB_PASSWORD = os.getenv("POSTGRES_PASSWORD")
-
-
 DEFAULT_SQL_FILE = "sql/create_metadata_tables.sql"
 
 
 def connect_to_database():
+    import psycopg2
+
+    settings = get_settings()
     try:
         connection = psycopg2.connect(
-            host=DB_HOST,
-            port=DB_PORT,
-            dbname=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD,
+            host=settings["db_host"],
+            port=settings["db_port"],
+            dbname=settings["db_name"],
+            user=settings["db_user"],
+            password=settings["db_password"],
         )
-        logger.info(f"Successfully connected to database {DB_NAME}")
+        logger.info(f"Successfully connected to database {settings['db_name']}")
         return connection
     except Exception as e:
         logger.error(f"Database connection error: {str(e)}")
@@ -66,7 +54,19 @@ def create_tables_from_file(connection, sql_file_path):
 
 
 def add_controller_entry(
-    data_source, source, destination, schema_name="public", load_type="full"
+    data_source,
+    source,
+    destination,
+    schema_name="public",
+    load_type="full",
+    select_columns=None,
+    row_filter=None,
+    business_keys=None,
+    load_profile="default",
+    cdc_op_column=None,
+    cdc_order_column=None,
+    resource_weight=1,
+    timeout_seconds=None,
 ):
     connection = connect_to_database()
 
@@ -83,10 +83,26 @@ def add_controller_entry(
                     """
                     UPDATE controller
                     SET schema_name = %s, load_type = %s, data_source = %s,
+                    select_columns = %s, row_filter = %s, business_keys = %s,
+                    load_profile = %s, cdc_op_column = %s, cdc_order_column = %s,
+                    resource_weight = %s, timeout_seconds = %s,
                     updated_at = CURRENT_TIMESTAMP
                     WHERE id = %s
                     """,
-                    (schema_name, load_type, data_source, existing_row[0]),
+                    (
+                        schema_name,
+                        load_type,
+                        data_source,
+                        select_columns,
+                        row_filter,
+                        business_keys,
+                        load_profile,
+                        cdc_op_column,
+                        cdc_order_column,
+                        resource_weight,
+                        timeout_seconds,
+                        existing_row[0],
+                    ),
                 )
                 logger.info(
                     f"Updated configuration: {source} -> {schema_name}.{destination}"
@@ -95,10 +111,26 @@ def add_controller_entry(
                 cursor.execute(
                     """
                     INSERT INTO controller
-                    (data_source, source_table, destination_table, schema_name, load_type)
-                    VALUES (%s, %s, %s, %s, %s)
+                    (data_source, source_table, destination_table, schema_name,
+                    load_type, select_columns, row_filter, business_keys, load_profile,
+                    cdc_op_column, cdc_order_column, resource_weight, timeout_seconds)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
                     """,
-                    (data_source, source, destination, schema_name, load_type),
+                    (
+                        data_source,
+                        source,
+                        destination,
+                        schema_name,
+                        load_type,
+                        select_columns,
+                        row_filter,
+                        business_keys,
+                        load_profile,
+                        cdc_op_column,
+                        cdc_order_column,
+                        resource_weight,
+                        timeout_seconds,
+                    ),
                 )
                 logger.info(
                     f"Added new configuration: {source} -> {schema_name}.{destination}"
@@ -116,6 +148,7 @@ def add_controller_entry(
 
 
 def main():
+    configure_logging()
     logger.info("Connecting to database...")
     connection = connect_to_database()
 
@@ -0,0 +1,206 @@
+"""
+Lake Query Module for ETL Metadata Framework
+--------------------------------------------
+This module runs ad-hoc SQL over the processed Parquet lake (flat
+`<root>/<date>/<data_source>/` or Hive `<root>/source=<data_source>/date=<date>/`
+layout, locally or on S3) with an embedded DuckDB engine:
+1. Every data source is exposed as a view over the Parquet files of the
+   selected dates (a list, a glob such as 202503*, or a --from/--to range)
+2. Only the columns and row groups a query needs are read, since DuckDB
+   pushes projections and predicates down into the Parquet scan
+3. Each view has a _date column taken from the file path
+
+Example:
+    python -m src.lake_query --from 20250323 --to 20250324 \\
+        "SELECT _date, count(*) FROM orders GROUP BY 1"
+"""
+
+import os
+import re
+import glob
+import logging
+import argparse
+from src.config import configure_logging, get_settings
+from src.lake_writer import get_lake_layout, lake_prefix
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOCAL_ROOT = os.path.join("sample_data", "processed")
+
+_DATE_PATTERN = re.compile(r"^\d{8}$")
+
+
+def is_s3_root(root):
+    return root.startswith("s3://")
+
+
+def discover_sources(root, dates=None):
+    """List the data sources present under a local lake root."""
+    if get_lake_layout() == "hive":
+        return sorted(
+            os.path.basename(path)[len("source=") :]
+            for path in glob.glob(os.path.join(root, "source=*"))
+            if os.path.isdir(path)
+        )
+
+    sources = set()
+    for date_pattern in dates or ["*"]:
+        for path in glob.glob(os.path.join(root, date_pattern, "*")):
+            date_dir = os.path.basename(os.path.dirname(path))
+            if os.path.isdir(path) and _DATE_PATTERN.match(date_dir):
+                sources.add(os.path.basename(path))
+    return sorted(sources)
+
+
+def lake_paths(root, data_source, dates=None):
+    """
+    Return the Parquet globs of a data source for the selected dates.
+
+    Local globs that match no file are left out so a missing date does not
+    fail the whole query.
+    """
+    paths = [
+        f"{root.rstrip('/')}/{lake_prefix(data_source, date_pattern)}*.parquet"
+        for date_pattern in dates or ["*"]
+    ]
+    if is_s3_root(root):
+        return paths
+    return [path for path in paths if glob.glob(path)]
+
+
+def _sql_literal(value):
+    return "'" + str(value or "").replace("'", "''") + "'"
+
+
+def _configure_s3(con):
+    settings = get_settings()
+    con.execute("INSTALL httpfs")
+    con.execute("LOAD httpfs")
+    con.execute(
+        "CREATE OR REPLACE SECRET lake_s3 (TYPE s3, "
+        f"KEY_ID {_sql_literal(settings['aws_access_key_id'])}, "
+        f"SECRET {_sql_literal(settings['aws_secret_access_key'])}, "
+        f"REGION {_sql_literal(settings['aws_region'])})"
+    )
+
+
+def connect_lake(root, sources=None, dates=None):
+    """
+    Open an in-memory DuckDB connection with one view per data source.
+
+    Parameters:
+    -----------
+    root : str
+        Local lake directory or s3://bucket[/prefix]
+    sources : list, optional
+        Data sources to expose (default: discovered under a local root)
+    dates : list, optional
+        Date directories or glob patterns (default: all dates)
+    """
+    import duckdb
+
+    con = duckdb.connect()
+    if is_s3_root(root):
+        _configure_s3(con)
+        if not sources:
+            raise ValueError("--source is required when querying S3")
+    elif not sources:
+        sources = discover_sources(root, dates)
+
+    for data_source in sources:
+        paths = lake_paths(root, data_source, dates)
+        if not paths:
+            logger.warning(f"No Parquet files for '{data_source}', view not created")
+            continue
+        path_list = ", ".join(_sql_literal(path) for path in paths)
+        con.execute(f"""
+            CREATE VIEW "{data_source}" AS
+            SELECT * EXCLUDE (filename),
+                   regexp_extract(filename, '(?:^|/)(?:date=)?(\\d{{8}})/', 1) AS _date
+            FROM read_parquet([{path_list}], union_by_name = true, filename = true)
+            """)
+        logger.info(f"View '{data_source}' over {len(paths)} path(s)")
+
+    return con
+
+
+def resolve_dates(args):
+    if args.date_from or args.date_to:
+        from src.backfill import get_backfill_dates
+
+        if not (args.date_from and args.date_to):
+            raise ValueError("--from and --to must be used together")
+        return get_backfill_dates(args.date_from, args.date_to)
+    return args.dates
+
+
+def main():
+    configure_logging()
+
+    parser = argparse.ArgumentParser(
+        description="Query the processed Parquet lake with SQL"
+    )
+    parser.add_argument(
+        "sql",
+        nargs="?",
+        help="SQL to run; without it the available views and row counts are listed",
+    )
+    parser.add_argument(
+        "--root",
+        default=DEFAULT_LOCAL_ROOT,
+        help="Lake root directory or s3://bucket (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--s3",
+        action="store_true",
+        help="Query s3://<AWS_BUCKET_NAME> instead of --root",
+    )
+    parser.add_argument(
+        "--source",
+        action="append",
+        dest="sources",
+        help="Data source to expose as a view (repeatable)",
+    )
+    parser.add_argument(
+        "--date",
+        action="append",
+        dest="dates",
+        help="Date directory or glob pattern, e.g. 20250324 or 202503* (repeatable)",
+    )
+    parser.add_argument("--from", dest="date_from", help="First date (YYYYMMDD)")
+    parser.add_argument("--to", dest="date_to", help="Last date (YYYYMMDD)")
+    parser.add_argument(
+        "--explain", action="store_true", help="Show the query plan instead"
+    )
+    parser.add_argument(
+        "--max-rows", type=int, default=50, help="Rows to print (default: 50)"
+    )
+
+    args = parser.parse_args()
+
+    root = args.root
+    if args.s3:
+        root = f"s3://{get_settings()['aws_bucket_name']}"
+
+    try:
+        con = connect_lake(root, args.sources, resolve_dates(args))
+    except ValueError as e:
+        parser.error(str(e))
+
+    if not args.sql:
+        views = [row[0] for row in con.execute("SHOW TABLES").fetchall()]
+        for view in views:
+            count = con.execute(f'SELECT count(*) FROM "{view}"').fetchone()[0]
+            print(f"{view}: {count} rows")
+            con.sql(f'DESCRIBE "{view}"').show()
+        return
+
+    if args.explain:
+        for _, plan in con.execute(f"EXPLAIN ANALYZE {args.sql}").fetchall():
+            print(plan)
+    else:
+        con.sql(args.sql).show(max_rows=args.max_rows)
+
+
+if __name__ == "__main__":
+    main()
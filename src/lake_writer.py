@@ -0,0 +1,576 @@
+"""
+Lake Writer Module for ETL Metadata Framework
+---------------------------------------------
+This module owns the layout and file sizing of the processed Parquet lake:
+1. Resolving the prefix of a (data_source, date) partition for the configured
+   layout: flat (`<date>/<source>/`) or Hive (`source=<source>/date=<date>/`)
+2. Writing Arrow data into files close to a target size with a fixed
+   row-group size, using the codec, encoding and sizing configured for the
+   data source in parquet_write_settings
+3. Compacting partitions made of many small files (e.g. Spark output), locally
+   or on S3
+
+S3 has no atomic rename, so an S3 compaction switches files through the
+partition's _manifest.json: files being uploaded are listed as pending and
+the files they replace as replaced, and readers going through
+apply_manifests (etl.list_parquet_objects) skip both. The manifest also
+keeps the objects the compacted files were made from, so compaction does not
+change the source fingerprint of the partition. DuckDB globs (src.lake_query)
+do not read manifests and may see both sets while a compaction runs.
+
+Usage:
+    python -m src.lake_writer --date 20250324 [--source orders] [--s3]
+"""
+
+import os
+import glob
+import json
+import uuid
+import logging
+import argparse
+import tempfile
+from src.config import configure_logging, get_settings
+
+logger = logging.getLogger(__name__)
+
+LAKE_LAYOUTS = ("flat", "hive")
+DEFAULT_LOCAL_ROOT = os.path.join("sample_data", "processed")
+
+# A partition is compacted when it has several files and one of them is
+# smaller than this fraction of the target file size
+SMALL_FILE_FRACTION = 0.5
+
+PARQUET_CODECS = ("snappy", "zstd", "gzip", "brotli", "lz4", "none")
+
+# Codecs whose compression level can be set
+LEVELED_CODECS = ("zstd", "gzip", "brotli")
+
+MANIFEST_NAME = "_manifest.json"
+
+
+def get_lake_layout():
+    layout = (get_settings()["lake_layout"] or "flat").lower()
+    if layout not in LAKE_LAYOUTS:
+        logger.warning(f"Unknown lake layout '{layout}', using 'flat'")
+        return "flat"
+    return layout
+
+
+def lake_prefix(data_source, date_prefix=None, layout=None):
+    """Return the relative prefix (with trailing slash) of a lake partition."""
+    layout = layout or get_lake_layout()
+    if layout == "hive":
+        if date_prefix:
+            return f"source={data_source}/date={date_prefix}/"
+        return f"source={data_source}/"
+    if date_prefix:
+        return f"{date_prefix}/{data_source}/"
+    return f"{data_source}/"
+
+
+def get_write_options(data_source):
+    """
+    Return the parquet_write_settings of a data source without its NULL
+    fields; {} (the defaults) when it has none or the metadata store cannot
+    be reached.
+    """
+    from src.metadata_manager import get_parquet_write_settings
+
+    try:
+        row = get_parquet_write_settings(data_source)
+    except Exception as e:
+        logger.warning(f"Using default Parquet settings for {data_source}: {e}")
+        return {}
+    return {key: value for key, value in (row or {}).items() if value is not None}
+
+
+def _dictionary_columns(write_options):
+    columns = write_options.get("dictionary_columns") or ""
+    return [column.strip() for column in columns.split(",") if column.strip()]
+
+
+def parquet_writer_kwargs(write_options=None):
+    """Translate write options into pyarrow.parquet.ParquetWriter arguments."""
+    write_options = write_options or {}
+    compression = (write_options.get("compression") or "snappy").lower()
+    if compression not in PARQUET_CODECS:
+        raise ValueError(f"Unsupported Parquet compression '{compression}'")
+
+    kwargs = {"compression": compression}
+    if (
+        compression in LEVELED_CODECS
+        and write_options.get("compression_level") is not None
+    ):
+        kwargs["compression_level"] = int(write_options["compression_level"])
+    if write_options.get("page_size_bytes"):
+        kwargs["data_page_size"] = int(write_options["page_size_bytes"])
+    use_dictionary = write_options.get("use_dictionary", True)
+    columns = _dictionary_columns(write_options)
+    kwargs["use_dictionary"] = columns if use_dictionary and columns else use_dictionary
+    return kwargs
+
+
+def spark_write_options(write_options=None):
+    """
+    Translate write options into DataFrameWriter options. Spark sizes row
+    groups in bytes, so row_group_rows is only applied by the pyarrow writers
+    (including the compaction of Spark output).
+    """
+    kwargs = parquet_writer_kwargs(write_options)
+    compression = kwargs["compression"]
+    options = {"compression": "uncompressed" if compression == "none" else compression}
+    if "compression_level" in kwargs and compression == "zstd":
+        options["parquet.compression.codec.zstd.level"] = str(
+            kwargs["compression_level"]
+        )
+    if "data_page_size" in kwargs:
+        options["parquet.page.size"] = str(kwargs["data_page_size"])
+    if isinstance(kwargs["use_dictionary"], list):
+        options["parquet.enable.dictionary"] = "false"
+        for column in kwargs["use_dictionary"]:
+            options[f"parquet.enable.dictionary#{column}"] = "true"
+    else:
+        options["parquet.enable.dictionary"] = str(kwargs["use_dictionary"]).lower()
+    return options
+
+
+def _new_file_name():
+    return f"part-{uuid.uuid4().hex}.parquet"
+
+
+def _row_groups(batches, row_group_rows):
+    """Regroup record batches into tables of exactly `row_group_rows` rows."""
+    import pyarrow as pa
+
+    pending = []
+    pending_rows = 0
+    for batch in batches:
+        pending.append(batch)
+        pending_rows += batch.num_rows
+        while pending_rows >= row_group_rows:
+            table = pa.Table.from_batches(pending)
+            yield table.slice(0, row_group_rows)
+            rest = table.slice(row_group_rows)
+            pending = rest.to_batches()
+            pending_rows = rest.num_rows
+    if pending_rows:
+        yield pa.Table.from_batches(pending)
+
+
+def write_parquet_files(
+    batches, schema, output_dir, rows_per_file, row_group_rows, write_options=None
+):
+    """
+    Write record batches into Parquet files of `rows_per_file` rows (a
+    multiple of `row_group_rows`) with row groups of `row_group_rows` rows,
+    encoded as set by `write_options` (a parquet_write_settings row).
+
+    Files are written with a .tmp suffix; returns their paths so the caller
+    can publish them once the whole partition is written.
+    """
+    import pyarrow.parquet as pq
+
+    writer_kwargs = parquet_writer_kwargs(write_options)
+    os.makedirs(output_dir, exist_ok=True)
+    written = []
+    writer = None
+    rows_in_file = 0
+
+    try:
+        for row_group in _row_groups(batches, row_group_rows):
+            if writer is None:
+                path = os.path.join(output_dir, _new_file_name() + ".tmp")
+                writer = pq.ParquetWriter(path, schema, **writer_kwargs)
+                written.append(path)
+                rows_in_file = 0
+            writer.write_table(row_group, row_group_size=row_group_rows)
+            rows_in_file += row_group.num_rows
+            if rows_in_file >= rows_per_file:
+                writer.close()
+                writer = None
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return written
+
+
+def _publish(tmp_paths):
+    published = []
+    for tmp_path in tmp_paths:
+        path = tmp_path[: -len(".tmp")]
+        os.replace(tmp_path, path)
+        published.append(path)
+    return published
+
+
+def _remove_with_checksum(path):
+    os.remove(path)
+    # Spark writes a .<name>.crc checksum next to every part file
+    checksum = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.crc")
+    if os.path.exists(checksum):
+        os.remove(checksum)
+
+
+def _rows_per_file(bytes_per_row, target_file_bytes, row_group_rows):
+    rows = int(target_file_bytes // max(bytes_per_row, 1))
+    # Whole row groups per file, and at least one
+    return max(row_group_rows, rows - rows % row_group_rows)
+
+
+def _resolve_row_group_rows(row_group_rows, write_options):
+    return (
+        row_group_rows
+        or (write_options or {}).get("row_group_rows")
+        or get_settings()["lake_row_group_rows"]
+    )
+
+
+def write_lake_partition(
+    table, output_dir, target_file_bytes=None, row_group_rows=None, write_options=None
+):
+    """
+    Replace the Parquet files of a partition directory with `table`.
+
+    The on-disk row size is estimated from the in-memory size, so files land
+    at or below the target size.
+    """
+    settings = get_settings()
+    target_file_bytes = target_file_bytes or settings["lake_target_file_bytes"]
+    row_group_rows = _resolve_row_group_rows(row_group_rows, write_options)
+
+    previous = glob.glob(os.path.join(output_dir, "*.parquet"))
+    bytes_per_row = table.nbytes / table.num_rows if table.num_rows else 1
+    tmp_paths = write_parquet_files(
+        table.to_batches(),
+        table.schema,
+        output_dir,
+        _rows_per_file(bytes_per_row, target_file_bytes, row_group_rows),
+        row_group_rows,
+        write_options,
+    )
+    for path in previous:
+        _remove_with_checksum(path)
+    published = _publish(tmp_paths)
+    logger.info(
+        f"Wrote {table.num_rows} rows to {len(published)} file(s) in {output_dir}"
+    )
+    return published
+
+
+def needs_compaction(file_sizes, target_file_bytes):
+    if len(file_sizes) < 2:
+        return False
+    return min(file_sizes) < target_file_bytes * SMALL_FILE_FRACTION
+
+
+def compact_local_partition(
+    partition_dir, target_file_bytes=None, row_group_rows=None, write_options=None
+):
+    """
+    Merge the small Parquet files of a local partition directory.
+
+    Files are streamed batch by batch, so memory stays bounded by a row group
+    rather than the partition. Returns (files_before, files_after).
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    settings = get_settings()
+    target_file_bytes = target_file_bytes or settings["lake_target_file_bytes"]
+    row_group_rows = _resolve_row_group_rows(row_group_rows, write_options)
+
+    paths = sorted(glob.glob(os.path.join(partition_dir, "*.parquet")))
+    sizes = [os.path.getsize(path) for path in paths]
+    if not needs_compaction(sizes, target_file_bytes):
+        return len(paths), len(paths)
+
+    parquet_files = [pq.ParquetFile(path) for path in paths]
+    schema = pa.unify_schemas([f.schema_arrow for f in parquet_files])
+    total_rows = sum(f.metadata.num_rows for f in parquet_files)
+    bytes_per_row = sum(sizes) / total_rows if total_rows else 1
+
+    def batches():
+        for parquet_file in parquet_files:
+            for batch in parquet_file.iter_batches(batch_size=row_group_rows):
+                # Files written on different days may miss or reorder columns
+                columns = [
+                    (
+                        batch.column(field.name)
+                        if field.name in batch.schema.names
+                        else pa.nulls(batch.num_rows, field.type)
+                    )
+                    for field in schema
+                ]
+                yield pa.RecordBatch.from_arrays(columns, schema=schema)
+
+    tmp_paths = write_parquet_files(
+        batches(),
+        schema,
+        partition_dir,
+        _rows_per_file(bytes_per_row, target_file_bytes, row_group_rows),
+        row_group_rows,
+        write_options,
+    )
+    for path in paths:
+        _remove_with_checksum(path)
+    published = _publish(tmp_paths)
+
+    logger.info(
+        f"Compacted {partition_dir}: {len(paths)} -> {len(published)} files "
+        f"({total_rows} rows)"
+    )
+    return len(paths), len(published)
+
+
+def _empty_manifest():
+    return {"pending": [], "replaced": [], "files": {}, "fingerprint_of": []}
+
+
+def read_manifest(s3_client, bucket_name, key):
+    """Return the partition manifest stored at `key`, or None."""
+    from botocore.exceptions import ClientError
+
+    try:
+        body = s3_client.get_object(Bucket=bucket_name, Key=key)["Body"].read()
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+            return None
+        raise
+    return {**_empty_manifest(), **json.loads(body)}
+
+
+def _write_manifest(s3_client, bucket_name, key, manifest):
+    # A single PUT replaces the object atomically for every later reader
+    s3_client.put_object(
+        Bucket=bucket_name,
+        Key=key,
+        Body=json.dumps(manifest).encode(),
+        ContentType="application/json",
+    )
+
+
+def _fingerprint_entry(obj):
+    return {"key": obj["key"], "etag": obj["etag"], "size": obj["size"]}
+
+
+def _apply_manifest(objects, directory, manifest):
+    def name_in_partition(obj):
+        rest = obj["key"][len(directory) :]
+        if obj["key"].startswith(directory) and "/" not in rest:
+            return rest
+        return None
+
+    hidden = set(manifest["pending"]) | set(manifest["replaced"])
+    visible = [obj for obj in objects if name_in_partition(obj) not in hidden]
+
+    current = {name_in_partition(obj): obj for obj in visible}
+    files = manifest["files"]
+    if files and all(
+        name in current and current[name]["etag"] == etag
+        for name, etag in files.items()
+    ):
+        # Unchanged compacted files fingerprint as the objects they replaced
+        for name in files:
+            current[name]["fingerprint_of"] = manifest["fingerprint_of"]
+    return visible
+
+
+def apply_manifests(s3_client, bucket_name, objects, manifest_keys):
+    """
+    Hide the objects that the compaction manifests of their partitions mark
+    as pending or replaced. `objects` are {key, etag, size} dicts; compacted
+    files that are still unchanged get `fingerprint_of`, the objects they
+    were made from.
+    """
+    for manifest_key in manifest_keys:
+        manifest = read_manifest(s3_client, bucket_name, manifest_key)
+        if manifest is not None:
+            directory = manifest_key[: -len(MANIFEST_NAME)]
+            objects = _apply_manifest(objects, directory, manifest)
+    return objects
+
+
+def _delete_objects(s3_client, bucket_name, keys):
+    for start in range(0, len(keys), 1000):
+        s3_client.delete_objects(
+            Bucket=bucket_name,
+            Delete={"Objects": [{"Key": key} for key in keys[start : start + 1000]]},
+        )
+
+
+def compact_s3_partition(
+    s3_client,
+    bucket_name,
+    prefix,
+    target_file_bytes=None,
+    row_group_rows=None,
+    write_options=None,
+):
+    """
+    Compact an S3 partition: download, merge locally, upload the new files as
+    pending in the manifest, switch the manifest to them in one PUT, then
+    delete the old objects. A compaction interrupted at any step is finished
+    or rolled back by the next one. Returns (files_before, files_after).
+    """
+    settings = get_settings()
+    target_file_bytes = target_file_bytes or settings["lake_target_file_bytes"]
+    manifest_key = prefix + MANIFEST_NAME
+
+    paginator = s3_client.get_paginator("list_objects_v2")
+    listed = [
+        {
+            "key": obj["Key"],
+            "etag": obj.get("ETag", "").strip('"'),
+            "size": obj["Size"],
+        }
+        for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix)
+        for obj in page.get("Contents", [])
+        if obj["Key"].endswith(".parquet") and "/" not in obj["Key"][len(prefix) :]
+    ]
+    manifest = read_manifest(s3_client, bucket_name, manifest_key)
+    if manifest is None:
+        manifest = _empty_manifest()
+
+    # Leftovers of an interrupted compaction: uploads that were never switched
+    # to, or replaced files that were not deleted yet
+    leftovers = [prefix + name for name in manifest["pending"] + manifest["replaced"]]
+    listed_keys = {obj["key"] for obj in listed}
+    if leftovers:
+        logger.info(f"Cleaning up an interrupted compaction of {prefix}")
+        _delete_objects(
+            s3_client, bucket_name, [key for key in leftovers if key in listed_keys]
+        )
+        objects = _apply_manifest(listed, prefix, manifest)
+        manifest = {**manifest, "pending": [], "replaced": []}
+        _write_manifest(s3_client, bucket_name, manifest_key, manifest)
+    else:
+        objects = _apply_manifest(listed, prefix, manifest)
+
+    if not needs_compaction([obj["size"] for obj in objects], target_file_bytes):
+        return len(objects), len(objects)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        for obj in objects:
+            s3_client.download_file(
+                bucket_name,
+                obj["key"],
+                os.path.join(work_dir, os.path.basename(obj["key"])),
+            )
+        _, files_after = compact_local_partition(
+            work_dir, target_file_bytes, row_group_rows, write_options
+        )
+        new_paths = glob.glob(os.path.join(work_dir, "*.parquet"))
+        new_names = [os.path.basename(path) for path in new_paths]
+
+        # Readers skip the new files until the manifest switches to them
+        _write_manifest(
+            s3_client, bucket_name, manifest_key, {**manifest, "pending": new_names}
+        )
+        for path, name in zip(new_paths, new_names):
+            s3_client.upload_file(path, bucket_name, prefix + name)
+
+    fingerprint_of = {}
+    for obj in objects:
+        for entry in obj.get("fingerprint_of") or [_fingerprint_entry(obj)]:
+            fingerprint_of[entry["key"]] = entry
+    committed = {
+        "pending": [],
+        "replaced": [os.path.basename(obj["key"]) for obj in objects],
+        "files": {
+            name: s3_client.head_object(Bucket=bucket_name, Key=prefix + name)[
+                "ETag"
+            ].strip('"')
+            for name in new_names
+        },
+        "fingerprint_of": sorted(fingerprint_of.values(), key=lambda e: e["key"]),
+    }
+    _write_manifest(s3_client, bucket_name, manifest_key, committed)
+
+    _delete_objects(s3_client, bucket_name, [obj["key"] for obj in objects])
+    _write_manifest(s3_client, bucket_name, manifest_key, {**committed, "replaced": []})
+
+    logger.info(
+        f"Compacted s3://{bucket_name}/{prefix}: {len(objects)} -> {files_after} files"
+    )
+    return len(objects), files_after
+
+
+def _local_sources(root, date_prefix, layout):
+    if layout == "hive":
+        pattern = os.path.join(root, "source=*", f"date={date_prefix}")
+        return sorted(
+            os.path.basename(os.path.dirname(path))[len("source=") :]
+            for path in glob.glob(pattern)
+        )
+    return sorted(
+        name
+        for name in os.listdir(os.path.join(root, date_prefix))
+        if os.path.isdir(os.path.join(root, date_prefix, name))
+    )
+
+
+def main():
+    configure_logging()
+
+    parser = argparse.ArgumentParser(
+        description="Compact small Parquet files in the processed lake"
+    )
+    parser.add_argument(
+        "--date",
+        action="append",
+        dest="dates",
+        required=True,
+        help="YYYYMMDD (repeatable)",
+    )
+    parser.add_argument(
+        "--source", action="append", dest="sources", help="Data source (repeatable)"
+    )
+    parser.add_argument(
+        "--root",
+        default=DEFAULT_LOCAL_ROOT,
+        help="Local lake root (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--s3", action="store_true", help="Compact s3://<AWS_BUCKET_NAME> instead"
+    )
+    parser.add_argument(
+        "--layout", choices=LAKE_LAYOUTS, help="Lake layout (default: LAKE_LAYOUT)"
+    )
+    args = parser.parse_args()
+
+    layout = args.layout or get_lake_layout()
+    files_before = files_after = 0
+
+    s3_client = None
+    if args.s3:
+        from src.etl import get_s3_client
+
+        s3_client = get_s3_client()
+        if not args.sources:
+            parser.error("--source is required with --s3")
+
+    for date_prefix in args.dates:
+        sources = args.sources or _local_sources(args.root, date_prefix, layout)
+        for data_source in sources:
+            prefix = lake_prefix(data_source, date_prefix, layout)
+            write_options = get_write_options(data_source)
+            if s3_client is not None:
+                before, after = compact_s3_partition(
+                    s3_client,
+                    get_settings()["aws_bucket_name"],
+                    prefix,
+                    write_options=write_options,
+                )
+            else:
+                before, after = compact_local_partition(
+                    os.path.join(args.root, prefix), write_options=write_options
+                )
+            files_before += before
+            files_after += after
+
+    logger.info(f"Compaction finished: {files_before} -> {files_after} files")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+Memory Profiler Module for ETL Metadata Framework
+-------------------------------------------------
+This module records the memory use of a pipeline run when MEMORY_PROFILING
+is enabled:
+1. A background thread samples the resident set size (RSS) of the process
+   every MEMORY_SAMPLE_INTERVAL_MS and tracks the peak of every open phase
+2. A pipeline run is split into named phases (list, read, dedup, write,
+   transform); start, end and peak RSS are kept per phase
+3. With MEMORY_TRACEMALLOC_TOP > 0, tracemalloc is started for the run and
+   the top allocating source lines of the heaviest phase are kept
+
+The result is stored in audit.metrics["memory"]. RSS is per process: when
+backfill workers run pipelines concurrently, the profiles overlap and
+`concurrent_profiles` says so. Memory of dbt (a subprocess) and of the Arrow
+allocator is not traced by tracemalloc; Arrow is reported separately.
+"""
+
+import os
+import sys
+import time
+import logging
+import threading
+from src.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+_sampler = None
+_sampler_lock = threading.Lock()
+_tracemalloc_users = 0
+
+
+def _page_size():
+    try:
+        return os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return 4096
+
+
+def current_rss():
+    """Return the resident set size of the process in bytes."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _page_size()
+    except (OSError, IndexError, ValueError):
+        # No procfs (macOS): fall back to the lifetime peak
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _arrow_allocated():
+    # Only report Arrow when the run already imported it
+    pyarrow = sys.modules.get("pyarrow")
+    return pyarrow.total_allocated_bytes() if pyarrow else None
+
+
+class _RssSampler:
+    """Background thread feeding RSS samples to the open profiles."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.profiles = set()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self._run, name="memory-sampler", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            rss = current_rss()
+            with self._lock:
+                profiles = list(self.profiles)
+            for profile in profiles:
+                profile.observe(rss)
+
+    def register(self, profile):
+        with self._lock:
+            self.profiles.add(profile)
+            return len(self.profiles)
+
+    def unregister(self, profile):
+        with self._lock:
+            self.profiles.discard(profile)
+
+
+def _get_sampler(interval):
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None:
+            _sampler = _RssSampler(interval)
+    return _sampler
+
+
+def _start_tracemalloc():
+    global _tracemalloc_users
+    import tracemalloc
+
+    with _sampler_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _tracemalloc_users += 1
+
+
+def _stop_tracemalloc():
+    global _tracemalloc_users
+    import tracemalloc
+
+    with _sampler_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0 and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+class PipelineMemoryProfile:
+    """Per-phase RSS (and optionally tracemalloc) profile of one pipeline run."""
+
+    def __init__(self, name, interval, tracemalloc_top=0):
+        self.name = name
+        self.tracemalloc_top = tracemalloc_top
+        self.phases = {}
+        self.concurrent_profiles = 1
+        self._current = None
+        self._lock = threading.Lock()
+        self._top_allocations = None
+        self._top_traced = -1
+        self._result = None
+
+        self.rss_start = current_rss()
+        self.rss_peak = self.rss_start
+        if tracemalloc_top > 0:
+            _start_tracemalloc()
+        self._sampler = _get_sampler(interval)
+        self.concurrent_profiles = self._sampler.register(self)
+
+    def observe(self, rss):
+        with self._lock:
+            self.rss_peak = max(self.rss_peak, rss)
+            if self._current is not None:
+                phase = self.phases[self._current]
+                phase["rss_peak_bytes"] = max(phase["rss_peak_bytes"], rss)
+
+    def phase(self, name):
+        """End the current phase (if any) and start `name`."""
+        self._end_phase()
+        rss = current_rss()
+        with self._lock:
+            self._current = name
+            self.phases[name] = {
+                "rss_start_bytes": rss,
+                "rss_peak_bytes": rss,
+                "started": time.monotonic(),
+            }
+            self.concurrent_profiles = max(
+                self.concurrent_profiles, len(self._sampler.profiles)
+            )
+
+    def _end_phase(self):
+        if self._current is None:
+            return
+        rss = current_rss()
+        self.observe(rss)
+        with self._lock:
+            phase = self.phases[self._current]
+            phase["rss_end_bytes"] = rss
+            phase["seconds"] = round(time.monotonic() - phase.pop("started"), 3)
+            arrow_bytes = _arrow_allocated()
+            if arrow_bytes is not None:
+                phase["arrow_allocated_bytes"] = arrow_bytes
+            self._current = None
+        if self.tracemalloc_top > 0:
+            self._snapshot_allocations()
+
+    def _snapshot_allocations(self):
+        import tracemalloc
+
+        if not tracemalloc.is_tracing():
+            return
+        traced, _ = tracemalloc.get_traced_memory()
+        if traced <= self._top_traced:
+            return
+        # Keep the allocators of the phase that ended with the most live memory
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            (
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+            )
+        )
+        self._top_traced = traced
+        self._top_allocations = [
+            {
+                "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                "size_bytes": stat.size,
+                "count": stat.count,
+            }
+            for stat in snapshot.statistics("lineno")[: self.tracemalloc_top]
+        ]
+
+    def finish(self):
+        """Close the profile and return the dict stored in audit.metrics."""
+        if self._result is not None:
+            return self._result
+        self._end_phase()
+        self._sampler.unregister(self)
+        rss_end = current_rss()
+        self.observe(rss_end)
+
+        result = {
+            "rss_start_bytes": self.rss_start,
+            "rss_end_bytes": rss_end,
+            "rss_peak_bytes": self.rss_peak,
+            "phases": self.phases,
+            "concurrent_profiles": self.concurrent_profiles,
+        }
+        if self.phases:
+            result["peak_phase"] = max(
+                self.phases, key=lambda name: self.phases[name]["rss_peak_bytes"]
+            )
+        if self.tracemalloc_top > 0:
+            import tracemalloc
+
+            if tracemalloc.is_tracing():
+                result["traced_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+            result["top_allocations"] = self._top_allocations or []
+            _stop_tracemalloc()
+
+        logger.info(
+            f"Memory of {self.name}: peak RSS {self.rss_peak / 1024 / 1024:.1f} MB"
+            + (f" in phase '{result['peak_phase']}'" if self.phases else "")
+        )
+        self._result = result
+        return result
+
+
+def start_memory_profile(name):
+    """Return a memory profile for a pipeline run, or None when disabled."""
+    settings = get_settings()
+    if not settings["memory_profiling"]:
+        return None
+    return PipelineMemoryProfile(
+        name,
+        max(settings["memory_sample_interval_ms"], 10) / 1000.0,
+        settings["memory_tracemalloc_top"],
+    )
@@ -5,39 +5,41 @@ This module handles database interactions for the ETL Metadata-Driven Framework:
 1. Retrieving pipeline configurations from the controller table
 2. Creating and updating audit records for pipeline executions
 3. Managing database connections
+4. Retrieving data quality rules for ingestion
+5. Maintaining the persistent dedup key index
+6. Audit partition retention, run-duration baselines, load throughput and
+   scheduling cost history
+7. Recording per-model dbt runs
+8. The pipeline_queue claimed by distributed workers (src.worker)
+9. Per-data_source Parquet write settings of the processed lake
+10. The schema drift log of landing tables
 """
 
-import os
+import json
 import logging
-import psycopg2
-from psycopg2.extras import DictCursor
 from datetime import datetime
-from dotenv import load_dotenv
+from src.config import get_settings
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[logging.StreamHandler()],
-)
 logger = logging.getLogger(__name__)
 
-load_dotenv()
 
-DB_HOST = os.getenv("POSTGRES_HOST")
-DB_PORT = os.getenv("POSTGRES_PORT")
-DB_NAME = os.getenv("POSTGRES_DATABASE")
-DB_USER = os.getenv("POSTGRES_USER")
-DB_PASSWORD = os.getenv("POSTGRES_PASSWORD")
+def _dict_cursor():
+    from psycopg2.extras import DictCursor
+
+    return DictCursor
 
 
 def connect_to_database():
+    import psycopg2
+
+    settings = get_settings()
     try:
         connection = psycopg2.connect(
-            host=DB_HOST,
-            port=DB_PORT,
-            dbname=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD,
+            host=settings["db_host"],
+            port=settings["db_port"],
+            dbname=settings["db_name"],
+            user=settings["db_user"],
+            password=settings["db_password"],
         )
         return connection
     except Exception as e:
@@ -50,7 +52,7 @@ def get_pipeline_config(source_table=None, destination_table=None):
 
     try:
         with connect_to_database() as conn:
-            with conn.cursor(cursor_factory=DictCursor) as cur:
+            with conn.cursor(cursor_factory=_dict_cursor()) as cur:
                 query = "SELECT * FROM controller WHERE active = TRUE"
                 params = []
 
@@ -73,19 +75,26 @@ def get_pipeline_config(source_table=None, destination_table=None):
         raise
 
 
-def start_pipeline_audit(pipeline_id):
+def start_pipeline_audit(pipeline_id, start_time=None, worker_id=None):
+    """
+    Create a 'running' audit record and return its audit_id.
+
+    The audit_id and start_time double as the batch id and load timestamp
+    stamped on the rows the run lands, so callers that need the timestamp
+    pass it in. `worker_id` identifies the queue worker running the pipeline.
+    """
     logger.info(f"Starting audit record for pipeline ID: {pipeline_id}")
 
     try:
         with connect_to_database() as conn:
             with conn.cursor() as cur:
-                start_time = datetime.now()
+                start_time = start_time or datetime.now()
 
                 query = """
-                    INSERT INTO audit (pipeline_id, status, start_time)
-                    VALUES (%s, %s, %s) RETURNING audit_id
+                    INSERT INTO audit (pipeline_id, status, start_time, worker_id)
+                    VALUES (%s, %s, %s, %s) RETURNING audit_id
                 """
-                cur.execute(query, (pipeline_id, "running", start_time))
+                cur.execute(query, (pipeline_id, "running", start_time, worker_id))
 
                 audit_id = cur.fetchone()[0]
                 conn.commit()
@@ -98,12 +107,24 @@ def start_pipeline_audit(pipeline_id):
         raise
 
 
-def update_pipeline_audit(audit_id, status, records_processed=None, error_message=None):
+def update_pipeline_audit(
+    audit_id,
+    status,
+    records_processed=None,
+    error_message=None,
+    metrics=None,
+    source_fingerprint=None,
+    transformed=None,
+):
+    """
+    Close an audit record. `transformed` is False for a load whose downstream
+    dbt models still have to run (see get_untransformed_loads).
+    """
     logger.info(f"Updating audit record {audit_id} with status: {status}")
 
     try:
         with connect_to_database() as conn:
-            with conn.cursor(cursor_factory=DictCursor) as cur:
+            with conn.cursor(cursor_factory=_dict_cursor()) as cur:
                 end_time = datetime.now()
 
                 if records_processed is not None:
@@ -113,14 +134,30 @@ def update_pipeline_audit(audit_id, status, records_processed=None, error_messag
                     except (TypeError, AttributeError):
                         pass
 
+                # Metrics are merged into the existing JSONB document
+                metrics_json = json.dumps(metrics, default=str) if metrics else None
+
                 cur.execute(
                     """
                     UPDATE audit
-                    SET status = %s, records_processed = %s, end_time = %s, error_message = %s
+                    SET status = %s, records_processed = %s, end_time = %s, error_message = %s,
+                        metrics = COALESCE(metrics, '{}'::jsonb)
+                                  || COALESCE(%s::jsonb, '{}'::jsonb),
+                        source_fingerprint = COALESCE(%s, source_fingerprint),
+                        transformed = COALESCE(%s, transformed)
                     WHERE audit_id = %s
                     RETURNING *
                     """,
-                    (status, records_processed, end_time, error_message, audit_id),
+                    (
+                        status,
+                        records_processed,
+                        end_time,
+                        error_message,
+                        metrics_json,
+                        source_fingerprint,
+                        transformed,
+                        audit_id,
+                    ),
                 )
 
                 result = cur.fetchone()
@@ -143,12 +180,84 @@ def update_pipeline_audit(audit_id, status, records_processed=None, error_messag
         return {"audit_id": audit_id, "status": status, "end_time": datetime.now()}
 
 
+def get_last_success_fingerprint(pipeline_id):
+    """Return the source fingerprint of the last completed run of a pipeline."""
+    try:
+        with connect_to_database() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT source_fingerprint FROM audit
+                    WHERE pipeline_id = %s
+                      AND status = 'completed'
+                      AND source_fingerprint IS NOT NULL
+                    ORDER BY start_time DESC
+                    LIMIT 1
+                    """,
+                    (pipeline_id,),
+                )
+                result = cur.fetchone()
+                return result[0] if result else None
+
+    except Exception as e:
+        logger.error(f"Error retrieving last source fingerprint: {str(e)}")
+        raise
+
+
+def get_untransformed_loads(pipeline_ids=None):
+    """
+    Return the completed loads whose downstream dbt run has not succeeded yet
+    (audit_id, pipeline_id, source_table), of the given pipelines or all.
+
+    A source that is unchanged afterwards is skipped at load time, so these
+    loads are what keeps its models from staying stale after a failed dbt run.
+    """
+    try:
+        with connect_to_database() as conn:
+            with conn.cursor(cursor_factory=_dict_cursor()) as cur:
+                query = """
+                    SELECT a.audit_id, a.pipeline_id, c.source_table
+                    FROM audit a
+                    JOIN controller c ON c.id = a.pipeline_id
+                    WHERE a.status = 'completed' AND a.transformed = FALSE
+                """
+                params = []
+                if pipeline_ids is not None:
+                    query += " AND a.pipeline_id = ANY(%s)"
+                    params.append(list(pipeline_ids))
+                cur.execute(query + " ORDER BY a.audit_id", params)
+                return [dict(row) for row in cur.fetchall()]
+
+    except Exception as e:
+        logger.error(f"Error retrieving untransformed loads: {str(e)}")
+        raise
+
+
+def mark_loads_transformed(audit_ids):
+    """Record that dbt ran successfully downstream of these loads."""
+    if not audit_ids:
+        return
+    try:
+        with connect_to_database() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "UPDATE audit SET transformed = TRUE WHERE audit_id = ANY(%s)",
+                    (list(audit_ids),),
+                )
+            conn.commit()
+            logger.info(f"Marked {len(audit_ids)} loads as transformed")
+
+    except Exception as e:
+        logger.error(f"Error marking loads as transformed: {str(e)}")
+        raise
+
+
 def get_audit_details(audit_id):
     logger.info(f"Retrieving audit details for ID: {audit_id}")
 
     try:
         with connect_to_database() as conn:
-            with conn.cursor(cursor_factory=DictCursor) as cur:
+            with conn.cursor(cursor_factory=_dict_cursor()) as cur:
                 cur.execute(
                     """
                     SELECT a.*, c.source_table, c.destination_table, c.load_type
@@ -170,3 +279,718 @@ def get_audit_details(audit_id):
     except Exception as e:
         logger.error(f"Error retrieving audit details: {str(e)}")
         raise
+
+
+def get_quality_rules(pipeline_id):
+    logger.info(f"Retrieving data quality rules for pipeline ID: {pipeline_id}")
+
+    try:
+        with connect_to_database() as conn:
+            with conn.cursor(cursor_factory=_dict_cursor()) as cur:
+                cur.execute(
+                    """
+                    SELECT rule_id, rule_name, rule_type, column_name,
+                           min_value, max_value
+                    FROM dq_rules
+                    WHERE pipeline_id = %s AND active = TRUE
+                    ORDER BY rule_id
+                    """,
+                    (pipeline_id,),
+                )
+                results = [dict(row) for row in cur.fetchall()]
+
+                logger.info(f"Retrieved {len(results)} data quality rules")
+                return results
+
+    except Exception as e:
+        logger.error(f"Error retrieving data quality rules: {str(e)}")
+        raise
+
+
+def get_parquet_write_settings(data_source):
+    """Return the Parquet write settings row of a data source, or None."""
+    try:
+        with connect_to_database() as conn:
+            with conn.cursor(cursor_factory=_dict_cursor()) as cur:
+                cur.execute(
+                    """
+                    SELECT compression, compression_level, row_group_rows,
+                           page_size_bytes, use_dictionary, dictionary_columns
+                    FROM parquet_write_settings
+                    WHERE data_source = %s
+                    """,
+                    (data_source,),
+                )
+                row = cur.fetchone()
+                return dict(row) if row else None
+
+    except Exception as e:
+        logger.error(f"Error retrieving Parquet write settings: {str(e)}")
+        raise
+
+
+def save_schema_drift(pipeline_id, audit_id, table_name, changes):
+    """Record the schema differences found by a load in schema_drift_log."""
+    from psycopg2.extras import execute_values
+
+    try:
+        with connect_to_database() as conn:
+            with conn.cursor() as cur:
+                execute_values(
+                    cur,
+                    """
+                    INSERT INTO schema_drift_log
+                    (pipeline_id, audit_id, table_name, column_name, change_type,
+                     old_type, new_type, applied)
+                    VALUES %s
+                    """,
+                    [
+                        (
+                            pipeline_id,
+                            audit_id,
+                            table_name,
+                            change["column"],
+                            change["change"],
+                            change["old_type"],
+                            change["new_type"],
+                            change["applied"],
+                        )
+                        for change in changes
+                    ],
+                )
+            conn.commit()
+            logger.info(
+                f"Recorded {len(changes)} schema changes of 'public.{table_name}'"
+            )
+
+    except Exception as e:
+        logger.error(f"Error recording schema drift: {str(e)}")
+        raise
+
+
+def load_dedup_bloom_filter(pipeline_id):
+    try:
+        with connect_to_database() as conn:
+            with conn.cursor(cursor_factory=_dict_cursor()) as cur:
+                cur.execute(
+                    """
+                    SELECT num_bits, num_hashes, bits, key_count
+                    FROM dedup_bloom_filter
+                    WHERE pipeline_id = %s
+                    """,
+                    (pipeline_id,),
+                )
+                result = cur.fetchone()
+                return dict(result) if result else None
+
+    except Exception as e:
+        logger.error(f"Error loading dedup Bloom filter: {str(e)}")
+        raise
+
+
+def lookup_dedup_keys(pipeline_id, key_hashes):
+    """Return the subset of key_hashes present in the exact dedup key index."""
+    if not key_hashes:
+        return set()
+
+    try:
+        with connect_to_database() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT key_hash FROM dedup_key_index
+                    WHERE pipeline_id = %s AND key_hash = ANY(%s)
+                    """,
+                    (pipeline_id, key_hashes),
+                )
+                return {row[0] for row in cur.fetchall()}
+
+    except Exception as e:
+        logger.error(f"Error looking up dedup keys: {str(e)}")
+        raise
+
+
+def _write_dedup_keys(
+    cur, pipeline_id, key_hashes, num_bits, num_hashes, bits, key_count, audit_id, reset
+):
+    from psycopg2 import Binary
+    from psycopg2.extras import execute_values
+
+    if reset:
+        cur.execute(
+            "DELETE FROM dedup_key_index WHERE pipeline_id = %s", (pipeline_id,)
+        )
+    if key_hashes:
+        execute_values(
+            cur,
+            """
+            INSERT INTO dedup_key_index (pipeline_id, key_hash, audit_id)
+            VALUES %s
+            ON CONFLICT (pipeline_id, key_hash) DO NOTHING
+            """,
+            [(pipeline_id, key, audit_id) for key in key_hashes],
+            page_size=10000,
+        )
+
+    cur.execute(
+        """
+        INSERT INTO dedup_bloom_filter
+        (pipeline_id, num_bits, num_hashes, bits, key_count, updated_at)
+        VALUES (%s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
+        ON CONFLICT (pipeline_id) DO UPDATE
+        SET num_bits = EXCLUDED.num_bits,
+            num_hashes = EXCLUDED.num_hashes,
+            bits = EXCLUDED.bits,
+            key_count = EXCLUDED.key_count,
+            updated_at = EXCLUDED.updated_at
+        """,
+        (pipeline_id, num_bits, num_hashes, Binary(bits), key_count),
+    )
+
+
+def save_dedup_keys(
+    pipeline_id,
+    key_hashes,
+    num_bits,
+    num_hashes,
+    bits,
+    key_count,
+    audit_id=None,
+    reset=False,
+    connection=None,
+):
+    """
+    Add the keys of a load to the dedup index and store its Bloom filter.
+
+    With `reset` (full load) the previous keys of the pipeline are removed
+    first. Pass the DBAPI `connection` of the landing transaction to write
+    the index in it: the caller commits, so the index and the landing table
+    never disagree after a failed load.
+    """
+    args = (pipeline_id, key_hashes, num_bits, num_hashes, bits, key_count)
+    try:
+        if connection is not None:
+            with connection.cursor() as cur:
+                _write_dedup_keys(cur, *args, audit_id, reset)
+            return
+
+        with connect_to_database() as conn:
+            with conn.cursor() as cur:
+                _write_dedup_keys(cur, *args, audit_id, reset)
+                conn.commit()
+
+    except Exception as e:
+        logger.error(f"Error saving dedup keys: {str(e)}")
+        raise
+
+
+def maintain_audit_partitions(retention_months, months_ahead=1):
+    """
+    Create upcoming monthly audit partitions and drop those past retention.
+    """
+    logger.info(f"Maintaining audit partitions (retention: {retention_months} months)")
+
+    try:
+        with connect_to_database() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT ensure_audit_partitions(%s)", (months_ahead,))
+                cur.execute(
+                    "SELECT drop_expired_audit_partitions(%s)", (retention_months,)
+                )
+                dropped = cur.fetchone()[0]
+                conn.commit()
+
+                if dropped:
+                    logger.info(f"Dropped {dropped} expired audit partitions")
+                return dropped
+
+    except Exception as e:
+        logger.error(f"Error maintaining audit partitions: {str(e)}")
+        return 0
+
+
+def get_run_baseline(pipeline_id, exclude_audit_id=None, window=20):
+    """
+    Rolling duration, throughput (rows loaded per second) and peak memory
+    percentiles over the last `window` completed runs of a pipeline.
+    """
+    try:
+        with connect_to_database() as conn:
+            with conn.cursor(cursor_factory=_dict_cursor()) as cur:
+                cur.execute(
+                    """
+                    WITH recent AS (
+                        SELECT
+                            EXTRACT(EPOCH FROM end_time - start_time) AS duration,
+                            (metrics->>'rows_loaded')::numeric
+                                / NULLIF(EXTRACT(EPOCH FROM end_time - start_time), 0)
+                                AS rows_per_sec,
+                            (metrics->'memory'->>'rss_peak_bytes')::numeric
+                                AS rss_peak
+                        FROM audit
+                        WHERE pipeline_id = %s
+                          AND status = 'completed'
+                          AND end_time IS NOT NULL
+                          AND audit_id <> COALESCE(%s, -1)
+                        ORDER BY start_time DESC
+                        LIMIT %s
+                    )
+                    SELECT
+                        COUNT(*) AS runs,
+                        percentile_cont(0.5) WITHIN GROUP (ORDER BY duration)
+                            AS duration_p50,
+                        percentile_cont(0.95) WITHIN GROUP (ORDER BY duration)
+                            AS duration_p95,
+                        percentile_cont(0.5) WITHIN GROUP (ORDER BY rows_per_sec)
+                            AS rows_per_sec_p50,
+                        percentile_cont(0.05) WITHIN GROUP (ORDER BY rows_per_sec)
+                            AS rows_per_sec_p05,
+                        COUNT(rss_peak) AS memory_runs,
+                        percentile_cont(0.5) WITHIN GROUP (ORDER BY rss_peak)
+                            AS rss_peak_p50,
+                        percentile_cont(0.95) WITHIN GROUP (ORDER BY rss_peak)
+                            AS rss_peak_p95
+                    FROM recent
+                    """,
+                    (pipeline_id, exclude_audit_id, window),
+                )
+                return dict(cur.fetchone())
+
+    except Exception as e:
+        logger.error(f"Error retrieving run baseline: {str(e)}")
+        raise
+
+
+def get_load_throughput(pipeline_id, window=20):
+    """
+    Median (and 5th percentile) read throughput of the last `window`
+    completed loads of a pipeline, from the read plan stored in audit.metrics.
+    """
+    try:
+        with connect_to_database() as conn:
+            with conn.cursor(cursor_factory=_dict_cursor()) as cur:
+                cur.execute(
+                    """
+                    WITH recent AS (
+                        SELECT
+                            EXTRACT(EPOCH FROM end_time - start_time) AS duration,
+                            (metrics->'plan'->>'bytes_selected')::numeric AS bytes,
+                            (metrics->'plan'->>'rows_selected')::numeric AS rows
+                        FROM audit
+                        WHERE pipeline_id = %s
+                          AND status = 'completed'
+                          AND end_time IS NOT NULL
+                          AND metrics ? 'plan'
+                        ORDER BY start_time DESC
+                        LIMIT %s
+                    )
+                    SELECT
+                        COUNT(*) AS runs,
+                        percentile_cont(0.5) WITHIN GROUP (
+                            ORDER BY bytes / NULLIF(duration, 0)
+                        ) AS bytes_per_sec_p50,
+                        percentile_cont(0.05) WITHIN GROUP (
+                            ORDER BY bytes / NULLIF(duration, 0)
+                        ) AS bytes_per_sec_p05,
+                        percentile_cont(0.5) WITHIN GROUP (
+                            ORDER BY rows / NULLIF(duration, 0)
+                        ) AS rows_per_sec_p50,
+                        percentile_cont(0.05) WITHIN GROUP (
+                            ORDER BY rows / NULLIF(duration, 0)
+                        ) AS rows_per_sec_p05
+                    FROM recent
+                    """,
+                    (pipeline_id, window),
+                )
+                return dict(cur.fetchone())
+
+    except Exception as e:
+        logger.error(f"Error retrieving load throughput: {str(e)}")
+        raise
+
+
+def get_pipeline_costs(window=10):
+    """
+    Median duration and records processed over the last `window` completed
+    runs of every pipeline, with the records of the latest run.
+
+    Returns {pipeline_id: row}.
+    """
+    try:
+        with connect_to_database() as conn:
+            with conn.cursor(cursor_factory=_dict_cursor()) as cur:
+                cur.execute(
+                    """
+                    WITH recent AS (
+                        SELECT
+                            pipeline_id,
+                            EXTRACT(EPOCH FROM end_time - start_time) AS duration,
+                            records_processed,
+                            ROW_NUMBER() OVER (
+                                PARTITION BY pipeline_id ORDER BY start_time DESC
+                            ) AS recency
+                        FROM audit
+                        WHERE status = 'completed'
+                          AND end_time IS NOT NULL
+                    )
+                    SELECT
+                        pipeline_id,
+                        COUNT(*) AS runs,
+                        percentile_cont(0.5) WITHIN GROUP (ORDER BY duration)
+                            AS duration_p50,
+                        percentile_cont(0.5) WITHIN GROUP (ORDER BY records_processed)
+                            AS records_p50,
+                        MAX(records_processed) FILTER (WHERE recency = 1)
+                            AS records_last
+                    FROM recent
+                    WHERE recency <= %s
+                    GROUP BY pipeline_id
+                    """,
+                    (window,),
+                )
+                return {row["pipeline_id"]: dict(row) for row in cur.fetchall()}
+
+    except Exception as e:
+        logger.error(f"Error retrieving pipeline costs: {str(e)}")
+        raise
+
+
+def save_dbt_model_run(audit_id, invocation_id, model):
+    """Insert one finished dbt model (from src.dbt_runner) into dbt_model_runs."""
+    try:
+        with connect_to_database() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    INSERT INTO dbt_model_runs
+                    (audit_id, invocation_id, unique_id, model_name, resource_type,
+                     materialized, status, started_at, finished_at, execution_time,
+                     rows_affected, message)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    """,
+                    (
+                        audit_id,
+                        invocation_id,
+                        model["unique_id"],
+                        model["name"],
+                        model["resource_type"],
+                        model["materialized"],
+                        model["status"],
+                        model["started_at"],
+                        model["finished_at"],
+                        model["execution_time"],
+                        model["rows_affected"],
+                        model["message"],
+                    ),
+                )
+                conn.commit()
+
+    except Exception as e:
+        logger.error(f"Error saving dbt model run: {str(e)}")
+        raise
+
+
+def enqueue_pipeline_runs(
+    run_label, pipeline_ids, dates, load_type=None, force=False, max_attempts=3
+):
+    """
+    Queue one run per (pipeline, date) for the workers. A (pipeline, date)
+    already pending or running is not queued twice. Returns the rows queued.
+    """
+    from psycopg2.extras import execute_values
+
+    rows = [
+        (run_label, pipeline_id, date_prefix, load_type, force, max_attempts)
+        for date_prefix in dates
+        for pipeline_id in pipeline_ids
+    ]
+    try:
+        with connect_to_database() as conn:
+            with conn.cursor() as cur:
+                queued = execute_values(
+                    cur,
+                    """
+                    INSERT INTO pipeline_queue
+                    (run_label, pipeline_id, date_prefix, load_type, force, max_attempts)
+                    VALUES %s
+                    ON CONFLICT (pipeline_id, COALESCE(date_prefix, ''))
+                        WHERE status IN ('pending', 'running')
+                    DO NOTHING
+                    RETURNING queue_id
+                    """,
+                    rows,
+                    fetch=True,
+                )
+                conn.commit()
+                return len(queued)
+
+    except Exception as e:
+        logger.error(f"Error enqueueing pipeline runs: {str(e)}")
+        raise
+
+
+def claim_pipeline_run(worker_id):
+    """
+    Claim the next runnable queue entry for `worker_id`, or return None.
+
+    An entry is runnable when no other entry of the same pipeline is running
+    or pending for an earlier date, so each landing table is written by one
+    worker at a time and in date order. Entries locked by another worker's
+    claim are skipped rather than waited on.
+    """
+    try:
+        with connect_to_database() as conn:
+            with conn.cursor(cursor_factory=_dict_cursor()) as cur:
+                cur.execute(
+                    """
+                    WITH candidate AS (
+                        SELECT q.queue_id
+                        FROM pipeline_queue q
+                        WHERE q.status = 'pending'
+                          AND NOT EXISTS (
+                              SELECT 1 FROM pipeline_queue e
+                              WHERE e.pipeline_id = q.pipeline_id
+                                AND e.queue_id <> q.queue_id
+                                AND (
+                                    e.status = 'running'
+                                    OR (e.status = 'pending'
+                                        AND COALESCE(e.date_prefix, '')
+                                            < COALESCE(q.date_prefix, ''))
+                                )
+                          )
+                        ORDER BY q.date_prefix NULLS FIRST, q.queue_id
+                        LIMIT 1
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    UPDATE pipeline_queue q
+                    SET status = 'running',
+                        worker_id = %s,
+                        claimed_at = now(),
+                        heartbeat_at = now(),
+                        attempts = q.attempts + 1,
+                        audit_id = NULL,
+                        error_message = NULL
+                    FROM candidate
+                    WHERE q.queue_id = candidate.queue_id
+                    RETURNING q.*
+                    """,
+                    (worker_id,),
+                )
+                result = cur.fetchone()
+                conn.commit()
+                return dict(result) if result else None
+
+    except Exception as e:
+        logger.error(f"Error claiming pipeline run: {str(e)}")
+        raise
+
+
+def heartbeat_pipeline_run(queue_id, worker_id, audit_id=None):
+    """
+    Refresh the heartbeat of a claimed entry. Returns False when the entry
+    is no longer held by `worker_id` (it was reclaimed as stale).
+    """
+    try:
+        with connect_to_database() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    UPDATE pipeline_queue
+                    SET heartbeat_at = now(), audit_id = COALESCE(%s, audit_id)
+                    WHERE queue_id = %s AND worker_id = %s AND status = 'running'
+                    """,
+                    (audit_id, queue_id, worker_id),
+                )
+                owned = cur.rowcount == 1
+                conn.commit()
+                return owned
+
+    except Exception as e:
+        logger.error(f"Error updating pipeline heartbeat: {str(e)}")
+        raise
+
+
+def _fail_later_dates(cur, pipeline_id, date_prefix):
+    # Later dates must not land over a gap, like a broken backfill chain
+    cur.execute(
+        """
+        UPDATE pipeline_queue
+        SET status = 'failed', finished_at = now(),
+            error_message = 'Earlier date ' || %s || ' of this pipeline failed'
+        WHERE pipeline_id = %s
+          AND status = 'pending'
+          AND COALESCE(date_prefix, '') > COALESCE(%s, '')
+        """,
+        (date_prefix or "-", pipeline_id, date_prefix),
+    )
+
+
+def hold_pipeline_claim(connection, queue_id, worker_id):
+    """
+    Lock a claimed entry in the caller's transaction (the DBAPI `connection`
+    of the landing transaction). Returns False when `worker_id` no longer
+    holds it; otherwise it cannot be reclaimed until that transaction ends.
+    """
+    try:
+        with connection.cursor() as cur:
+            cur.execute(
+                """
+                SELECT 1 FROM pipeline_queue
+                WHERE queue_id = %s AND worker_id = %s AND status = 'running'
+                FOR UPDATE
+                """,
+                (queue_id, worker_id),
+            )
+            return cur.fetchone() is not None
+
+    except Exception as e:
+        logger.error(f"Error locking pipeline claim: {str(e)}")
+        raise
+
+
+def finish_pipeline_run(
+    queue_id, worker_id, success, error_message=None, changed=None, audit_id=None
+):
+    """
+    Record the outcome of a claimed entry. A failed entry with attempts left
+    goes back to 'pending'. Returns the new status, or None when the entry
+    was reclaimed by another worker in the meantime.
+    """
+    try:
+        with connect_to_database() as conn:
+            with conn.cursor(cursor_factory=_dict_cursor()) as cur:
+                cur.execute(
+                    """
+                    UPDATE pipeline_queue
+                    SET status = CASE
+                            WHEN %s THEN 'completed'
+                            WHEN attempts < max_attempts THEN 'pending'
+                            ELSE 'failed'
+                        END,
+                        finished_at = now(),
+                        error_message = %s,
+                        changed = %s,
+                        audit_id = COALESCE(%s, audit_id),
+                        worker_id = CASE WHEN %s THEN worker_id END
+                    WHERE queue_id = %s AND worker_id = %s AND status = 'running'
+                    RETURNING status, pipeline_id, date_prefix
+                    """,
+                    (
+                        success,
+                        error_message,
+                        changed,
+                        audit_id,
+                        success,
+                        queue_id,
+                        worker_id,
+                    ),
+                )
+                result = cur.fetchone()
+                if result and result["status"] == "failed":
+                    _fail_later_dates(cur, result["pipeline_id"], result["date_prefix"])
+                conn.commit()
+                return result["status"] if result else None
+
+    except Exception as e:
+        logger.error(f"Error finishing pipeline run: {str(e)}")
+        raise
+
+
+def reclaim_stale_pipeline_runs(stale_seconds):
+    """
+    Release running entries whose heartbeat is older than `stale_seconds`
+    (the worker died or lost the database). Their audit records are marked
+    failed. Returns the reclaimed entries.
+    """
+    try:
+        with connect_to_database() as conn:
+            with conn.cursor(cursor_factory=_dict_cursor()) as cur:
+                cur.execute(
+                    """
+                    UPDATE pipeline_queue
+                    SET status = CASE
+                            WHEN attempts < max_attempts THEN 'pending'
+                            ELSE 'failed'
+                        END,
+                        finished_at = now(),
+                        error_message = 'Heartbeat lost from worker ' || worker_id,
+                        worker_id = NULL
+                    WHERE status = 'running'
+                      AND heartbeat_at < now() - make_interval(secs => %s)
+                    RETURNING queue_id, pipeline_id, date_prefix, status, audit_id,
+                              error_message
+                    """,
+                    (stale_seconds,),
+                )
+                reclaimed = [dict(row) for row in cur.fetchall()]
+
+                audit_ids = [r["audit_id"] for r in reclaimed if r["audit_id"]]
+                if audit_ids:
+                    cur.execute(
+                        """
+                        UPDATE audit
+                        SET status = 'failed', end_time = now(),
+                            error_message = 'Worker stopped sending heartbeats'
+                        WHERE audit_id = ANY(%s) AND status = 'running'
+                        """,
+                        (audit_ids,),
+                    )
+                for entry in reclaimed:
+                    if entry["status"] == "failed":
+                        _fail_later_dates(
+                            cur, entry["pipeline_id"], entry["date_prefix"]
+                        )
+                conn.commit()
+
+                for entry in reclaimed:
+                    logger.warning(
+                        f"Reclaimed queue entry {entry['queue_id']} "
+                        f"({entry['error_message']}), now {entry['status']}"
+                    )
+                return reclaimed
+
+    except Exception as e:
+        logger.error(f"Error reclaiming stale pipeline runs: {str(e)}")
+        raise
+
+
+def get_queue_counts(run_label=None):
+    """Return the number of queue entries per status (optionally for one label)."""
+    try:
+        with connect_to_database() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT status, COUNT(*) FROM pipeline_queue
+                    WHERE %s IS NULL OR run_label = %s
+                    GROUP BY status
+                    """,
+                    (run_label, run_label),
+                )
+                return dict(cur.fetchall())
+
+    except Exception as e:
+        logger.error(f"Error retrieving queue status: {str(e)}")
+        raise
+
+
+def get_queue_changed_tables(run_label):
+    """Return the landing tables changed by the completed entries of a label."""
+    try:
+        with connect_to_database() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT DISTINCT c.source_table
+                    FROM pipeline_queue q
+                    JOIN controller c ON c.id = q.pipeline_id
+                    WHERE q.run_label = %s AND q.status = 'completed' AND q.changed
+                    ORDER BY c.source_table
+                    """,
+                    (run_label,),
+                )
+                return [row[0] for row in cur.fetchall()]
+
+    except Exception as e:
+        logger.error(f"Error retrieving changed tables: {str(e)}")
+        raise
@@ -5,33 +5,17 @@ This module handles email notifications for ETL pipeline status updates.
 It provides functions to send email notifications about pipeline execution results.
 """
 
-import os
-import smtplib
 import logging
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from dotenv import load_dotenv
 from datetime import datetime
+from src.config import get_settings
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[logging.StreamHandler()],
-)
 logger = logging.getLogger(__name__)
 
-load_dotenv()
-
-EMAIL_HOST = os.getenv("EMAIL_HOST")
-EMAIL_PORT = int(os.getenv("EMAIL_PORT"))
-EMAIL_USER = os.getenv("EMAIL_USER")
-EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
-EMAIL_RECIPIENTS = os.getenv("EMAIL_RECIPIENTS").split(",")
-
 # Global storage for pipeline notifications
 _pending_notifications = {
     "success": [],
     "failure": [],
+    "regressions": [],
     "execution_count": 0,
     "last_updated": datetime.now(),
 }
@@ -41,33 +25,44 @@ def send_email(subject, body):
     logger.info("=== EMAIL NOTIFICATION ATTEMPT ===")
     logger.info(f"Subject: {subject}")
 
-    if not EMAIL_USER or not EMAIL_PASSWORD or not EMAIL_RECIPIENTS:
+    settings = get_settings()
+    email_host = settings["email_host"]
+    email_port = settings["email_port"]
+    email_user = settings["email_user"]
+    email_password = settings["email_password"]
+    email_recipients = settings["email_recipients"]
+
+    if not email_user or not email_password or not email_recipients:
         logger.error("Email configuration is missing. No notification will be sent.")
-        logger.error(f"User: {EMAIL_USER}")
-        logger.error(f"Password set: {'Yes' if EMAIL_PASSWORD else 'No'}")
-        logger.error(f"Recipients: {EMAIL_RECIPIENTS}")
+        logger.error(f"User: {email_user}")
+        logger.error(f"Password set: {'Yes' if email_password else 'No'}")
+        logger.error(f"Recipients: {email_recipients}")
         return False
 
     try:
-        logger.info(f"Preparing email to: {', '.join(EMAIL_RECIPIENTS)}")
+        import smtplib
+        from email.mime.text import MIMEText
+        from email.mime.multipart import MIMEMultipart
+
+        logger.info(f"Preparing email to: {', '.join(email_recipients)}")
         msg = MIMEMultipart()
         msg["Subject"] = subject
-        msg["From"] = EMAIL_USER
-        msg["To"] = ", ".join(EMAIL_RECIPIENTS)
+        msg["From"] = email_user
+        msg["To"] = ", ".join(email_recipients)
 
         msg.attach(MIMEText(body, "plain"))
 
-        logger.info(f"Connecting to {EMAIL_HOST}:{EMAIL_PORT}...")
+        logger.info(f"Connecting to {email_host}:{email_port}...")
 
-        with smtplib.SMTP(EMAIL_HOST, EMAIL_PORT) as server:
+        with smtplib.SMTP(email_host, email_port) as server:
             logger.info("Starting TLS...")
             server.starttls()
 
-            logger.info(f"Logging in as {EMAIL_USER}...")
-            server.login(EMAIL_USER, EMAIL_PASSWORD)
+            logger.info(f"Logging in as {email_user}...")
+            server.login(email_user, email_password)
 
             logger.info("Sending email...")
-            server.sendmail(EMAIL_USER, EMAIL_RECIPIENTS, msg.as_string())
+            server.sendmail(email_user, email_recipients, msg.as_string())
 
         logger.info("Email notification sent successfully!")
         logger.info(f"Subject: {subject}")
@@ -91,8 +86,13 @@ def notify_pipeline_status(
     start_time=None,
     end_time=None,
     error_message=None,
+    memory=None,
 ):
-    """Add pipeline execution status to pending notifications."""
+    """
+    Add pipeline execution status to pending notifications.
+
+    `memory` is the memory profile of the run (audit.metrics["memory"]), if any.
+    """
 
     # Format notification details
     notification = {
@@ -105,6 +105,8 @@ def notify_pipeline_status(
 
     if error_message:
         notification["error"] = error_message
+    if memory:
+        notification["memory"] = memory
 
     # Add to appropriate list
     if status.lower() == "success":
@@ -120,6 +122,35 @@ def notify_pipeline_status(
     return True
 
 
+def notify_performance_regression(pipeline_name, regression):
+    """Add a run flagged by the regression detector to pending notifications."""
+    _pending_notifications["regressions"].append(
+        {
+            "pipeline": pipeline_name,
+            "audit_id": regression.get("audit_id"),
+            "findings": regression.get("findings", []),
+            "baseline_runs": regression.get("baseline_runs"),
+        }
+    )
+    logger.info(f"Added performance regression for '{pipeline_name}'")
+    return True
+
+
+def _format_memory(memory):
+    line = f"  Memory: peak RSS {memory['rss_peak_bytes'] / 1024 / 1024:.0f} MB"
+    if memory.get("peak_phase"):
+        line += f" during {memory['peak_phase']}"
+    if memory.get("concurrent_profiles", 1) > 1:
+        line += f" (shared with {memory['concurrent_profiles'] - 1} concurrent runs)"
+    if memory.get("top_allocations"):
+        top = memory["top_allocations"][0]
+        line += (
+            f"; top allocator {top['location']} "
+            f"({top['size_bytes'] / 1024 / 1024:.0f} MB)"
+        )
+    return line
+
+
 def send_consolidated_notifications():
     """Send one email with consolidated notifications about all pipeline executions."""
 
@@ -160,6 +191,8 @@ def send_consolidated_notifications():
             )
             if notification.get("message"):
                 body_parts.append(f"  Message: {notification['message']}")
+            if notification.get("memory"):
+                body_parts.append(_format_memory(notification["memory"]))
         body_parts.append("")
 
     # Add failed pipelines
@@ -170,6 +203,21 @@ def send_consolidated_notifications():
             body_parts.append(f"- {notification['pipeline']}")
             if notification.get("error"):
                 body_parts.append(f"  Error: {notification['error']}")
+            if notification.get("memory"):
+                body_parts.append(_format_memory(notification["memory"]))
+        body_parts.append("")
+
+    # Add runs slower than their rolling baseline
+    if _pending_notifications["regressions"]:
+        body_parts.append("PERFORMANCE REGRESSIONS")
+        body_parts.append("=======================")
+        for regression in _pending_notifications["regressions"]:
+            body_parts.append(
+                f"- {regression['pipeline']} (audit {regression['audit_id']}, "
+                f"baseline of {regression['baseline_runs']} runs)"
+            )
+            for finding in regression["findings"]:
+                body_parts.append(f"  Regressed: {finding}")
         body_parts.append("")
 
     body = "\n".join(body_parts)
@@ -181,6 +229,7 @@ def send_consolidated_notifications():
     if result:
         _pending_notifications["success"] = []
         _pending_notifications["failure"] = []
+        _pending_notifications["regressions"] = []
         _pending_notifications["execution_count"] = 0
 
     return result
@@ -0,0 +1,130 @@
+"""
+Object Cache Module for ETL Metadata Framework
+----------------------------------------------
+This module keeps a local on-disk copy of the S3 objects read by the ETL, so
+reruns, retries and backfills do not download the same Parquet files again:
+1. Objects are stored under a content address derived from bucket, key and
+   ETag, so a changed object is never served from a stale copy
+2. Cached files are memory-mapped into the Parquet reader without a copy
+3. The total size is bounded by S3_CACHE_MAX_MB with least-recently-used
+   eviction (file mtime is refreshed on every hit); the size is tracked as
+   objects are stored and the directory is only scanned to evict
+4. Hits, misses and bytes saved are counted per run by the caller
+
+The cache is off unless S3_CACHE_MAX_MB is set.
+"""
+
+import os
+import hashlib
+import logging
+import threading
+from src.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+class ObjectCache:
+    """Size-bounded LRU cache of S3 objects in a local directory."""
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._total = sum(size for _, size, _ in self._entries())
+
+    def path_for(self, bucket_name, key, etag):
+        digest = hashlib.sha256(f"{bucket_name}/{key}|{etag}".encode()).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}.parquet")
+
+    def accepts(self, size):
+        # One object may not take more than a quarter of the cache
+        return size <= self.max_bytes // 4
+
+    def get(self, bucket_name, key, etag):
+        """Return the path of the cached object (marking it recently used) or None."""
+        path = self.path_for(bucket_name, key, etag)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, bucket_name, key, etag, data):
+        """Store an object and evict the least recently used ones if needed."""
+        path = self.path_for(bucket_name, key, etag)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        try:
+            replaced = os.path.getsize(path)
+        except FileNotFoundError:
+            replaced = 0
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._total += len(data) - replaced
+            over_budget = self._total > self.max_bytes
+        if over_budget:
+            self.evict()
+        return path
+
+    def _entries(self):
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".parquet"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self):
+        with self._lock:
+            # The scan also picks up objects stored by other processes
+            entries = self._entries()
+            total = sum(size for _, size, _ in entries)
+            evicted = 0
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                # Readers that already mapped the file keep their mapping
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                evicted += 1
+            self._total = total
+            if evicted:
+                logger.info(f"Evicted {evicted} objects from the S3 cache")
+            return evicted
+
+
+def get_object_cache():
+    """Return the process-wide object cache, or None when it is disabled."""
+    global _cache
+    settings = get_settings()
+    if settings["s3_cache_max_bytes"] <= 0:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ObjectCache(
+                settings["s3_cache_dir"], settings["s3_cache_max_bytes"]
+            )
+            logger.info(
+                f"S3 object cache: {settings['s3_cache_dir']} "
+                f"(max {settings['s3_cache_max_bytes'] // (1024 * 1024)} MB)"
+            )
+    return _cache
+
+
+def new_cache_stats():
+    return {"hits": 0, "misses": 0, "bytes_saved": 0, "bytes_stored": 0}
@@ -0,0 +1,350 @@
+"""
+Parquet Planner Module for ETL Metadata Framework
+-------------------------------------------------
+This module plans the read of the Parquet objects under an S3 prefix from
+their footers only, before any data is transferred:
+1. Fetching each footer with a ranged GET on the object tail
+2. Verifying the footers and collecting row counts, schemas and row-group
+   statistics for the whole prefix
+3. Selecting the row groups and column chunks a load needs, so files that
+   cannot match the row filter are never downloaded
+4. Reading the selected column chunks with coalesced ranged GETs (or one
+   full GET when most of the object is needed)
+
+With the local object cache enabled, cached objects are planned and read
+from memory-mapped files. Missed objects are stored only when the plan reads
+them with a full GET anyway; ranged reads are never widened to fill the
+cache.
+"""
+
+import struct
+import logging
+from src.parquet_reader import read_parquet_table, select_row_groups
+from src.s3_fetcher import get_object_bytes, map_concurrent
+
+logger = logging.getLogger(__name__)
+
+PARQUET_MAGIC = b"PAR1"
+
+# One suffix GET of this size returns the footer of almost every file, and
+# pyarrow reads the same tail when it opens a file
+FOOTER_TAIL_BYTES = 64 * 1024
+
+# Column chunk ranges closer than this are fetched with a single GET, up to
+# RANGE_MAX_BYTES per GET
+RANGE_MERGE_GAP = 1024 * 1024
+RANGE_MAX_BYTES = 16 * 1024 * 1024
+
+# Above this share of the object, one full GET is cheaper than ranged GETs
+FULL_GET_RATIO = 0.5
+
+
+def _get_range(s3_client, bucket_name, key, start, end, stats=None):
+    """Return bytes [start, end) of an S3 object."""
+    return get_object_bytes(s3_client, bucket_name, key, (start, end), stats)
+
+
+def fetch_footer(s3_client, bucket_name, key, size, stats=None):
+    """
+    Fetch and parse the footer of a Parquet object.
+
+    Returns (metadata, arrow_schema, tail_start, tail_bytes); the tail is
+    kept so the object can later be opened without fetching the footer again.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    tail_start = max(0, size - FOOTER_TAIL_BYTES)
+    tail = _get_range(s3_client, bucket_name, key, tail_start, size, stats)
+    if len(tail) < 8 or tail[-4:] != PARQUET_MAGIC:
+        raise ValueError(f"s3://{bucket_name}/{key} is not a Parquet file")
+
+    footer_length = struct.unpack("<i", tail[-8:-4])[0]
+    if footer_length + 8 > size:
+        raise ValueError(f"s3://{bucket_name}/{key} has a corrupt footer")
+    if footer_length + 8 > len(tail):
+        # Footer larger than the first tail read (very wide or many row groups)
+        tail_start = size - footer_length - 8
+        tail = _get_range(s3_client, bucket_name, key, tail_start, size, stats)
+
+    # The footer alone, framed by the magic bytes, opens as a Parquet file
+    # since only the trailing metadata is parsed
+    footer = tail[-(footer_length + 8) :]
+    footer_file = pq.ParquetFile(pa.BufferReader(PARQUET_MAGIC + footer))
+    return footer_file.metadata, footer_file.schema_arrow, tail_start, tail
+
+
+def _column_chunk_range(column):
+    start = column.data_page_offset
+    if column.has_dictionary_page and column.dictionary_page_offset:
+        start = min(start, column.dictionary_page_offset)
+    return start, start + column.total_compressed_size
+
+
+def _merge_ranges(ranges):
+    merged = []
+    for start, end in sorted(ranges):
+        if (
+            merged
+            and start - merged[-1][1] <= RANGE_MERGE_GAP
+            and end - merged[-1][0] <= RANGE_MAX_BYTES
+        ):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def plan_file(source_object, metadata, schema, columns=None, filters=None):
+    """
+    Plan the read of one object from its footer metadata.
+
+    Returns a dict with the selected row groups, their rows and the byte
+    ranges of the column chunks to fetch.
+    """
+    schema_names = schema.names
+    missing_columns = [c for c in columns or [] if c not in schema_names]
+    filters = [f for f in filters or [] if f[0] in schema_names]
+
+    needed_columns = None
+    if columns:
+        needed_columns = {c for c in columns if c in schema_names}
+        needed_columns.update(column for column, _, _ in filters)
+
+    row_groups = select_row_groups(metadata, filters)
+    ranges = []
+    rows_selected = 0
+    for index in row_groups:
+        row_group = metadata.row_group(index)
+        rows_selected += row_group.num_rows
+        for i in range(row_group.num_columns):
+            column = row_group.column(i)
+            top_level = column.path_in_schema.split(".")[0]
+            if needed_columns is None or top_level in needed_columns:
+                ranges.append(_column_chunk_range(column))
+
+    return {
+        "key": source_object["key"],
+        "size": source_object["size"],
+        "num_rows": metadata.num_rows,
+        "num_row_groups": metadata.num_row_groups,
+        "row_groups": row_groups,
+        "rows_selected": rows_selected,
+        "bytes_selected": sum(end - start for start, end in ranges),
+        "ranges": _merge_ranges(ranges),
+        "schema": schema,
+        "missing_columns": missing_columns,
+    }
+
+
+def plan_objects(
+    s3_client, bucket_name, source_objects, columns=None, filters=None, cache=None
+):
+    """
+    Plan the read of a list of objects (from list_parquet_objects) using only
+    their footers, fetched in parallel (or read from `cache`).
+
+    Raises ValueError when an object is not a readable Parquet file, so a
+    broken upload fails the run before any data is loaded.
+    """
+
+    def plan_one(source_object):
+        fetch_stats = {}
+        cached_path = None
+        if cache is not None and source_object.get("etag"):
+            cached_path = cache.get(
+                bucket_name, source_object["key"], source_object["etag"]
+            )
+
+        if cached_path:
+            metadata, schema = _read_cached_footer(cached_path)
+            tail_start, tail, footer_requests = None, b"", 0
+        else:
+            metadata, schema, tail_start, tail = fetch_footer(
+                s3_client,
+                bucket_name,
+                source_object["key"],
+                source_object["size"],
+                fetch_stats,
+            )
+            # A second GET was needed when the footer did not fit the first tail
+            footer_requests = (
+                1
+                if tail_start == max(0, source_object["size"] - FOOTER_TAIL_BYTES)
+                else 2
+            )
+
+        file_plan = plan_file(source_object, metadata, schema, columns, filters)
+        file_plan["etag"] = source_object.get("etag")
+        file_plan["tail_start"] = tail_start
+        file_plan["tail"] = tail
+        file_plan["footer_requests"] = footer_requests
+        file_plan["fetch_stats"] = fetch_stats
+        return file_plan
+
+    files = map_concurrent(plan_one, source_objects)
+
+    schemas = {str(file_plan["schema"]) for file_plan in files}
+    plan = {
+        "files": files,
+        "files_total": len(files),
+        "files_skipped": sum(1 for f in files if not f["row_groups"]),
+        "rows_total": sum(f["num_rows"] for f in files),
+        "rows_selected": sum(f["rows_selected"] for f in files),
+        "row_groups_total": sum(f["num_row_groups"] for f in files),
+        "row_groups_selected": sum(len(f["row_groups"]) for f in files),
+        "bytes_total": sum(f["size"] for f in files),
+        "bytes_selected": sum(f["bytes_selected"] for f in files),
+        "schema_variants": len(schemas),
+        "footer_requests": sum(f["footer_requests"] for f in files),
+        "footer_bytes": sum(len(f["tail"]) for f in files),
+        "footer_retries": sum(f["fetch_stats"].get("retries", 0) for f in files),
+        "footer_throttled": sum(f["fetch_stats"].get("throttled", 0) for f in files),
+    }
+
+    logger.info(
+        f"Read plan: {plan['files_total'] - plan['files_skipped']}/"
+        f"{plan['files_total']} files, {plan['row_groups_selected']}/"
+        f"{plan['row_groups_total']} row groups, {plan['rows_selected']}/"
+        f"{plan['rows_total']} rows, {plan['bytes_selected']}/"
+        f"{plan['bytes_total']} bytes"
+    )
+    if len(schemas) > 1:
+        logger.warning(f"Source files have {len(schemas)} different schemas")
+    for file_plan in files:
+        if file_plan["missing_columns"]:
+            logger.warning(
+                f"Columns not found in {file_plan['key']}: "
+                f"{', '.join(file_plan['missing_columns'])}"
+            )
+    return plan
+
+
+def summarize_plan(plan):
+    """Return the plan totals (without per-file details) for the audit metrics."""
+    return {key: value for key, value in plan.items() if key != "files"}
+
+
+def _sparse_object(size, pieces):
+    """
+    Build an Arrow buffer of the object size holding only the fetched pieces.
+
+    The buffer is allocated but never initialized, so only the pages that
+    receive data use memory. pyarrow reads it natively; a Python file object
+    would make pyarrow call back into Python for every read.
+    """
+    import pyarrow as pa
+
+    buffer = pa.allocate_buffer(size)
+    view = memoryview(buffer).cast("B")
+    for start, data in pieces:
+        view[start : start + len(data)] = data
+    return buffer
+
+
+def _read_cached_footer(path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(pa.memory_map(path))
+    return parquet_file.metadata, parquet_file.schema_arrow
+
+
+def _open_cached(cache, bucket_name, file_plan):
+    import pyarrow as pa
+
+    path = cache.get(bucket_name, file_plan["key"], file_plan["etag"])
+    if path is None:
+        return None
+    try:
+        return pa.memory_map(path)
+    except FileNotFoundError:
+        # Evicted between the lookup and the open
+        return None
+
+
+def read_planned_file(
+    s3_client,
+    bucket_name,
+    file_plan,
+    columns=None,
+    filters=None,
+    stats=None,
+    cache=None,
+    cache_stats=None,
+):
+    """
+    Read a planned object into an Arrow table with read_parquet_table.
+
+    Adds the GET requests and bytes transferred to `stats`, and the cache
+    hits, misses and bytes saved to `cache_stats`, when given.
+    """
+    import pyarrow as pa
+
+    cacheable = (
+        cache is not None and file_plan.get("etag") and cache.accepts(file_plan["size"])
+    )
+    requests, bytes_fetched = 0, 0
+    data = None
+
+    source = _open_cached(cache, bucket_name, file_plan) if cacheable else None
+    if cache_stats is not None and cacheable:
+        if source is not None:
+            cache_stats["hits"] += 1
+            cache_stats["bytes_saved"] += file_plan["size"]
+        else:
+            cache_stats["misses"] += 1
+
+    tail_start, tail = file_plan["tail_start"], file_plan["tail"]
+    if source is None and tail_start is None:
+        # Planned from a cached copy that was evicted since (by later puts of
+        # this load or another process): the plan holds no tail to read from
+        _, _, tail_start, tail = fetch_footer(
+            s3_client, bucket_name, file_plan["key"], file_plan["size"], stats
+        )
+        # A second GET was needed when the footer did not fit the first tail
+        requests += (
+            1 if tail_start == max(0, file_plan["size"] - FOOTER_TAIL_BYTES) else 2
+        )
+        bytes_fetched += len(tail)
+
+    if source is not None:
+        table = read_parquet_table(source, columns, filters)
+    elif tail_start == 0:
+        # Small object: the footer read already fetched all of it
+        data = tail
+    elif (
+        tail_start is None
+        or file_plan["bytes_selected"] >= file_plan["size"] * FULL_GET_RATIO
+    ):
+        data = get_object_bytes(s3_client, bucket_name, file_plan["key"], stats=stats)
+        requests, bytes_fetched = requests + 1, bytes_fetched + len(data)
+    else:
+        # The footer tail was kept from planning (or fetched again above);
+        # fetch only the selected column chunks
+        pieces = [(tail_start, tail)]
+        for start, end in file_plan["ranges"]:
+            pieces.append(
+                (
+                    start,
+                    _get_range(
+                        s3_client, bucket_name, file_plan["key"], start, end, stats
+                    ),
+                )
+            )
+        source = _sparse_object(file_plan["size"], pieces)
+        table = read_parquet_table(pa.BufferReader(source), columns, filters)
+        requests += len(file_plan["ranges"])
+        bytes_fetched += sum(len(piece) for _, piece in pieces[1:])
+
+    if data is not None:
+        if cacheable:
+            cache.put(bucket_name, file_plan["key"], file_plan["etag"], data)
+            if cache_stats is not None:
+                cache_stats["bytes_stored"] += len(data)
+        table = read_parquet_table(pa.BufferReader(data), columns, filters)
+
+    if stats is not None:
+        stats["get_requests"] = stats.get("get_requests", 0) + requests
+        stats["bytes_fetched"] = stats.get("bytes_fetched", 0) + bytes_fetched
+    return table
@@ -0,0 +1,247 @@
+"""
+Parquet Reader Module for ETL Metadata Framework
+------------------------------------------------
+This module reads Parquet data with the projection and row filter declared
+for a pipeline in the controller table:
+1. Parsing controller row filters (e.g. "order_date >= {watermark}")
+2. Skipping row groups whose min/max statistics cannot match the filter
+3. Decoding only the selected columns of the remaining row groups
+
+Row filters are conjunctions of simple comparisons joined with AND.
+Supported operators: =, ==, !=, <, <=, >, >=. Values are numbers or quoted
+strings; the {watermark} placeholder is replaced with the current high-water
+mark of the landing table for incremental loads.
+
+A watermark column must grow in ingestion order (a sequence, LSN or load
+timestamp). Event times such as order_date arrive late: rows older than the
+latest one loaded are silently dropped. Use `>` with a strictly increasing
+column, or `>=` together with business_keys so the boundary rows read again
+are dropped by dedup.
+"""
+
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+WATERMARK = "{watermark}"
+
+_CLAUSE_PATTERN = re.compile(
+    r"^\s*([A-Za-z_][A-Za-z0-9_]*)\s*(==|=|!=|<=|>=|<|>)\s*(.+?)\s*$"
+)
+
+_COMPARATORS = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+}
+
+
+def parse_column_list(value):
+    """Parse a comma-separated controller column list into a list of names."""
+    if not value:
+        return None
+    columns = [column.strip() for column in value.split(",") if column.strip()]
+    return columns or None
+
+
+def _parse_value(raw_value):
+    if raw_value == WATERMARK:
+        return WATERMARK
+    if len(raw_value) >= 2 and raw_value[0] == raw_value[-1] and raw_value[0] in "'\"":
+        return raw_value[1:-1]
+    try:
+        return int(raw_value)
+    except ValueError:
+        pass
+    try:
+        return float(raw_value)
+    except ValueError:
+        raise ValueError(f"Unsupported value in row filter: {raw_value}")
+
+
+def parse_row_filter(expression):
+    """
+    Parse a controller row filter into a list of (column, op, value) tuples.
+    """
+    if not expression or not expression.strip():
+        return []
+
+    filters = []
+    for clause in re.split(r"\s+and\s+", expression.strip(), flags=re.IGNORECASE):
+        match = _CLAUSE_PATTERN.match(clause)
+        if not match:
+            raise ValueError(f"Unsupported row filter clause: {clause}")
+        column, op, raw_value = match.groups()
+        if op == "=":
+            op = "=="
+        filters.append((column, op, _parse_value(raw_value)))
+    return filters
+
+
+def watermark_columns(filters):
+    """Return the columns compared against the {watermark} placeholder."""
+    return [column for column, _, value in filters if value == WATERMARK]
+
+
+def check_watermark_filter(filters, business_keys=None):
+    """
+    Validate the {watermark} clauses of a row filter.
+
+    Only > and >= can follow a high-water mark. Returns warnings for clauses
+    that re-read rows without business_keys to drop them again.
+    """
+    warnings = []
+    for column, op, value in filters:
+        if value != WATERMARK:
+            continue
+        if op not in (">", ">="):
+            raise ValueError(
+                f"Watermark clause on '{column}' must use > or >=, not {op}"
+            )
+        if op == ">=" and not business_keys:
+            warnings.append(
+                f"'{column} >= {{watermark}}' re-reads the rows at the watermark "
+                "and no business_keys are set to drop them: they are loaded twice"
+            )
+    return warnings
+
+
+def resolve_watermarks(filters, watermarks):
+    """
+    Replace {watermark} placeholders with resolved values.
+
+    Clauses whose watermark is unknown (first load, full load) are dropped so
+    the whole source is read.
+    """
+    resolved = []
+    for column, op, value in filters:
+        if value == WATERMARK:
+            value = (watermarks or {}).get(column)
+            if value is None:
+                logger.info(f"No watermark for '{column}', reading all rows")
+                continue
+        resolved.append((column, op, value))
+    return resolved
+
+
+def row_group_may_match(row_group, filters, column_indexes):
+    """
+    Check row group min/max statistics against the filters.
+
+    Returns False only when the statistics prove that no row can match.
+    """
+    for column, op, value in filters:
+        index = column_indexes.get(column)
+        if index is None:
+            continue
+        statistics = row_group.column(index).statistics
+        if statistics is None or not statistics.has_min_max:
+            continue
+        try:
+            minimum, maximum = statistics.min, statistics.max
+            if op == "==" and (value < minimum or value > maximum):
+                return False
+            if op == "!=" and minimum == maximum == value:
+                return False
+            if op in ("<", "<=") and not _COMPARATORS[op](minimum, value):
+                return False
+            if op in (">", ">=") and not _COMPARATORS[op](maximum, value):
+                return False
+        except TypeError:
+            # Statistics type does not compare with the filter value
+            continue
+    return True
+
+
+def select_row_groups(metadata, filters):
+    """Return the indexes of the row groups that may contain matching rows."""
+    if metadata.num_row_groups == 0:
+        return []
+    # Column paths are taken from a row group: metadata.schema creates a
+    # reference cycle, and pyarrow aborts if that cycle is collected from a
+    # worker thread
+    first_row_group = metadata.row_group(0)
+    column_indexes = {
+        first_row_group.column(i).path_in_schema: i for i in range(metadata.num_columns)
+    }
+    return [
+        i
+        for i in range(metadata.num_row_groups)
+        if row_group_may_match(metadata.row_group(i), filters, column_indexes)
+    ]
+
+
+def _filter_expression(filters):
+    import pyarrow.compute as pc
+
+    expression = None
+    for column, op, value in filters:
+        clause = _COMPARATORS[op](pc.field(column), value)
+        expression = clause if expression is None else expression & clause
+    return expression
+
+
+def filter_dataframe(df, filters):
+    """Apply resolved (column, op, value) filters to a pandas DataFrame."""
+    if df.empty:
+        return df
+    for column, op, value in filters:
+        if column in df.columns:
+            df = df[_COMPARATORS[op](df[column], value)]
+    return df
+
+
+def read_parquet_table(source, columns=None, filters=None):
+    """
+    Read a Parquet file into an Arrow table with column pruning and row-group
+    statistics skipping.
+
+    Parameters:
+    -----------
+    source : str or file-like
+        Parquet file to read
+    columns : list, optional
+        Columns to decode (default: all columns)
+    filters : list, optional
+        Resolved (column, op, value) tuples from parse_row_filter
+    """
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(source)
+    schema_names = parquet_file.schema_arrow.names
+
+    if columns:
+        missing = [column for column in columns if column not in schema_names]
+        if missing:
+            logger.warning(f"Columns not found in Parquet file: {', '.join(missing)}")
+        columns = [column for column in columns if column in schema_names]
+
+    filters = [f for f in (filters or []) if f[0] in schema_names]
+
+    row_groups = select_row_groups(parquet_file.metadata, filters)
+    skipped = parquet_file.metadata.num_row_groups - len(row_groups)
+    if skipped:
+        logger.info(
+            f"Skipped {skipped}/{parquet_file.metadata.num_row_groups} "
+            "row groups using statistics"
+        )
+
+    # Filter columns must be decoded even when they are not projected
+    read_columns = None
+    if columns:
+        read_columns = columns + [
+            column for column, _, _ in filters if column not in columns
+        ]
+
+    table = parquet_file.read_row_groups(row_groups, columns=read_columns)
+
+    if filters:
+        table = table.filter(_filter_expression(filters))
+    if columns:
+        table = table.select(columns)
+
+    return table
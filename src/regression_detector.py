@@ -0,0 +1,98 @@
+"""
+Run Regression Detector for ETL Metadata Framework
+--------------------------------------------------
+This module compares a completed pipeline run with the rolling baseline of
+its previous completed runs in the audit table:
+1. Duration is flagged when it exceeds the p95 and is `factor` times the p50
+2. Throughput (rows loaded by the run per second) is flagged when it falls
+   below the p05 and is `factor` times lower than the p50
+3. Peak RSS (when memory profiling is enabled) is flagged like duration
+
+Flagged runs are reported in the consolidated notification.
+"""
+
+import logging
+from src.config import get_settings
+from src.metadata_manager import get_run_baseline
+
+logger = logging.getLogger(__name__)
+
+
+def detect_run_regression(audit_record):
+    """
+    Check a completed audit record against its pipeline baseline.
+
+    Returns a dict describing the slowdown, or None when the run is within
+    the baseline or there is not enough history.
+    """
+    start_time = audit_record.get("start_time")
+    end_time = audit_record.get("end_time")
+    pipeline_id = audit_record.get("pipeline_id")
+    if not start_time or not end_time or pipeline_id is None:
+        return None
+
+    settings = get_settings()
+    factor = settings["regression_factor"]
+
+    try:
+        baseline = get_run_baseline(
+            pipeline_id, audit_record.get("audit_id"), settings["regression_window"]
+        )
+    except Exception as e:
+        logger.warning(f"Skipping regression check for pipeline {pipeline_id}: {e}")
+        return None
+
+    if baseline["runs"] < settings["regression_min_runs"]:
+        logger.info(
+            f"Not enough history for regression check on pipeline {pipeline_id} "
+            f"({baseline['runs']} runs)"
+        )
+        return None
+
+    duration = (end_time - start_time).total_seconds()
+    metrics = audit_record.get("metrics") or {}
+    # records_processed is the row count of the whole landing table
+    records = metrics.get("rows_loaded") or 0
+    findings = []
+
+    duration_p50 = float(baseline["duration_p50"] or 0)
+    duration_p95 = float(baseline["duration_p95"] or 0)
+    if duration > duration_p95 and duration > duration_p50 * factor:
+        findings.append(
+            f"duration {duration:.1f}s (p50 {duration_p50:.1f}s, "
+            f"p95 {duration_p95:.1f}s)"
+        )
+
+    rows_per_sec_p50 = float(baseline["rows_per_sec_p50"] or 0)
+    rows_per_sec_p05 = float(baseline["rows_per_sec_p05"] or 0)
+    if records and duration > 0 and rows_per_sec_p50:
+        rows_per_sec = records / duration
+        if rows_per_sec < rows_per_sec_p05 and rows_per_sec * factor < rows_per_sec_p50:
+            findings.append(
+                f"throughput {rows_per_sec:.1f} rows/s (p50 {rows_per_sec_p50:.1f}, "
+                f"p05 {rows_per_sec_p05:.1f})"
+            )
+
+    memory = metrics.get("memory") or {}
+    rss_peak = memory.get("rss_peak_bytes")
+    if rss_peak and baseline["memory_runs"] >= settings["regression_min_runs"]:
+        rss_peak_p50 = float(baseline["rss_peak_p50"] or 0)
+        rss_peak_p95 = float(baseline["rss_peak_p95"] or 0)
+        if rss_peak > rss_peak_p95 and rss_peak > rss_peak_p50 * factor:
+            findings.append(
+                f"peak RSS {rss_peak / 1024 / 1024:.0f} MB "
+                f"(p50 {rss_peak_p50 / 1024 / 1024:.0f} MB, "
+                f"p95 {rss_peak_p95 / 1024 / 1024:.0f} MB)"
+            )
+
+    if not findings:
+        return None
+
+    logger.warning(
+        f"Performance regression in pipeline {pipeline_id}: {'; '.join(findings)}"
+    )
+    return {
+        "audit_id": audit_record.get("audit_id"),
+        "baseline_runs": baseline["runs"],
+        "findings": findings,
+    }
@@ -0,0 +1,250 @@
+"""
+Run Plan Module for ETL Metadata Framework
+------------------------------------------
+This module implements the dry run of `python -m src.etl --plan`, which sizes
+a load or backfill without writing anything:
+1. Listing the source objects of every (pipeline, date) unit
+2. Estimating the rows and bytes to read from object sizes and Parquet
+   footers, with the pipeline's projection, row filter and current watermarks
+3. Predicting the duration from the read throughput of past loads recorded
+   in the audit table
+4. Printing a per-unit and total plan, with the wall-clock time for the
+   requested number of workers
+
+Only footers are fetched from S3 and only SELECTs are run against
+PostgreSQL; no audit record is created.
+"""
+
+import copy
+import logging
+from datetime import timedelta
+from src.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+def _format_bytes(value):
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(value) < 1024:
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} TB"
+
+
+def _format_duration(seconds):
+    if seconds is None:
+        return "?"
+    return str(timedelta(seconds=int(round(seconds))))
+
+
+def estimate_seconds(unit, throughput):
+    """
+    Return (expected, slow) durations of a unit from its planned bytes (or
+    rows when no byte throughput was recorded), using the median and 5th
+    percentile throughput of past loads. (None, None) without history.
+    """
+    if not throughput or not throughput.get("runs"):
+        return None, None
+    for amount, rate in (
+        ("bytes_selected", "bytes_per_sec"),
+        ("rows_selected", "rows_per_sec"),
+    ):
+        p50, p05 = throughput.get(f"{rate}_p50"), throughput.get(f"{rate}_p05")
+        if p50:
+            p50 = float(p50)
+            p05 = float(p05) if p05 else p50
+            return unit[amount] / p50, unit[amount] / p05
+    return None, None
+
+
+def plan_unit(pipeline_config, date_prefix, engine, force=False):
+    """
+    Plan the load of one pipeline for one date prefix.
+
+    Returns a dict with the listing and footer totals and a status of
+    'load', 'unchanged' (would be skipped), 'no data' or 'error'.
+    """
+    from src.etl import (
+        compute_source_fingerprint,
+        get_s3_client,
+        get_source_prefix,
+        get_watermarks,
+        list_parquet_objects,
+        uses_watermark,
+    )
+    from src.metadata_manager import get_last_success_fingerprint
+    from src.object_cache import get_object_cache
+    from src.parquet_planner import plan_objects
+    from src.parquet_reader import (
+        parse_column_list,
+        parse_row_filter,
+        resolve_watermarks,
+        watermark_columns,
+    )
+
+    bucket_name = get_settings()["aws_bucket_name"]
+    prefix = get_source_prefix(pipeline_config["data_source"], date_prefix)
+    unit = {
+        "pipeline_id": pipeline_config["id"],
+        "source_table": pipeline_config["source_table"],
+        "date": date_prefix or "-",
+        "load_type": pipeline_config["load_type"],
+        "status": "load",
+        "files_total": 0,
+        "files_skipped": 0,
+        "rows_total": 0,
+        "rows_selected": 0,
+        "bytes_total": 0,
+        "bytes_selected": 0,
+        "footer_bytes": 0,
+    }
+
+    source_objects = list_parquet_objects(get_s3_client(), bucket_name, prefix)
+    unit["files_total"] = len(source_objects)
+    unit["bytes_total"] = sum(obj["size"] for obj in source_objects)
+    if not source_objects:
+        unit["status"] = "no data"
+        return unit
+
+    fingerprint = compute_source_fingerprint(pipeline_config, source_objects)
+    if not force and fingerprint == get_last_success_fingerprint(pipeline_config["id"]):
+        unit["status"] = "unchanged"
+        return unit
+
+    columns = parse_column_list(pipeline_config.get("select_columns"))
+    row_filter = parse_row_filter(pipeline_config.get("row_filter"))
+    watermarks = {}
+    if uses_watermark(pipeline_config["load_type"]):
+        watermarks = get_watermarks(
+            engine, pipeline_config["source_table"], watermark_columns(row_filter)
+        )
+    filters = resolve_watermarks(row_filter, watermarks)
+
+    try:
+        plan = plan_objects(
+            get_s3_client(max_attempts=1),
+            bucket_name,
+            source_objects,
+            columns,
+            filters,
+            get_object_cache(),
+        )
+    except ValueError as e:
+        # The real run would fail on the same object
+        unit["status"] = "error"
+        unit["error"] = str(e)
+        return unit
+
+    for key in (
+        "files_skipped",
+        "rows_total",
+        "rows_selected",
+        "bytes_selected",
+        "footer_bytes",
+    ):
+        unit[key] = plan[key]
+    return unit
+
+
+def plan_run(pipeline_configs, dates, force=False):
+    """
+    Plan every (pipeline, date) unit of a run. `dates` is [None] for a run
+    without --date; later dates of a backfill are planned as appends, like
+    run_backfill does.
+    """
+    from src.backfill import BACKFILL_LOAD_TYPE
+    from src.etl import get_db_engine
+    from src.metadata_manager import get_load_throughput
+
+    engine = get_db_engine()
+    throughputs = {}
+    units = []
+    for index, date_prefix in enumerate(dates):
+        for pipeline_config in pipeline_configs:
+            unit_config = copy.deepcopy(pipeline_config)
+            if index > 0:
+                unit_config["load_type"] = BACKFILL_LOAD_TYPE
+            unit = plan_unit(unit_config, date_prefix, engine, force)
+
+            pipeline_id = pipeline_config["id"]
+            if pipeline_id not in throughputs:
+                throughputs[pipeline_id] = get_load_throughput(pipeline_id)
+            if unit["status"] == "load":
+                unit["seconds"], unit["seconds_slow"] = estimate_seconds(
+                    unit, throughputs[pipeline_id]
+                )
+            else:
+                unit["seconds"] = unit["seconds_slow"] = 0
+            unit["history_runs"] = (throughputs[pipeline_id] or {}).get("runs", 0)
+            units.append(unit)
+    return units
+
+
+def print_plan(units, workers=1):
+    """Print the per-unit plan and the totals; returns the totals."""
+    header = (
+        f"{'pipeline':<12} {'date':<9} {'load':<11} {'status':<9} "
+        f"{'files':>9} {'rows':>23} {'bytes to read':>23} {'estimate':>19}"
+    )
+    print(header)
+    print("-" * len(header))
+    for unit in units:
+        files = f"{unit['files_total'] - unit['files_skipped']}/{unit['files_total']}"
+        rows = f"{unit['rows_selected']}/{unit['rows_total']}"
+        read = (
+            f"{_format_bytes(unit['bytes_selected'])}/"
+            f"{_format_bytes(unit['bytes_total'])}"
+        )
+        if unit["status"] != "load":
+            estimate = "-"
+        elif unit["seconds"] is None:
+            estimate = "no history"
+        else:
+            estimate = (
+                f"{_format_duration(unit['seconds'])}"
+                f" (<{_format_duration(unit['seconds_slow'])})"
+            )
+        print(
+            f"{str(unit['pipeline_id']):<12} {unit['date']:<9} "
+            f"{unit['load_type']:<11} {unit['status']:<9} {files:>9} {rows:>23} "
+            f"{read:>23} {estimate:>19}"
+        )
+        if unit.get("error"):
+            print(f"    {unit['error']}")
+
+    loads = [unit for unit in units if unit["status"] == "load"]
+    estimated = [unit for unit in loads if unit["seconds"] is not None]
+    totals = {
+        "units": len(units),
+        "loads": len(loads),
+        "rows_selected": sum(unit["rows_selected"] for unit in loads),
+        "bytes_selected": sum(unit["bytes_selected"] for unit in loads),
+        "bytes_total": sum(unit["bytes_total"] for unit in units),
+        "footer_bytes": sum(unit["footer_bytes"] for unit in units),
+        "seconds": sum(unit["seconds"] for unit in estimated),
+        "seconds_slow": sum(unit["seconds_slow"] or 0 for unit in estimated),
+        "unestimated": len(loads) - len(estimated),
+    }
+    # A unit cannot be split across workers, so the longest one bounds the run
+    longest = max((unit["seconds"] for unit in estimated), default=0)
+    totals["wall_clock_seconds"] = max(totals["seconds"] / max(1, workers), longest)
+
+    print("-" * len(header))
+    print(
+        f"{totals['loads']}/{totals['units']} units to load, "
+        f"{totals['rows_selected']} rows, "
+        f"{_format_bytes(totals['bytes_selected'])} to read of "
+        f"{_format_bytes(totals['bytes_total'])} listed "
+        f"({_format_bytes(totals['footer_bytes'])} of footers fetched for this plan)"
+    )
+    print(
+        f"Estimated load time: {_format_duration(totals['seconds'])} serial "
+        f"(slow case {_format_duration(totals['seconds_slow'])}), "
+        f"~{_format_duration(totals['wall_clock_seconds'])} with {workers} worker(s)"
+    )
+    if totals["unestimated"]:
+        print(
+            f"{totals['unestimated']} unit(s) have no completed load in the audit "
+            "history and are not included in the estimate"
+        )
+    return totals
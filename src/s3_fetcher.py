@@ -0,0 +1,236 @@
+"""
+S3 Fetcher Module for ETL Metadata Framework
+--------------------------------------------
+This module runs the S3 GETs of the ETL with an adaptive concurrency limit:
+1. An AIMD controller shared by every thread of the process raises the number
+   of GETs in flight by one per window of healthy responses and halves it on
+   throttling (503 SlowDown) or when latency climbs well above its baseline
+2. Throttled and transient failures are retried with full-jitter exponential
+   backoff
+3. map_concurrent runs fetch tasks on a pool sized to the controller maximum,
+   which matches the connection pool of the S3 client
+
+Clients used here should be created with max_attempts=1 so that throttling
+reaches the controller instead of being retried silently by botocore.
+"""
+
+import time
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from src.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+THROTTLE_ERROR_CODES = {
+    "SlowDown",
+    "ServiceUnavailable",
+    "503",
+    "Throttling",
+    "ThrottlingException",
+    "RequestLimitExceeded",
+}
+TRANSIENT_ERROR_CODES = {"InternalError", "500", "RequestTimeout"}
+
+# Latency EWMA above this multiple of the best EWMA seen counts as congestion
+LATENCY_CONGESTION_FACTOR = 2.0
+LATENCY_EWMA_WEIGHT = 0.2
+
+RETRY_BASE_SECONDS = 0.1
+RETRY_MAX_SECONDS = 10.0
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+class AdaptiveConcurrency:
+    """
+    Additive-increase / multiplicative-decrease limit on requests in flight.
+
+    The limit grows by one after `limit` successful responses (one window)
+    and is halved on throttling or congestion, at most once per window.
+    """
+
+    def __init__(self, initial, minimum, maximum):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = min(max(initial, self.minimum), self.maximum)
+        self.in_flight = 0
+        self.latency_ewma = None
+        self.latency_baseline = None
+        self.successes = 0
+        self.throttled = 0
+        self.decreases = 0
+        self.peak_limit = self.limit
+        self._window_successes = 0
+        # The first throttle always counts
+        self._completions_since_decrease = self.limit
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self, latency=None, throttled=False):
+        with self._condition:
+            self.in_flight -= 1
+            self._completions_since_decrease += 1
+
+            congested = False
+            if latency is not None and not throttled:
+                self.successes += 1
+                if self.latency_ewma is None:
+                    self.latency_ewma = latency
+                else:
+                    self.latency_ewma += LATENCY_EWMA_WEIGHT * (
+                        latency - self.latency_ewma
+                    )
+                if self.latency_baseline is None:
+                    self.latency_baseline = self.latency_ewma
+                else:
+                    self.latency_baseline = min(
+                        self.latency_baseline, self.latency_ewma
+                    )
+                congested = (
+                    self.latency_ewma
+                    > self.latency_baseline * LATENCY_CONGESTION_FACTOR
+                )
+
+            if throttled:
+                self.throttled += 1
+
+            if throttled or congested:
+                self._decrease()
+            elif latency is not None:
+                self._window_successes += 1
+                if self._window_successes >= int(self.limit):
+                    self._window_successes = 0
+                    self.limit = min(self.maximum, self.limit + 1)
+                    self.peak_limit = max(self.peak_limit, self.limit)
+
+            self._condition.notify_all()
+
+    def _decrease(self):
+        # Responses already in flight when the limit was cut report the same
+        # congestion; only react once per window
+        if self._completions_since_decrease < int(self.limit):
+            return
+        self.limit = max(self.minimum, self.limit // 2)
+        self.decreases += 1
+        self._window_successes = 0
+        self._completions_since_decrease = 0
+        # Let the latency baseline re-settle at the lower concurrency
+        self.latency_ewma = None
+
+    def snapshot(self):
+        with self._condition:
+            return {
+                "limit": int(self.limit),
+                "peak_limit": int(self.peak_limit),
+                "throttled": self.throttled,
+                "decreases": self.decreases,
+            }
+
+
+def get_fetch_controller():
+    """Return the process-wide controller, so backfill workers share one limit."""
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            settings = get_settings()
+            _controller = AdaptiveConcurrency(
+                settings["s3_initial_concurrency"],
+                settings["s3_min_concurrency"],
+                settings["s3_max_concurrency"],
+            )
+    return _controller
+
+
+def _error_code(error):
+    response = getattr(error, "response", None) or {}
+    code = response.get("Error", {}).get("Code")
+    if code is None:
+        code = str(response.get("ResponseMetadata", {}).get("HTTPStatusCode", ""))
+    return code
+
+
+def _is_connection_error(error):
+    from botocore.exceptions import ConnectionError, HTTPClientError
+
+    return isinstance(error, (ConnectionError, HTTPClientError))
+
+
+def backoff_seconds(attempt):
+    """Full-jitter exponential backoff for the given retry attempt (from 0)."""
+    return random.uniform(0, min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2**attempt))
+
+
+def get_object_bytes(
+    s3_client, bucket_name, key, byte_range=None, stats=None, controller=None
+):
+    """
+    GET an object (or the [start, end) `byte_range` of it) under the adaptive
+    concurrency limit, retrying throttled and transient failures.
+
+    Adds retries and throttled responses to `stats` when given.
+    """
+    from botocore.exceptions import ClientError
+
+    controller = controller or get_fetch_controller()
+    max_retries = get_settings()["s3_max_retries"]
+    request = {"Bucket": bucket_name, "Key": key}
+    if byte_range is not None:
+        request["Range"] = f"bytes={byte_range[0]}-{byte_range[1] - 1}"
+
+    attempt = 0
+    while True:
+        controller.acquire()
+        started = time.monotonic()
+        try:
+            response = s3_client.get_object(**request)
+            # Time to first byte: unlike the full transfer time it does not
+            # depend on the size of the object or range
+            latency = time.monotonic() - started
+            data = response["Body"].read()
+        except Exception as e:
+            code = _error_code(e) if isinstance(e, ClientError) else None
+            throttled = code in THROTTLE_ERROR_CODES
+            retryable = (
+                throttled or code in TRANSIENT_ERROR_CODES or _is_connection_error(e)
+            )
+            controller.release(throttled=throttled or _is_connection_error(e))
+            if stats is not None and throttled:
+                stats["throttled"] = stats.get("throttled", 0) + 1
+            if not retryable or attempt >= max_retries:
+                raise
+            delay = backoff_seconds(attempt)
+            attempt += 1
+            if stats is not None:
+                stats["retries"] = stats.get("retries", 0) + 1
+            logger.debug(
+                f"Retrying GET s3://{bucket_name}/{key} ({code or e}) "
+                f"in {delay:.2f}s, attempt {attempt}/{max_retries}"
+            )
+            time.sleep(delay)
+            continue
+
+        controller.release(latency=latency)
+        return data
+
+
+def map_concurrent(function, items, controller=None):
+    """
+    Apply `function` to every item on a thread pool sized to the controller
+    maximum and return the results in order. The GETs made by `function`
+    are still bounded by the adaptive limit.
+    """
+    items = list(items)
+    if len(items) <= 1:
+        return [function(item) for item in items]
+    controller = controller or get_fetch_controller()
+    workers = min(controller.maximum, len(items))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(function, items))
@@ -0,0 +1,199 @@
+"""
+Scheduler Module for ETL Metadata Framework
+-------------------------------------------
+This module orders the pipelines of a run so the longest ones do not start
+last:
+1. The expected cost of every pipeline is taken from its recent completed
+   runs in the audit table: the median duration, scaled up when the latest
+   run processed more records than the median one
+2. Pipelines are dispatched longest-processing-time first (LPT). A pipeline
+   occupies controller.resource_weight worker slots (e.g. 2 for a load that
+   needs twice the memory) and starts once that many slots are free
+3. The same dispatch policy is simulated to plan start and end times and the
+   makespan for the worker count, and the plan is reported next to the
+   actual times after the run
+
+Pipelines without history are expected to take as long as the longest known
+one, so they start early rather than stretch the end of the run.
+"""
+
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+logger = logging.getLogger(__name__)
+
+# Expected duration when no pipeline of the run has any history
+DEFAULT_COST_SECONDS = 60.0
+
+# Upper bound of the growth factor applied from the latest run's records
+MAX_GROWTH_FACTOR = 4.0
+
+
+def _format_duration(seconds):
+    return str(timedelta(seconds=int(round(seconds))))
+
+
+def estimate_cost(history):
+    """Return the expected seconds of a pipeline from its history, or None."""
+    if not history or not history.get("runs") or history.get("duration_p50") is None:
+        return None
+    seconds = float(history["duration_p50"])
+    records_p50 = float(history.get("records_p50") or 0)
+    records_last = float(history.get("records_last") or 0)
+    if records_p50 > 0 and records_last > records_p50:
+        # A growing source: the next run is likely closer to the latest one
+        seconds *= min(records_last / records_p50, MAX_GROWTH_FACTOR)
+    return seconds
+
+
+def get_costs():
+    """Cost history of all pipelines; {} when the audit table is unreachable."""
+    from src.metadata_manager import get_pipeline_costs
+
+    try:
+        return get_pipeline_costs()
+    except Exception as e:
+        logger.warning(f"No cost history, keeping the configured order: {e}")
+        return {}
+
+
+def simulate(entries, workers):
+    """
+    Plan start and end times of entries dispatched in order: each starts no
+    earlier than the previous one, once `weight` slots are free.
+    Returns the makespan.
+    """
+    slots = [0.0] * workers
+    previous_start = 0.0
+    makespan = 0.0
+    for entry in entries:
+        slots.sort()
+        weight = entry["weight"]
+        start = max(previous_start, slots[weight - 1])
+        end = start + entry["expected_seconds"]
+        for index in range(weight):
+            slots[index] = end
+        entry["planned_start"], entry["planned_end"] = start, end
+        previous_start = start
+        makespan = max(makespan, end)
+    return makespan
+
+
+def plan_schedule(pipeline_configs, workers, costs=None):
+    """
+    Order pipelines longest first and plan them on `workers` slots.
+
+    Returns (entries, planned makespan); each entry keeps its pipeline_config.
+    """
+    workers = max(1, workers)
+    costs = get_costs() if costs is None else costs
+
+    entries = []
+    for pipeline_config in pipeline_configs:
+        history = costs.get(pipeline_config["id"])
+        entries.append(
+            {
+                "pipeline_config": pipeline_config,
+                "pipeline_id": pipeline_config["id"],
+                "source_table": pipeline_config["source_table"],
+                "weight": min(
+                    max(int(pipeline_config.get("resource_weight") or 1), 1), workers
+                ),
+                "expected_seconds": estimate_cost(history),
+                "history_runs": (history or {}).get("runs", 0),
+                "records_expected": (history or {}).get("records_p50"),
+            }
+        )
+
+    known = [e["expected_seconds"] for e in entries if e["expected_seconds"]]
+    fallback = max(known) if known else DEFAULT_COST_SECONDS
+    for entry in entries:
+        if entry["expected_seconds"] is None:
+            entry["expected_seconds"] = fallback
+
+    # LPT; wider pipelines first among equal durations, as they are harder to fit
+    entries.sort(key=lambda e: (e["expected_seconds"], e["weight"]), reverse=True)
+    makespan = simulate(entries, workers)
+    logger.info(
+        f"Scheduled {len(entries)} pipelines on {workers} worker(s), planned "
+        f"makespan {_format_duration(makespan)}: "
+        + ", ".join(str(e["pipeline_id"]) for e in entries)
+    )
+    return entries, makespan
+
+
+def run_schedule(entries, workers, run_function):
+    """
+    Run `run_function(pipeline_config)` for every entry in plan order, with
+    at most `workers` slots in use. Actual start and end times (seconds since
+    the run started) and the result are stored on the entries.
+    """
+    workers = max(1, workers)
+    free_slots = workers
+    condition = threading.Condition()
+    run_start = time.monotonic()
+
+    def run_entry(entry):
+        nonlocal free_slots
+        entry["actual_start"] = time.monotonic() - run_start
+        try:
+            entry["result"] = run_function(entry["pipeline_config"])
+        except Exception as e:
+            entry["result"] = (False, f"Pipeline failed: {str(e)}")
+        finally:
+            entry["actual_end"] = time.monotonic() - run_start
+            with condition:
+                free_slots += entry["weight"]
+                condition.notify_all()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for entry in entries:
+            # Strict plan order: a wide pipeline is not overtaken by later ones
+            with condition:
+                condition.wait_for(lambda: free_slots >= entry["weight"])
+                free_slots -= entry["weight"]
+            executor.submit(run_entry, entry)
+
+    return time.monotonic() - run_start
+
+
+def report_schedule(entries, planned_makespan, actual_makespan):
+    """Log the planned and actual times of every pipeline of the run."""
+    logger.info("Schedule report (planned vs actual):")
+    logger.info(
+        f"  {'pipeline':<10} {'table':<24} {'weight':>6} {'planned':>19} "
+        f"{'actual':>19} {'rows':>21}"
+    )
+    for entry in entries:
+        planned = (
+            f"{_format_duration(entry['planned_start'])}-"
+            f"{_format_duration(entry['planned_end'])}"
+        )
+        actual = "-"
+        if "actual_end" in entry:
+            actual = (
+                f"{_format_duration(entry['actual_start'])}-"
+                f"{_format_duration(entry['actual_end'])}"
+            )
+        expected_rows = entry["records_expected"]
+        rows = (
+            f"{int(expected_rows) if expected_rows is not None else '?'}/"
+            f"{entry['pipeline_config'].get('rows_loaded', 0)}"
+        )
+        logger.info(
+            f"  {str(entry['pipeline_id']):<10} {entry['source_table']:<24} "
+            f"{entry['weight']:>6} {planned:>19} {actual:>19} {rows:>21}"
+        )
+
+    error = (
+        f" ({(actual_makespan - planned_makespan) / planned_makespan:+.0%})"
+        if planned_makespan
+        else ""
+    )
+    logger.info(
+        f"Makespan: planned {_format_duration(planned_makespan)}, "
+        f"actual {_format_duration(actual_makespan)}{error}"
+    )
@@ -0,0 +1,214 @@
+"""
+Schema Evolution Module for ETL Metadata Framework
+--------------------------------------------------
+This module lets appends (incremental and cdc loads) follow additive changes
+of the source schema instead of requiring a full reload:
+1. The Arrow schemas of the files read are unified and compared with the
+   columns of the landing table (information_schema)
+2. New source columns are added as nullable columns, and columns whose source
+   type became wider are altered to a type that holds both (e.g. integer ->
+   bigint, real -> double precision, varchar -> text)
+3. Other type changes are incompatible: the load fails and asks for a full
+   load, which recreates the table
+
+Every difference, applied or not, is recorded in schema_drift_log. Columns
+that disappeared from the source stay in the table and are loaded as NULL.
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+ADD_COLUMN = "add_column"
+WIDEN_TYPE = "widen_type"
+INCOMPATIBLE_TYPE = "incompatible_type"
+MISSING_COLUMN = "missing_column"
+
+_INTEGERS = {"smallint", "integer", "bigint"}
+_TIMESTAMP = "timestamp without time zone"
+_TIMESTAMPTZ = "timestamp with time zone"
+
+# Existing column type -> incoming types it stores as they are. Nullable
+# integers reach pandas as float64, so to_sql created them as double precision
+ACCEPTS = {
+    "smallint": {"smallint"},
+    "integer": {"smallint", "integer"},
+    "bigint": _INTEGERS,
+    "numeric": _INTEGERS | {"numeric", "real", "double precision"},
+    "real": {"smallint", "real"},
+    "double precision": _INTEGERS | {"real", "double precision"},
+    "boolean": {"boolean"},
+    "date": {"date"},
+    _TIMESTAMP: {"date", _TIMESTAMP},
+    _TIMESTAMPTZ: {"date", _TIMESTAMP, _TIMESTAMPTZ},
+    "bytea": {"bytea"},
+}
+
+# Existing column type -> incoming types it can be altered to without loss
+WIDENINGS = {
+    "smallint": {"integer", "bigint", "numeric", "real", "double precision"},
+    "integer": {"bigint", "numeric", "double precision"},
+    "bigint": {"numeric"},
+    "real": {"double precision"},
+    "date": {_TIMESTAMP, _TIMESTAMPTZ},
+    "character varying": {"text"},
+}
+
+
+def _accepts(old_type, new_type):
+    if old_type == new_type or old_type == "text":
+        return True
+    if old_type == "character varying":
+        # Non-string values are short; strings may exceed the declared length
+        return new_type != "text"
+    return new_type in ACCEPTS.get(old_type, ())
+
+
+def arrow_to_postgres_type(arrow_type):
+    """Return the PostgreSQL type of an Arrow type, or None if not tracked."""
+    import pyarrow as pa
+
+    types = pa.types
+    if types.is_dictionary(arrow_type):
+        return arrow_to_postgres_type(arrow_type.value_type)
+    if (
+        types.is_int8(arrow_type)
+        or types.is_int16(arrow_type)
+        or types.is_uint8(arrow_type)
+    ):
+        return "smallint"
+    if types.is_int32(arrow_type) or types.is_uint16(arrow_type):
+        return "integer"
+    if types.is_int64(arrow_type) or types.is_uint32(arrow_type):
+        return "bigint"
+    if types.is_uint64(arrow_type) or types.is_decimal(arrow_type):
+        return "numeric"
+    if types.is_float16(arrow_type) or types.is_float32(arrow_type):
+        return "real"
+    if types.is_float64(arrow_type):
+        return "double precision"
+    if types.is_boolean(arrow_type):
+        return "boolean"
+    if types.is_string(arrow_type) or types.is_large_string(arrow_type):
+        return "text"
+    if types.is_binary(arrow_type) or types.is_large_binary(arrow_type):
+        return "bytea"
+    if types.is_date(arrow_type):
+        return "date"
+    if types.is_timestamp(arrow_type):
+        return _TIMESTAMPTZ if arrow_type.tz else _TIMESTAMP
+    # Null columns (no value in any file) and nested types are not tracked
+    return None
+
+
+def unify_source_schemas(schemas, columns=None):
+    """
+    Merge the Arrow schemas of the files of a load, keeping only `columns`
+    (those actually written) when given.
+    """
+    import pyarrow as pa
+
+    if not schemas:
+        return pa.schema([])
+    try:
+        schema = pa.unify_schemas(schemas, promote_options="permissive")
+    except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+        raise ValueError(f"Source files have conflicting schemas: {e}")
+    if columns is not None:
+        keep = set(columns)
+        schema = pa.schema([field for field in schema if field.name in keep])
+    return schema
+
+
+def get_table_columns(conn, schema, table):
+    """Return {column: data_type} of a table, {} when it does not exist."""
+    from sqlalchemy import text
+
+    rows = conn.execute(
+        text("""
+            SELECT column_name, data_type
+            FROM information_schema.columns
+            WHERE table_schema = :schema AND table_name = :table
+            ORDER BY ordinal_position
+            """),
+        {"schema": schema, "table": table},
+    ).fetchall()
+    return {column: data_type for column, data_type in rows}
+
+
+def plan_schema_changes(table_columns, source_schema, ignore_columns=()):
+    """
+    Compare a source schema with the columns of an existing table.
+
+    Returns one dict per difference with the column, the change type, the
+    old and new types and whether it can be applied in place.
+    """
+    if not table_columns:
+        return []
+
+    changes = []
+    for field in source_schema:
+        new_type = arrow_to_postgres_type(field.type)
+        if new_type is None:
+            continue
+        old_type = table_columns.get(field.name)
+        if old_type is None:
+            changes.append(
+                {
+                    "column": field.name,
+                    "change": ADD_COLUMN,
+                    "old_type": None,
+                    "new_type": new_type,
+                    "applied": True,
+                }
+            )
+        elif _accepts(old_type, new_type):
+            continue
+        else:
+            compatible = new_type in WIDENINGS.get(old_type, ())
+            changes.append(
+                {
+                    "column": field.name,
+                    "change": WIDEN_TYPE if compatible else INCOMPATIBLE_TYPE,
+                    "old_type": old_type,
+                    "new_type": new_type,
+                    "applied": compatible,
+                }
+            )
+
+    source_columns = set(source_schema.names)
+    for column, old_type in table_columns.items():
+        if column not in source_columns and column not in ignore_columns:
+            changes.append(
+                {
+                    "column": column,
+                    "change": MISSING_COLUMN,
+                    "old_type": old_type,
+                    "new_type": None,
+                    "applied": False,
+                }
+            )
+    return changes
+
+
+def apply_schema_changes(conn, schema, table, changes):
+    """Run the ALTER TABLE statements of the applicable changes."""
+    from sqlalchemy import text
+
+    for change in changes:
+        if not change["applied"]:
+            continue
+        # to_sql creates columns with their exact (quoted) names
+        column = '"' + change["column"].replace('"', '""') + '"'
+        if change["change"] == ADD_COLUMN:
+            statement = (
+                f"ALTER TABLE {schema}.{table} "
+                f"ADD COLUMN IF NOT EXISTS {column} {change['new_type']}"
+            )
+        else:
+            statement = (
+                f"ALTER TABLE {schema}.{table} ALTER COLUMN {column} "
+                f"TYPE {change['new_type']}"
+            )
+        logger.info(f"Schema evolution: {statement}")
+        conn.execute(text(statement))
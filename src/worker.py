@@ -0,0 +1,381 @@
+"""
+Worker Module for ETL Metadata Framework
+----------------------------------------
+This module runs the S3 -> PostgreSQL loads on any number of worker
+processes or hosts sharing the pipeline_queue table:
+1. `enqueue` queues one entry per (pipeline, date) from the controller table
+2. `run` claims runnable entries with SELECT ... FOR UPDATE SKIP LOCKED and
+   runs them with process_pipeline; the audit record is written by the
+   claiming worker and carries its worker_id
+3. A heartbeat thread refreshes the claim while the pipeline runs; claims
+   whose heartbeat is older than WORKER_STALE_SECONDS are reclaimed (retried
+   or failed) by any worker. A worker that loses its claim stops the
+   pipeline at its next deadline check, and the landing transaction only
+   commits while the claim is still held
+4. `transform` waits for a run label to drain and runs dbt once downstream of
+   the tables it changed
+
+Entries of the same pipeline run one at a time and in date order, so a
+landing table is never written by two workers.
+
+Usage:
+    python -m src.worker enqueue --date 20250324 [--from ... --to ...]
+    python -m src.worker run [--processes 4] [--exit-when-empty]
+    python -m src.worker transform --run-label <label>
+    python -m src.worker status [--run-label <label>]
+"""
+
+import os
+import sys
+import time
+import socket
+import logging
+import argparse
+import threading
+import subprocess
+from datetime import datetime
+from src.config import configure_logging, get_settings
+
+logger = logging.getLogger(__name__)
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class Heartbeat:
+    """
+    Refreshes a queue claim on a background thread while a pipeline runs.
+    When the claim is lost, `deadline` (the run deadline of the pipeline)
+    is expired.
+    """
+
+    def __init__(self, queue_id, worker_id, pipeline_config, interval):
+        from src.deadline import Deadline
+
+        self.queue_id = queue_id
+        self.worker_id = worker_id
+        self.pipeline_config = pipeline_config
+        self.interval = interval
+        self.lost = False
+        self.deadline = Deadline(label=f"Queue entry {queue_id}")
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name=f"heartbeat-{queue_id}", daemon=True
+        )
+
+    def _run(self):
+        from src.metadata_manager import heartbeat_pipeline_run
+
+        while not self._stop.wait(self.interval):
+            try:
+                owned = heartbeat_pipeline_run(
+                    self.queue_id,
+                    self.worker_id,
+                    self.pipeline_config.get("audit_id"),
+                )
+            except Exception as e:
+                # A missed beat is fine; the claim only goes stale after several
+                logger.warning(f"Heartbeat for queue entry {self.queue_id} failed: {e}")
+                continue
+            if not owned and not self.lost:
+                self.lost = True
+                self.deadline.expire("was reclaimed by another worker")
+                logger.error(
+                    f"Queue entry {self.queue_id} was reclaimed by another worker, "
+                    "stopping its pipeline"
+                )
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_entry(entry, worker_id, settings):
+    """Run one claimed queue entry and record its outcome."""
+    from src.cdc import incremental_load_type
+    from src.etl import process_pipeline
+    from src.metadata_manager import finish_pipeline_run, get_pipeline_config
+
+    queue_id = entry["queue_id"]
+    logger.info(
+        f"Worker {worker_id} claimed queue entry {queue_id}: pipeline "
+        f"{entry['pipeline_id']}, date {entry['date_prefix'] or '-'} "
+        f"(attempt {entry['attempts']}/{entry['max_attempts']})"
+    )
+
+    configs = [c for c in get_pipeline_config() if c["id"] == entry["pipeline_id"]]
+    if not configs:
+        status = finish_pipeline_run(
+            queue_id, worker_id, False, "Pipeline is not active in the controller"
+        )
+        logger.error(f"Pipeline {entry['pipeline_id']} not found, entry {status}")
+        return False
+
+    pipeline_config = configs[0]
+    pipeline_config["pipeline_id"] = pipeline_config["id"]
+    pipeline_config["schema_name"] = "public"
+    if entry["load_type"] == "incremental":
+        # An incremental load of a cdc pipeline stays cdc
+        pipeline_config["load_type"] = incremental_load_type(pipeline_config)
+    elif entry["load_type"]:
+        pipeline_config["load_type"] = entry["load_type"]
+    # Fences the landing transaction on the claim
+    pipeline_config["queue_id"] = queue_id
+    pipeline_config["worker_id"] = worker_id
+
+    with Heartbeat(
+        queue_id, worker_id, pipeline_config, settings["worker_heartbeat_seconds"]
+    ) as heartbeat:
+        try:
+            success, error_msg = process_pipeline(
+                pipeline_config,
+                entry["date_prefix"],
+                skip_transform=True,
+                force=entry["force"],
+                worker_id=worker_id,
+                run_deadline=heartbeat.deadline,
+            )
+        except Exception as e:
+            success, error_msg = False, f"Pipeline failed: {str(e)}"
+
+    status = finish_pipeline_run(
+        queue_id,
+        worker_id,
+        success,
+        error_msg,
+        changed=success and not pipeline_config.get("skipped"),
+        audit_id=pipeline_config.get("audit_id"),
+    )
+    if status is None or heartbeat.lost:
+        logger.error(
+            f"Outcome of queue entry {queue_id} not recorded: the claim was lost"
+        )
+    else:
+        logger.info(f"Queue entry {queue_id} is now {status}")
+    return success
+
+
+def run_worker(worker_id, exit_when_empty=False, max_entries=None):
+    """
+    Claim and run queue entries until the queue is drained (with
+    `exit_when_empty`) or `max_entries` entries were run.
+
+    Returns (succeeded, failed).
+    """
+    from src.metadata_manager import (
+        claim_pipeline_run,
+        get_queue_counts,
+        reclaim_stale_pipeline_runs,
+    )
+    from src.notification import send_consolidated_notifications
+
+    settings = get_settings()
+    succeeded = failed = 0
+    logger.info(f"Worker {worker_id} started")
+
+    try:
+        while max_entries is None or succeeded + failed < max_entries:
+            reclaim_stale_pipeline_runs(settings["worker_stale_seconds"])
+            entry = claim_pipeline_run(worker_id)
+            if entry is None:
+                counts = get_queue_counts()
+                if exit_when_empty and not (
+                    counts.get("pending") or counts.get("running")
+                ):
+                    logger.info("Queue drained")
+                    break
+                # Pending entries may be waiting on an earlier date of their
+                # pipeline held by another worker
+                time.sleep(settings["worker_poll_seconds"])
+                continue
+
+            if run_entry(entry, worker_id, settings):
+                succeeded += 1
+            else:
+                failed += 1
+    finally:
+        send_consolidated_notifications()
+
+    logger.info(f"Worker {worker_id} finished: {succeeded} succeeded, {failed} failed")
+    return succeeded, failed
+
+
+def spawn_workers(processes, exit_when_empty, max_entries):
+    """Run `processes` local worker processes and wait for all of them."""
+    command = [sys.executable, "-m", "src.worker", "run"]
+    if exit_when_empty:
+        command.append("--exit-when-empty")
+    if max_entries:
+        command.extend(["--max-entries", str(max_entries)])
+
+    children = [
+        subprocess.Popen(command + ["--worker-id", f"{default_worker_id()}-{index}"])
+        for index in range(processes)
+    ]
+    return max(child.wait() for child in children)
+
+
+def transform_run(run_label, wait=True):
+    """Wait for a run label to drain, then run dbt downstream of its changes."""
+    from src.etl import run_dbt_command
+    from src.metadata_manager import (
+        get_queue_changed_tables,
+        get_queue_counts,
+        get_untransformed_loads,
+        mark_loads_transformed,
+    )
+
+    settings = get_settings()
+    while wait:
+        counts = get_queue_counts(run_label)
+        if not (counts.get("pending") or counts.get("running")):
+            break
+        logger.info(
+            f"Waiting for run {run_label}: {counts.get('pending', 0)} pending, "
+            f"{counts.get('running', 0)} running"
+        )
+        time.sleep(settings["worker_poll_seconds"])
+
+    # Sources left stale by an earlier failed transform are rebuilt as well
+    pending_loads = get_untransformed_loads()
+    changed_tables = sorted(
+        set(get_queue_changed_tables(run_label))
+        | {load["source_table"] for load in pending_loads}
+    )
+    if not changed_tables:
+        logger.info(f"No source changed in run {run_label}, skipping dbt")
+        return True
+
+    success, error_msg = run_dbt_command(
+        command="run",
+        select=" ".join(f"source:postgres_raw.{table}+" for table in changed_tables),
+    )
+    if not success:
+        logger.error(f"dbt transformation failed: {error_msg}")
+    else:
+        mark_loads_transformed([load["audit_id"] for load in pending_loads])
+    return success
+
+
+def main():
+    from src.backfill import BACKFILL_LOAD_TYPE, get_backfill_dates
+
+    configure_logging()
+
+    parser = argparse.ArgumentParser(
+        description="Distributed ETL workers over the pipeline_queue table"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = subparsers.add_parser("enqueue", help="Queue pipelines for the workers")
+    enqueue.add_argument("--date", type=str, help="Date in format YYYYMMDD")
+    enqueue.add_argument("--from", dest="date_from", help="Backfill start YYYYMMDD")
+    enqueue.add_argument("--to", dest="date_to", help="Backfill end YYYYMMDD")
+    enqueue.add_argument("--pipeline-id", type=int, help="Queue a single pipeline")
+    enqueue.add_argument(
+        "--load-type", choices=["full", "incremental", "cdc", "append"]
+    )
+    enqueue.add_argument("--force", action="store_true")
+    enqueue.add_argument(
+        "--run-label", help="Label of this run (default: current timestamp)"
+    )
+
+    run = subparsers.add_parser("run", help="Claim and run queued pipelines")
+    run.add_argument("--worker-id", help="Default: <hostname>:<pid>")
+    run.add_argument(
+        "--processes",
+        type=int,
+        default=1,
+        help="Start this many local worker processes",
+    )
+    run.add_argument(
+        "--exit-when-empty",
+        action="store_true",
+        help="Exit once nothing is pending or running",
+    )
+    run.add_argument("--max-entries", type=int, help="Exit after this many entries")
+
+    transform = subparsers.add_parser(
+        "transform", help="Run dbt once a run label has drained"
+    )
+    transform.add_argument("--run-label", required=True)
+    transform.add_argument(
+        "--no-wait", action="store_true", help="Do not wait for the run to drain"
+    )
+
+    status = subparsers.add_parser("status", help="Show queue entries per status")
+    status.add_argument("--run-label")
+
+    args = parser.parse_args()
+
+    if args.command == "enqueue":
+        from src.metadata_manager import enqueue_pipeline_runs, get_pipeline_config
+
+        if args.date_from or args.date_to:
+            if not (args.date_from and args.date_to) or args.date:
+                parser.error("--from and --to must be used together and without --date")
+            dates = get_backfill_dates(args.date_from, args.date_to)
+        else:
+            dates = [args.date]
+
+        from src.scheduler import plan_schedule
+
+        pipeline_configs = [
+            config
+            for config in get_pipeline_config()
+            if args.pipeline_id is None or config["id"] == args.pipeline_id
+        ]
+        # Entries are claimed in queue order: queue the longest pipelines first
+        schedule, _ = plan_schedule(pipeline_configs, 1)
+        pipeline_ids = [entry["pipeline_id"] for entry in schedule]
+        run_label = args.run_label or datetime.now().strftime("%Y%m%d%H%M%S")
+        # Later dates of a backfill append without the watermark, as in
+        # run_backfill
+        queued = enqueue_pipeline_runs(
+            run_label,
+            pipeline_ids,
+            dates[:1],
+            args.load_type,
+            args.force,
+            get_settings()["worker_max_attempts"],
+        )
+        if len(dates) > 1:
+            queued += enqueue_pipeline_runs(
+                run_label,
+                pipeline_ids,
+                dates[1:],
+                BACKFILL_LOAD_TYPE,
+                args.force,
+                get_settings()["worker_max_attempts"],
+            )
+        logger.info(f"Queued {queued} entries with run label {run_label}")
+        print(run_label)
+        return 0
+
+    if args.command == "run":
+        if args.processes > 1:
+            return spawn_workers(args.processes, args.exit_when_empty, args.max_entries)
+        _, failed = run_worker(
+            args.worker_id or default_worker_id(),
+            exit_when_empty=args.exit_when_empty,
+            max_entries=args.max_entries,
+        )
+        return 1 if failed else 0
+
+    if args.command == "transform":
+        return 0 if transform_run(args.run_label, wait=not args.no_wait) else 1
+
+    from src.metadata_manager import get_queue_counts
+
+    for queue_status, count in sorted(get_queue_counts(args.run_label).items()):
+        print(f"{queue_status:<10} {count}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())